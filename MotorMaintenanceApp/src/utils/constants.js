@@ -4,6 +4,9 @@
 // For Real Device: use your computer's IP address
 export const API_BASE_URL = 'https://potential-engine-1.onrender.com'; // Updated with your computer's IP
 
+// Points per chart series requested from the server (min/max envelope)
+export const CHART_POINTS = 50;
+
 export const MOTOR_TYPES = [
   { label: 'AC Induction', value: 'AC Induction' },
   { label: 'DC Brushless', value: 'DC Brushless' },
@@ -1,5 +1,55 @@
 import axios from 'axios';
-import { API_BASE_URL } from '../utils/constants';
+import { API_BASE_URL, CHART_POINTS } from '../utils/constants';
+import { FRAME_MIMETYPE, decodeResponse } from './frame';
+
+// Sensor arrays come back as a packed binary frame instead of JSON lists
+const FRAME_REQUEST = {
+    headers: { Accept: `${FRAME_MIMETYPE}, application/json;q=0.5` },
+    responseType: 'arraybuffer',
+};
+
+// Chart-sized series at float32, requested when a result is fetched
+const CHART_PARAMS = { resolution: CHART_POINTS, precision: 'float32' };
+
+// Uploads run as background jobs on the server, so a large file never
+// runs into the request timeout; the job is polled until it finishes
+const JOB_POLL_INTERVAL = 1000; // ms between status polls
+const JOB_MAX_WAIT = 10 * 60 * 1000; // give up after 10 minutes
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Polls a submitted analysis job until it is done
+ * @param {Object} job - Job status returned by /api/jobs
+ * @returns {Promise<Object>} - Final job status
+ */
+const waitForJob = async (job) => {
+    const deadline = Date.now() + JOB_MAX_WAIT;
+    let status = job;
+
+    while (status.status !== 'done') {
+        if (status.status === 'failed') {
+            throw new Error(status.error || 'Analysis failed');
+        }
+        if (Date.now() > deadline) {
+            throw new Error('Analysis is taking too long. Please try again later.');
+        }
+        await sleep(JOB_POLL_INTERVAL);
+        const response = await axios.get(`${API_BASE_URL}${job.status_url}`, { timeout: 30000 });
+        status = response.data;
+    }
+
+    return status;
+};
+
+// Error bodies also arrive as an ArrayBuffer when a frame was requested
+const errorBody = (data) => {
+    try {
+        return decodeResponse(data) || {};
+    } catch (e) {
+        return {};
+    }
+};
 
 /**
  * Upload motor data and get prediction
@@ -26,21 +76,30 @@ export const analyzeMotor = async (motorDetails, csvFile) => {
 
         formData.append('file', fileToUpload);
 
-        console.log('Sending request to:', `${API_BASE_URL}/api/predict`);
+        console.log('Submitting analysis job to:', `${API_BASE_URL}/api/jobs`);
 
-        const response = await axios.post(`${API_BASE_URL}/api/predict`, formData, {
+        // Submit returns at once with a job id; the analysis runs in the background
+        const submitted = await axios.post(`${API_BASE_URL}/api/jobs`, formData, {
             headers: {
                 'Content-Type': 'multipart/form-data',
             },
             timeout: 30000, // 30 second timeout
         });
 
-        return response.data;
+        const job = await waitForJob(submitted.data);
+
+        const response = await axios.get(`${API_BASE_URL}${job.result_url}`, {
+            ...FRAME_REQUEST,
+            params: CHART_PARAMS,
+            timeout: 30000,
+        });
+
+        return decodeResponse(response.data);
     } catch (error) {
         console.error('API Error:', error);
         if (error.response) {
             // Server responded with error
-            throw new Error(error.response.data.error || 'Server error occurred');
+            throw new Error(errorBody(error.response.data).error || 'Server error occurred');
         } else if (error.request) {
             // No response received
             throw new Error('Cannot connect to server. Please check if the Flask app is running and your device is on the same network.');
@@ -63,16 +122,18 @@ export const analyzeMotorThingSpeak = async (channelId, apiKey) => {
 
         const response = await axios.post(`${API_BASE_URL}/api/predict_thingspeak`, {
             channel_id: channelId,
-            api_key: apiKey
+            api_key: apiKey,
+            ...CHART_PARAMS
         }, {
+            ...FRAME_REQUEST,
             timeout: 30000,
         });
 
-        return response.data;
+        return decodeResponse(response.data);
     } catch (error) {
         console.error('API Error:', error);
         if (error.response) {
-            throw new Error(error.response.data.error || 'Server error occurred');
+            throw new Error(errorBody(error.response.data).error || 'Server error occurred');
         } else if (error.request) {
             throw new Error('Cannot connect to server. Please check if the Flask app is running.');
         } else {
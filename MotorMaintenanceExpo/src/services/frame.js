@@ -0,0 +1,87 @@
+/**
+ * Decoder for the server's packed binary responses (binary_format.py).
+ *
+ * Layout (little-endian): "MTRF" magic, uint32 header length, UTF-8 JSON
+ * header, then 8-byte aligned array buffers. Arrays in the header are
+ * {"$array": i} placeholders described by header.$arrays[i].
+ */
+
+export const FRAME_MIMETYPE = 'application/x-motor-frame';
+
+const MAGIC = 'MTRF';
+
+const TYPED_ARRAYS = {
+    float32: Float32Array,
+    float64: Float64Array,
+    int32: Int32Array,
+};
+
+const decodeUtf8 = (bytes) => {
+    if (typeof TextDecoder !== 'undefined') {
+        return new TextDecoder('utf-8').decode(bytes);
+    }
+    let binary = '';
+    for (let i = 0; i < bytes.length; i++) {
+        binary += String.fromCharCode(bytes[i]);
+    }
+    return decodeURIComponent(escape(binary));
+};
+
+const isFrame = (buffer) => {
+    if (buffer.byteLength < 8) {
+        return false;
+    }
+    const magic = new Uint8Array(buffer, 0, 4);
+    return String.fromCharCode(...magic) === MAGIC;
+};
+
+/**
+ * Rebuilds the response object from a frame, same shape as the JSON response
+ * (arrays come back as plain arrays so charts can use them directly)
+ * @param {ArrayBuffer} buffer - Response body
+ * @returns {Object} - Decoded response
+ */
+export const decodeFrame = (buffer) => {
+    const view = new DataView(buffer);
+    const headerLength = view.getUint32(4, true);
+    const header = JSON.parse(decodeUtf8(new Uint8Array(buffer, 8, headerLength)));
+    const base = 8 + headerLength;
+    const arrays = header.$arrays;
+    delete header.$arrays;
+
+    const fill = (node) => {
+        if (Array.isArray(node)) {
+            return node.map(fill);
+        }
+        if (node && typeof node === 'object') {
+            if ('$array' in node) {
+                const { dtype, offset, length } = arrays[node.$array];
+                return Array.from(new TYPED_ARRAYS[dtype](buffer, base + offset, length));
+            }
+            const out = {};
+            Object.keys(node).forEach((key) => {
+                out[key] = fill(node[key]);
+            });
+            return out;
+        }
+        return node;
+    };
+
+    return fill(header);
+};
+
+/**
+ * Decodes a body fetched with responseType 'arraybuffer': a frame, or JSON
+ * (errors are always sent as JSON)
+ * @param {ArrayBuffer} buffer - Response body
+ * @returns {Object} - Decoded response
+ */
+export const decodeResponse = (buffer) => {
+    if (!(buffer instanceof ArrayBuffer)) {
+        return buffer;
+    }
+    if (isFrame(buffer)) {
+        return decodeFrame(buffer);
+    }
+    return JSON.parse(decodeUtf8(new Uint8Array(buffer)));
+};
@@ -3,6 +3,9 @@
 // For Real Device: use your computer's IP address (e.g., http://192.168.1.x:5000)
 export const API_BASE_URL = 'https://motor-maintenance-7qd4.onrender.com';
 
+// Points per chart series requested from the server (min/max envelope)
+export const CHART_POINTS = 50;
+
 export const MOTOR_TYPES = [
     { label: 'AC Induction', value: 'AC Induction' },
     { label: 'DC Brushless', value: 'DC Brushless' },
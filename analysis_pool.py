@@ -0,0 +1,132 @@
+"""
+Bounded process pool for CPU-heavy analysis.
+
+Feature extraction, PSD and prediction on a large upload hold the GIL for
+seconds; run in the request thread they stall the worker and everything
+queued behind it. AnalysisPool runs them in separate processes with
+
+  - a cap on tasks queued or running: beyond it run() raises PoolSaturated
+    straight away, so the route can answer 503 instead of queueing
+    without bound,
+  - a per-task timeout on the caller's wait (AnalysisTimeout),
+  - lazy creation in the process that serves requests, so a pool is never
+    forked from the gunicorn master and then shared by its workers,
+  - pool processes started from a forkserver (spawn where there is none),
+    never forked from the threaded worker itself: a fork copies locks
+    other threads hold (logging, the result cache, SQLite) and the child
+    can deadlock on them. Modules in `preload` are imported once in the
+    forkserver, so each pool process starts with them loaded.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+
+class PoolSaturated(Exception):
+    """Raised when max_pending tasks are already queued or running."""
+
+
+class AnalysisTimeout(Exception):
+    """Raised when a task has not finished within the pool's timeout."""
+
+
+def pool_context(preload=()):
+    """forkserver context (spawn where unavailable) for the pool processes."""
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    if preload:
+        context.set_forkserver_preload(list(preload))
+    return context
+
+
+class AnalysisPool:
+    """
+    ProcessPoolExecutor with admission control. workers=0 disables the
+    pool: run() then calls the function inline.
+    """
+
+    def __init__(self, workers, max_pending, timeout, preload=()):
+        self.workers = workers
+        self.preload = list(preload)
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=pool_context(self.preload))
+                self._pid = os.getpid()
+            return self._executor
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def run(self, fn, *args, timeout=None):
+        """
+        fn(*args) in a pool process; raises PoolSaturated or AnalysisTimeout.
+        timeout overrides the pool's default for this call.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if self.workers <= 0:
+            return fn(*args)
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturated(f"{self.max_pending} analyses already queued or running")
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            # A pool process died (e.g. killed for memory); start a new pool
+            with self._lock:
+                self._executor = None
+            self._slots.release()
+            raise
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._pending += 1
+        # The slot is only freed once the task really ends, even after a
+        # timeout, so a stuck task keeps counting against the limit
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise AnalysisTimeout(f"analysis did not finish within {timeout:g} s") from None
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "timeout_seconds": self.timeout,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts
+            }
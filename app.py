@@ -1,202 +1,707 @@
 import os
+import io
+import json
+import zipfile
 import pandas as pd
 import numpy as np
-import pickle
-import requests
-from flask import Flask, render_template, request, jsonify, send_from_directory
+import threading
+import time
+from flask import Flask, Request, Response, g, has_request_context, render_template, request, jsonify, send_from_directory, url_for
 from flask_cors import CORS
-from scipy.fft import rfft, rfftfreq
-from scipy.signal import welch
+from analysis_pool import AnalysisPool, AnalysisTimeout, PoolSaturated
+from features import SENSOR_COLUMNS
+from model_store import CURRENT_FILE, ModelStore, load_pickled
+from binary_format import FRAME_MIMETYPE, pack_array, pack_frame
+from downsample import minmax_downsample, to_list
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, COUNT_BUCKETS, NULL_TIMER, SIZE_BUCKETS, Registry, StageTimer, server_timing
+)
+from jobs import DONE, FAILED, JobFailed, JobQueueFull, JobRunner, JobStore
+from pipeline import PSD_OUTPUTS, pipeline_for, prediction_records
+from result_cache import ResultCache, upload_digest, upload_size
+from sensor_io import read_sensor_csv
+from similarity_index import SimilarityIndex
+from streaming import ingest_csv
+from upload_store import UploadStore, spooled_stream, temporary_copy
+
+# Uploaded files up to UPLOAD_SPOOL_BYTES stay in memory; larger ones are
+# spooled to an anonymous temporary file (see upload_store.py)
+UPLOAD_SPOOL_BYTES = int(os.environ.get("UPLOAD_SPOOL_BYTES", 8 * 1024 * 1024))
+
+
+class SpoolingRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return spooled_stream(UPLOAD_SPOOL_BYTES)
+
 
 app = Flask(__name__)
+app.request_class = SpoolingRequest
 CORS(app)  # Enable CORS for mobile app
 app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), "uploads")
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Uploads are only kept when UPLOAD_RETAIN_DIR is set, once per distinct content
+UPLOAD_RETAIN_DIR = os.environ.get("UPLOAD_RETAIN_DIR")
+upload_store = UploadStore(UPLOAD_RETAIN_DIR) if UPLOAD_RETAIN_DIR else None
+
 # ---------------- Load Model Artifacts ----------------
-try:
-    with open("model_fault.pkl", "rb") as f:
-        clf = pickle.load(f)
+# Published versions live in MODEL_STORE (see model_store.py) and are
+# memory-mapped, so every worker shares one copy. Without a published
+# version the pickled training outputs are loaded as before.
+MODEL_FILES = ["model_fault.pkl", "label_encoder.pkl", "normal_centroid.npy"]
+MODEL_STORE = os.environ.get("MODEL_STORE", "model_store")
+
+# Seconds between checks of the store's CURRENT pointer for a new version
+MODEL_RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", 5))
+
+model_store = ModelStore(MODEL_STORE)
+
+
+def load_model():
+    version = model_store.current_version()
+    if version is not None:
+        return model_store.load(version)
+    return load_pickled(*MODEL_FILES)
 
-    with open("label_encoder.pkl", "rb") as f:
-        le = pickle.load(f)
 
-    normal_centroid = np.load("normal_centroid.npy")
+try:
+    model = load_model()
 
-    print("Model Loaded Successfully")
-    print("Model expects features:", clf.feature_names_in_)
+    print("Model Loaded Successfully:", model.version)
+    print("Model expects features:", model.feature_names)
 
 except Exception as e:
     print("Error loading model files:", e)
-    clf = None
-    le = None
-    normal_centroid = None
+    model = None
+
+_model_checked = time.monotonic()
+_model_lock = threading.Lock()
+
+
+def current_model():
+    """
+    The model to serve this request with. A newly activated store version is
+    swapped in without a restart, as are the pickled outputs once the store
+    is deactivated; routes read this once per request so a swap never mixes
+    two versions within one response.
+    """
+    global model, _model_checked
+
+    if time.monotonic() - _model_checked < MODEL_RELOAD_INTERVAL:
+        return model
+
+    with _model_lock:
+        if time.monotonic() - _model_checked >= MODEL_RELOAD_INTERVAL:
+            _model_checked = time.monotonic()
+            version = model_store.current_version()
+            if version is not None and (model is None or version != model.version):
+                try:
+                    model = model_store.load(version)
+                    print("Model swapped to version:", version)
+                except Exception as e:
+                    print(f"Error loading model version {version}: {e}")
+            elif version is None and model is not None and model.version != "pickle":
+                # The store was deactivated (e.g. an XGBoost model was trained)
+                try:
+                    model = load_pickled(*MODEL_FILES)
+                    print("Model store deactivated, serving the pickled model")
+                except Exception as e:
+                    print(f"Error loading model files: {e}")
+
+    return model
+
+
+# ---------------- Result Cache ----------------
+# Identical uploads (re-uploads, client retries) are answered from memory.
+# Entries are dropped when any model artifact changes on disk; the cache
+# holds at most RESULT_CACHE_SIZE analyses and RESULT_CACHE_BYTES bytes.
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("RESULT_CACHE_SIZE", 256)),
+    max_bytes=int(os.environ.get("RESULT_CACHE_BYTES", 256 * 1024 * 1024)),
+    ttl=int(os.environ.get("RESULT_CACHE_TTL", 3600)),
+    watch_files=MODEL_FILES + [os.path.join(MODEL_STORE, CURRENT_FILE)]
+)
+
+
+# ---------------- Metrics ----------------
+# Latency histograms per stage and per route, payload sizes and sample
+# counts, served in the Prometheus text format on /metrics (see metrics.py).
+# METRICS_ENABLED=0 turns recording off; a request sent with "X-Profile: 1"
+# gets its own stage breakdown back in a Server-Timing header, unless
+# METRICS_PROFILING=0.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+METRICS_PROFILING = os.environ.get("METRICS_PROFILING", "1") != "0"
+
+metrics = Registry()
+stage_seconds = metrics.histogram(
+    "motor_stage_seconds", "Time spent in one analysis or request stage.", labelnames=("stage",)
+)
+request_seconds = metrics.histogram(
+    "motor_request_seconds", "Request latency by route and status.", labelnames=("route", "status")
+)
+request_bytes = metrics.histogram(
+    "motor_request_bytes", "Request body size by route.", SIZE_BUCKETS, labelnames=("route",)
+)
+response_bytes = metrics.histogram(
+    "motor_response_bytes", "Response body size by route.", SIZE_BUCKETS, labelnames=("route",)
+)
+sample_counts = metrics.histogram(
+    "motor_analysis_samples", "Sensor rows per analysed capture.", COUNT_BUCKETS, labelnames=("route",)
+)
+
+
+def profiling():
+    """The per-request stage list when this request asked for a breakdown, else None."""
+    return g.get("profile") if has_request_context() else None
+
+
+def record_stage(stage, seconds):
+    if METRICS_ENABLED:
+        stage_seconds.observe(seconds, stage)
+    profile = profiling()
+    if profile is not None:
+        profile.append((stage, seconds))
+
+
+def timed(stage):
+    """with timed("stage"): ... records the block's duration (no-op when nothing records)."""
+    if METRICS_ENABLED or (METRICS_PROFILING and profiling() is not None):
+        return StageTimer(record_stage, stage)
+    return NULL_TIMER
+
+
+def record_analysis(analysis, route=None):
+    """Records the stage timings and sample count of a freshly computed analysis."""
+    for stage, seconds in analysis.get("timings", {}).items():
+        record_stage(stage, seconds)
+    if METRICS_ENABLED and route is not None:
+        sample_counts.observe(analysis["sample_count"], route)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if METRICS_PROFILING and request.headers.get("X-Profile", "").lower() in ("1", "true", "yes"):
+        g.profile = []
+
+
+@app.after_request
+def record_request(response):
+    elapsed = time.perf_counter() - g.get("request_start", time.perf_counter())
+    route = request.endpoint or "unknown"
+
+    if METRICS_ENABLED:
+        request_seconds.observe(elapsed, route, str(response.status_code))
+        if request.content_length is not None:
+            request_bytes.observe(request.content_length, route)
+        if response.content_length is not None:
+            response_bytes.observe(response.content_length, route)
+
+    profile = profiling()
+    if profile is not None:
+        response.headers["Server-Timing"] = server_timing(profile + [("total", elapsed)])
+    return response
+
+
+def result_cache_counts():
+    stats = result_cache.stats()
+    return {("hit",): stats["hits"], ("miss",): stats["misses"]}
+
+
+metrics.callback(
+    "motor_result_cache_requests_total", "Result cache lookups by outcome.",
+    result_cache_counts, labelnames=("result",), kind="counter"
+)
+metrics.callback(
+    "motor_result_cache_hit_ratio", "Share of result cache lookups answered from memory.",
+    lambda: {(): result_cache.stats()["hit_rate"]}
+)
+metrics.callback(
+    "motor_result_cache_entries", "Analyses held in the result cache.",
+    lambda: {(): result_cache.stats()["entries"]}
+)
+metrics.callback(
+    "motor_result_cache_bytes", "Approximate bytes held by the result cache.",
+    lambda: {(): result_cache.stats()["bytes"]}
+)
+metrics.callback(
+    "motor_analysis_pool_pending", "Analyses queued or running in the process pool.",
+    lambda: {(): analysis_pool.stats()["pending"]}
+)
+metrics.callback(
+    "motor_analysis_pool_rejected_total", "Analyses refused because the pool was full.",
+    lambda: {(): analysis_pool.stats()["rejected"]}, kind="counter"
+)
+metrics.callback(
+    "motor_jobs", "Unexpired analysis jobs by status.",
+    lambda: {(status,): count for status, count in job_store.stats().items()}, labelnames=("status",)
+)
+metrics.callback(
+    "motor_model_info", "The model version being served.",
+    lambda: {(model.version,): 1} if model is not None else {}, labelnames=("version",)
+)
 
 
 # ---------------- Feature Functions ----------------
-def rms(x):
-    x = np.asarray(x, dtype=float)
-    return np.sqrt(np.mean(np.square(x)))
+def psd_payload(f, Pxx, options):
+    """
+    Response layout of the PSD. "power" stays the X axis for existing clients,
+    "axes" carries all three axes of each sensor.
+    """
+    payload = {}
+    for sensor, offset in (("vibration", 0), ("magnetic", 3)):
+        payload[sensor] = {
+            "frequency": encode_array(f, options),
+            "power": encode_array(Pxx[:, offset], options),
+            "axes": {
+                axis: encode_array(Pxx[:, offset + i], options)
+                for i, axis in enumerate(("x", "y", "z"))
+            }
+        }
+    return payload
 
 
-def p2p(x):
-    x = np.asarray(x, dtype=float)
-    return np.max(x) - np.min(x)
+# ---------------- Chart Payloads ----------------
+# Points per time series on the HTML dashboard (a browser plot gains nothing from more)
+DASHBOARD_POINTS = 2000
 
 
-def fft_peak(x, fs=1.0):
-    x = np.asarray(x, dtype=float)
-    y = x - np.mean(x)
-    yf = np.abs(rfft(y))
-    xf = rfftfreq(len(y), 1/fs)
-    idx = np.argmax(yf)
-    return float(xf[idx]), float(yf[idx])
+def request_option(name):
+    """Reads an option from the query string, then the JSON body or form."""
+    value = request.args.get(name)
+    if value is None:
+        if request.is_json:
+            value = (request.get_json(silent=True) or {}).get(name)
+        else:
+            value = request.form.get(name)
+    return value
 
 
-def psd(x, fs=1.0):
-    x = np.asarray(x, dtype=float)  # 🔥 FIX
-    x = x - np.mean(x)
-    f, Pxx = welch(x, fs=fs, nperseg=min(256, len(x)))
-    return f, Pxx
+def wants_frame():
+    """True when the client prefers the packed binary format over JSON."""
+    best = request.accept_mimetypes.best_match(["application/json", FRAME_MIMETYPE])
+    return best == FRAME_MIMETYPE
 
 
-# ---------------- Feature Extraction ----------------
-def compute_features(df):
+def chart_options(default_points=None):
+    """
+    Response options for the time series:
+      resolution=<n>     min/max envelope of at most n points per series
+      precision=float32  values written at float32 precision
+      raw=0              leave the time series out entirely
+      psd=0              leave the PSD out (and skip computing it)
+    Binary frames (Accept: application/x-motor-frame) default to float32.
+    """
+    try:
+        resolution = int(request_option("resolution"))
+    except (TypeError, ValueError):
+        resolution = default_points
+
+    binary = wants_frame()
+    precision = request_option("precision") or ("float32" if binary else "float64")
+
+    return {
+        "resolution": resolution,
+        "precision": "float32" if precision == "float32" else "float64",
+        "series": str(request_option("raw")).lower() not in ("0", "false", "no"),
+        "psd": str(request_option("psd")).lower() not in ("0", "false", "no"),
+        "binary": binary
+    }
+
+
+def encode_array(values, options):
+    """A NumPy array for binary frames, a JSON list otherwise."""
+    if options["binary"]:
+        return pack_array(values, options["precision"])
+    return to_list(values, options["precision"])
+
+
+def api_response(body, status=200):
+    """jsonify(body), or a packed binary frame when the client negotiated one."""
+    with timed("serialize"):
+        if wants_frame():
+            response = Response(pack_frame(body), status=status, mimetype=FRAME_MIMETYPE)
+        else:
+            response = jsonify(body)
+            response.status_code = status
+    response.vary.add("Accept")
+    return response
+
+
+def series_payload(index, Y, options):
+    """samples / vibration / magnetic lists for an (N, 6) series, downsampled per options."""
+    if options["resolution"]:
+        index, Y = minmax_downsample(index, Y, options["resolution"])
+
+    return {
+        "samples": encode_array(index, options),
+        "vibration": {
+            "x": encode_array(Y[:, 0], options),
+            "y": encode_array(Y[:, 1], options),
+            "z": encode_array(Y[:, 2], options)
+        },
+        "magnetic": {
+            "x": encode_array(Y[:, 3], options),
+            "y": encode_array(Y[:, 4], options),
+            "z": encode_array(Y[:, 5], options)
+        }
+    }
+
 
-    df = df.dropna()
+def analysis_data(analysis, options):
+    """Builds the "data" block of an API response from a (cached) analysis."""
+    data = {"sample_count": analysis["sample_count"]}
 
-    feat = {}
+    # The raw series is not kept in streaming mode, only its length
+    if analysis["series"] is not None and options["series"]:
+        data.update(series_payload(analysis["index"], analysis["series"], options))
 
-    # ---- Vibration ----
-    feat['Vib_RMS_X'] = rms(df["Vibration X (mm/s)"])
-    feat['Vib_RMS_Y'] = rms(df["Vibration Y (mm/s)"])
-    feat['Vib_RMS_Z'] = rms(df["Vibration Z (mm/s)"])
+    # Analyses run for clients that do not plot have no PSD
+    if options["psd"] and analysis.get("Pxx") is not None:
+        data["psd"] = psd_payload(analysis["f"], analysis["Pxx"], options)
+    data["features"] = analysis["features"]
+    return data
 
-    feat['Vib_P2P_X'] = p2p(df["Vibration X (mm/s)"])
-    feat['Vib_P2P_Y'] = p2p(df["Vibration Y (mm/s)"])
-    feat['Vib_P2P_Z'] = p2p(df["Vibration Z (mm/s)"])
 
-    feat['Vib_FFT_Peak_Freq'] , feat['Vib_FFT_Peak_Amp'] = fft_peak(
-        df["Vibration X (mm/s)"]
+# ---------------- Feature Extraction ----------------
+# The analysis steps themselves (features, HOTFIX, prediction, RUL, PSD)
+# live in pipeline.py and are shared by every route.
+def compute_stream(stream, model):
+    """
+    Streaming counterpart of the pipeline's feature and PSD stages: reads
+    the CSV in chunks and returns a pipeline state seeded with the raw
+    features, sample count and PSD, without ever holding the full capture
+    in memory.
+    """
+    # Windowed models fold the FFT peak per window and need no raw channel
+    pipeline = pipeline_for(model)
+    stats = ingest_csv(
+        stream,
+        keep_fft_channel=not model.legacy_features and pipeline.window is None,
+        window=pipeline.window,
+        stride=pipeline.stride
     )
+    if stats.count == 0:
+        raise ValueError(NO_SAMPLES)
+    f, Pxx = stats.psd.snapshot()
 
-    # ---- Magnetic ----
-    feat['Mag_RMS_X'] = rms(df["MLX90393 X (mT)"])
-    feat['Mag_RMS_Y'] = rms(df["MLX90393 Y (mT)"])
-    feat['Mag_RMS_Z'] = rms(df["MLX90393 Z (mT)"])
-
-    feat['Mag_P2P_X'] = p2p(df["MLX90393 X (mT)"])
-    feat['Mag_P2P_Y'] = p2p(df["MLX90393 Y (mT)"])
-    feat['Mag_P2P_Z'] = p2p(df["MLX90393 Z (mT)"])
-
-    features_df = pd.DataFrame([feat])
-
-    # 🔥 Align with model expected columns automatically
-    expected_cols = clf.feature_names_in_
-
-    # Add missing features
-    for col in expected_cols:
-        if col not in features_df.columns:
-            features_df[col] = 0
-
-    # Remove extra features
-    features_df = features_df[expected_cols]
-
-    # ---------------------------------------------------------
-    # 🩹 HOTFIX: The model was trained on single-sample rows,
-    # so P2P and Freq features were effectively 0 in the Normal Centroid.
-    # We must zero them out here to make the Deviation meaningful (comparable to Centroid),
-    # otherwise real P2P values cause massive deviation and minimal RUL.
-    # ---------------------------------------------------------
-    for col in features_df.columns:
-        if "P2P" in col or "Freq" in col:
-            features_df[col] = 0.0
-        # Also, FFT Peak Amp was just |x| (same as RMS) in training. 
-        # But we'll leave it or set it to RMS?
-        # Leaving it as 0 might be safer if we want to rely on RMS mainly.
-        # But the Centroid has Peak_Amp approx equal to RMS.
-        # Let's set Peak_Amp to be same as RMS to match Centroid behavior
-        if "Peak_Amp" in col:
-             # Find corresponding RMS col? 
-             # Vib_FFT_Peak_Amp corresponds to Vib X.
-             if "Vib" in col:
-                 features_df[col] = features_df["Vib_RMS_X"] # Approx match
-    
-    return features_df
+    # The raw series is not kept in streaming mode
+    return {
+        "raw": stats.raw_features(),
+        "sample_count": stats.count,
+        "index": None,
+        "series": None,
+        "f": f,
+        "Pxx": Pxx
+    }
 
 
-# ---------------- RUL Calculation ----------------
-def map_deviation_to_rul(dev, dev_ref=1.0, max_years=25):
-    k = 0.55
-    frac = 1 / (1 + k * (dev / (dev_ref + 1e-9)))
-    frac = max(0.05, frac)
+def wants_stream():
+    """Streaming ingestion is opt-in via ?stream=1 (or a stream form field)."""
+    return request_option("stream") in ("1", "true", "yes")
 
-    days = frac * max_years * 365
-    years = int(days // 365)
-    months = int((days % 365) // 30)
 
-    return years, months, frac
+def fill_psd(analysis, model, options):
+    """
+    The analysis with the PSD added, when it was run without one and this
+    client plots it; otherwise the analysis itself. A cached analysis is
+    shared by concurrent requests, so the PSD goes into a copy.
+    """
+    if options["psd"] and analysis.get("Pxx") is None and analysis["series"] is not None:
+        analysis = dict(analysis, timings=dict(analysis["timings"]))
+        pipeline_for(model).run(analysis, PSD_OUTPUTS)
+        record_stage("psd", analysis["timings"]["psd"])
+    return analysis
 
 
-def get_health_status(frac, fault_label):
-    health = frac * 100
+def cached_analysis(cache_key, model, options):
+    """
+    The cached analysis of an upload (None on a miss), with its PSD filled in
+    for this client; a filled-in copy replaces the cached entry.
+    """
+    analysis = result_cache.get(cache_key)
+    if analysis is not None:
+        filled = fill_psd(analysis, model, options)
+        if filled is not analysis:
+            result_cache.put(cache_key, filled)
+        analysis = filled
+    return analysis
 
-    if health < 25:
-        return "critical"
-    elif health < 75:
-        return "warning"
-    else:
-        return "normal"
+
+# ---------------- Upload Analysis ----------------
+# Uploads up to INLINE_MAX_BYTES (~5k rows) are analysed in the request
+# thread, where the round trip to another process would cost more than it
+# saves. Larger ones go to a bounded process pool so they cannot stall the
+# worker; when the pool is full the routes answer 503.
+INLINE_MAX_BYTES = int(os.environ.get("INLINE_MAX_BYTES", 256 * 1024))
+
+# Pool processes per server process; by default the cores are split
+# between the gunicorn workers (WEB_CONCURRENCY). 0 keeps everything inline.
+ANALYSIS_WORKERS = int(os.environ.get(
+    "ANALYSIS_WORKERS",
+    max(1, (os.cpu_count() or 1) // int(os.environ.get("WEB_CONCURRENCY", 1)))
+))
+analysis_pool = AnalysisPool(
+    workers=ANALYSIS_WORKERS,
+    max_pending=int(os.environ.get("ANALYSIS_QUEUE", 2 * max(ANALYSIS_WORKERS, 1))),
+    timeout=float(os.environ.get("ANALYSIS_TIMEOUT", 60)),
+    # Pool processes import app (and map the model) once, in the forkserver
+    preload=["app"]
+)
+
+
+class CSVReadError(ValueError):
+    """The upload could not be parsed as a sensor CSV (answered with 400)."""
+
+
+# Same message on the loaded and streaming paths
+NO_SAMPLES = "No complete sensor rows in upload."
+
+
+_task_models = {}
 
 
-# ---------------- ThingSpeak Integration ----------------
-def fetch_thingspeak_data(channel_id, api_key=None, result_limit=100):
+def model_for_version(version):
+    """The model an analysis task was submitted with, also inside pool processes."""
+    if model is not None and model.version == version:
+        return model
+
+    # Another version (a swap happened since submission); keep only the latest one
+    task_model = _task_models.get(version)
+    if task_model is None:
+        task_model = load_pickled(*MODEL_FILES) if version == "pickle" else model_store.load(version)
+        _task_models.clear()
+        _task_models[version] = task_model
+    return task_model
+
+
+def analyze_upload(source, streaming, version, psd=True):
     """
-    Fetches the last N results from a ThingSpeak channel.
-    Returns a pandas DataFrame with columns mapped to sensor names.
+    Full analysis of one upload (a path, or a stream when run inline).
+    Runs in the request thread or in an analysis_pool process.
+    psd=False skips the PSD of a fully loaded upload.
     """
-    url = f"https://api.thingspeak.com/channels/{channel_id}/feeds.json?results={result_limit}"
-    if api_key:
-        url += f"&api_key={api_key}"
+    model = model_for_version(version)
 
+    if streaming:
+        # Large captures: read in chunks, never hold the full series
+        start = time.perf_counter()
+        try:
+            if isinstance(source, str):
+                with open(source, "rb") as stream:
+                    state = compute_stream(stream, model)
+            else:
+                state = compute_stream(source, model)
+        except Exception as e:
+            raise CSVReadError(str(e)) from e
+        state["timings"] = {"ingest": time.perf_counter() - start}
+        return pipeline_for(model).analyze(state)
+
+    # Timed here and returned with the analysis: this may run in a pool process
+    start = time.perf_counter()
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        feeds = data.get("feeds", [])
-        
-        if not feeds:
-            raise ValueError("No data found in ThingSpeak channel.")
+        df = read_sensor_csv(source)
+    except Exception as e:
+        raise CSVReadError(str(e)) from e
+    if not df.notna().all(axis=1).any():
+        raise CSVReadError(NO_SAMPLES)
+    timings = {"read_csv": time.perf_counter() - start}
 
-        df = pd.DataFrame(feeds)
-        
-        # Mapping based on user input
-        # Field 1,2,3 -> Magnetic X, Y, Z
-        # Field 4,5,6 -> Vibration X, Y, Z
-        rename_map = {
-            "field1": "MLX90393 X (mT)",
-            "field2": "MLX90393 Y (mT)",
-            "field3": "MLX90393 Z (mT)",
-            "field4": "Vibration X (mm/s)",
-            "field5": "Vibration Y (mm/s)",
-            "field6": "Vibration Z (mm/s)"
-        }
-        
-        df = df.rename(columns=rename_map)
-        
-        # Ensure numeric types
-        for col in rename_map.values():
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # Drop rows with NaN if any
-        df = df.dropna()
-        
-        return df, data.get("channel", {})
+    # 1️⃣ Feature Extraction ... 4️⃣ PSD, see pipeline.py
+    return pipeline_for(model).analyze({"df": df, "timings": timings}, psd=psd)
+
+
+def analyze_path(path, streaming, version, timeout=None, psd=True):
+    """Analyses a saved upload: inline when small, in the analysis pool otherwise."""
+    if os.path.getsize(path) <= INLINE_MAX_BYTES:
+        return analyze_upload(path, streaming, version, psd)
+    return analysis_pool.run(analyze_upload, path, streaming, version, psd, timeout=timeout)
+
+
+def retain_upload(file, digest):
+    """Path of the retained copy of an upload, or None when retention is off."""
+    if upload_store is None:
+        return None
+    with timed("retain"):
+        return upload_store.retain(file.stream, digest)
+
+
+def run_upload_analysis(model, file, streaming, digest, psd=True):
+    """
+    Analyses an uploaded file inline or in the pool depending on its size.
+    Raises CSVReadError, PoolSaturated, AnalysisTimeout or processing errors.
+    """
+    retained = retain_upload(file, digest)
+
+    # Parsed straight from the request stream, no copy on disk
+    if upload_size(file.stream) <= INLINE_MAX_BYTES:
+        return analyze_upload(file.stream, streaming, model.version, psd)
+
+    # Pool processes read the capture from disk: the retained copy, else a
+    # private temporary one
+    if retained is not None:
+        return analyze_path(retained, streaming, model.version, psd=psd)
+
+    with timed("save"):
+        path = temporary_copy(file.stream)
+    try:
+        return analysis_pool.run(analyze_upload, path, streaming, model.version, psd)
+    finally:
+        os.remove(path)
 
-    except Exception as e:
-        print(f"Error fetching ThingSpeak data: {e}")
-        return None, None
+
+# ---------------- Similarity Index ----------------
+# Opt-in: with SIMILARITY_INDEX_DIR set, every freshly analysed window is
+# added to a persistent nearest-neighbour index (see similarity_index.py)
+# and responses list the most similar past windows beside the prediction
+SIMILARITY_INDEX_DIR = os.environ.get("SIMILARITY_INDEX_DIR")
+SIMILARITY_K = int(os.environ.get("SIMILARITY_K", 5))
+# Approximate search: neighbours within (1 + eps) of the true distances
+SIMILARITY_EPS = float(os.environ.get("SIMILARITY_EPS", 0.5))
+
+_similarity_indexes = {}
+_similarity_lock = threading.Lock()
+
+
+def similarity_index_for(model):
+    """The index of the model's feature space, or None when it is off or unusable."""
+    if not SIMILARITY_INDEX_DIR:
+        return None
+
+    names = tuple(model.feature_names)
+    with _similarity_lock:
+        if names not in _similarity_indexes:
+            try:
+                _similarity_indexes[names] = SimilarityIndex(SIMILARITY_INDEX_DIR, names)
+            except (OSError, ValueError) as e:
+                print(f"Similarity index disabled: {e}")
+                _similarity_indexes[names] = None
+        return _similarity_indexes[names]
+
+
+def similar_windows(model, vectors, faults):
+    """
+    The SIMILARITY_K most similar past windows of each feature vector; the
+    vectors are added to the index afterwards. One list per vector, empty
+    when the index is off (a failing index never fails a prediction).
+    """
+    index = similarity_index_for(model)
+    if index is None:
+        return [[] for _ in faults]
+
+    try:
+        with timed("similar"):
+            distances, labels, times = index.query(vectors, SIMILARITY_K, SIMILARITY_EPS)
+            index.insert(vectors, list(faults))
+    except (OSError, ValueError) as e:
+        print(f"Similarity lookup failed: {e}")
+        return [[] for _ in faults]
+
+    return [
+        [
+            {"fault": label, "distance": round(distance, 4), "timestamp": round(timestamp, 3)}
+            for distance, label, timestamp in zip(row_distances, row_labels, row_times)
+        ]
+        for row_distances, row_labels, row_times in zip(distances.tolist(), labels.tolist(), times.tolist())
+    ]
+
+
+def add_similar(analysis, model):
+    """Adds the similar past windows of a fresh single-capture analysis to it."""
+    vector = [[analysis["features"][name] for name in model.feature_names]]
+    analysis["similar"] = similar_windows(model, vector, [analysis["prediction"]["fault"]])[0]
+
+
+metrics.callback(
+    "motor_similarity_vectors", "Feature vectors in the similarity index.",
+    lambda: {(): len(index) for index in _similarity_indexes.values() if index is not None}
+)
+
+
+# ---------------- Jobs ----------------
+# Long analyses as background jobs (see jobs.py): POST /api/jobs answers at
+# once with a job id, clients poll /api/jobs/<id> and then fetch
+# /api/jobs/<id>/result. Jobs live in SQLite so any worker can answer.
+JOBS_DIR = os.path.join(app.config['UPLOAD_FOLDER'], "jobs")
+
+# Jobs may take longer than a request could; PoolSaturated is retried, not failed
+JOB_TIMEOUT = float(os.environ.get("JOB_TIMEOUT", 600))
+JOB_RETRY_DELAY = 1.0
+
+job_store = JobStore(
+    os.environ.get("JOBS_DB", os.path.join(JOBS_DIR, "jobs.sqlite3")),
+    ttl=int(os.environ.get("JOB_TTL", 3600))
+)
+job_runner = JobRunner(
+    job_store,
+    workers=int(os.environ.get("JOB_WORKERS", 2)),
+    max_queued=int(os.environ.get("JOB_QUEUE", 32))
+)
+
+
+def run_job(path, streaming, version, cache_key, remove=True):
+    """
+    Job body: analyses the saved upload and caches the result like
+    /api/predict. The upload is deleted afterwards unless remove=False
+    (a retained upload).
+    """
+    try:
+        while True:
+            try:
+                analysis = analyze_path(path, streaming, version, timeout=JOB_TIMEOUT)
+                break
+            except PoolSaturated:
+                time.sleep(JOB_RETRY_DELAY)
+    except CSVReadError as e:
+        raise JobFailed(f"CSV Read Error: {e}", 400)
+    except AnalysisTimeout as e:
+        raise JobFailed(f"Processing Error: {e}", 504)
+    finally:
+        if remove:
+            os.remove(path)
+
+    record_analysis(analysis, "api_submit_job")
+    add_similar(analysis, model_for_version(version))
+    result_cache.put(cache_key, analysis)
+    return analysis
+
+
+def job_payload(job):
+    """Status block of a job as returned by the job routes."""
+    payload = {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "created": job["created"],
+        "updated": job["updated"],
+        "status_url": url_for("api_job_status", job_id=job["job_id"]),
+        "result_url": url_for("api_job_result", job_id=job["job_id"])
+    }
+    if job["status"] == FAILED:
+        payload["error"] = job["error"]
+    return payload
+
+
+# ---------------- Warm-up ----------------
+# Rows in the synthetic capture warm_up() runs (one default PSD segment)
+WARM_UP_ROWS = 256
+
+
+def warm_up():
+    """
+    Runs one synthetic capture through features, prediction and PSD so that
+    first-call costs (lazy library initialisation, first touch of the model
+    pages) are paid before serving. gunicorn.conf.py calls this in the
+    master so forked workers inherit the warm state.
+    """
+    model = current_model()
+    if model is None:
+        return
+
+    t = np.arange(WARM_UP_ROWS)
+    df = pd.DataFrame(np.sin(np.outer(t, np.arange(1, 7)) * 0.1), columns=SENSOR_COLUMNS)
+    pipeline_for(model).analyze({"df": df})
+    # Opening the index builds its segment trees, which workers then share
+    similarity_index_for(model)
 
 
 # ---------------- Routes ----------------
@@ -205,66 +710,68 @@ def index():
 
     if request.method == "POST":
 
-        if clf is None or le is None or normal_centroid is None:
+        model = current_model()
+        if model is None:
             return "Model files missing!", 500
 
         file = request.files.get("file")
         if not file or file.filename == "":
             return "No file selected", 400
 
-        path = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(path)
-
-        try:
-            df = pd.read_csv(path)
-        except Exception as e:
-            return f"CSV Read Error: {e}", 400
+        streaming = wants_stream()
+        options = chart_options(DASHBOARD_POINTS)
+        options["psd"] = True  # the dashboard always plots it
+
+        with timed("digest"):
+            digest = upload_digest(file.stream)
+        cache_key = result_cache.key(digest, streaming, model.version)
+        analysis = cached_analysis(cache_key, model, options)
+
+        if analysis is None:
+            try:
+                analysis = run_upload_analysis(model, file, streaming, digest)
+            except CSVReadError as e:
+                return f"CSV Read Error: {e}", 400
+            except PoolSaturated:
+                return "Server busy, please retry shortly", 503, {"Retry-After": "5"}
+            except AnalysisTimeout as e:
+                return f"Processing Error: {e}", 504
+            except Exception as e:
+                return f"Processing Error: {e}", 500
+
+            record_analysis(analysis, "index")
+            add_similar(analysis, model)
+            result_cache.put(cache_key, analysis)
 
         try:
-            # 1️⃣ Feature Extraction
-            features_df = compute_features(df)
-            features_dict = features_df.iloc[0].round(4).to_dict()
-
-            # 2️⃣ Prediction
-            prediction_raw = clf.predict(features_df)[0]
-            pred_label = le.inverse_transform([prediction_raw])[0]
-
-            # 3️⃣ Deviation & RUL
-            test_features = features_df.values.flatten()
-            dev = float(np.linalg.norm(test_features - normal_centroid.flatten()))
-            dev_ref = max(np.linalg.norm(normal_centroid.flatten()) * 0.15, 1.0)
-
-            years, months, frac = map_deviation_to_rul(dev, dev_ref)
-            health_status = get_health_status(frac, pred_label)
-
-            # 4️⃣ PSD for Plot
-            f_vib, P_vib = psd(df["Vibration X (mm/s)"])
-            f_mag, P_mag = psd(df["MLX90393 X (mT)"])
-
-            return render_template(
-                "dashboard.html",
-                final_fault=pred_label,
-                final_rul=f"{years} years {months} months",
-                health_frac=int(frac * 100),
-                health_status=health_status,
-                dev=round(dev, 2),
-                samples=df.index.tolist(),
-                vib_data=[
-                    df["Vibration X (mm/s)"].tolist(),
-                    df["Vibration Y (mm/s)"].tolist(),
-                    df["Vibration Z (mm/s)"].tolist()
-                ],
-                mag_data=[
-                    df["MLX90393 X (mT)"].tolist(),
-                    df["MLX90393 Y (mT)"].tolist(),
-                    df["MLX90393 Z (mT)"].tolist()
-                ],
-                f_vib=f_vib.tolist(),
-                P_vib=P_vib.tolist(),
-                f_mag=f_mag.tolist(),
-                P_mag=P_mag.tolist(),
-                features=features_dict
-            )
+            prediction = analysis["prediction"]
+
+            # The raw series is not kept in streaming mode, so no time plots
+            if analysis["series"] is not None:
+                series = series_payload(analysis["index"], analysis["series"], options)
+            else:
+                empty = {"x": [], "y": [], "z": []}
+                series = {"samples": [], "vibration": empty, "magnetic": empty}
+
+            f, Pxx = analysis["f"], analysis["Pxx"]
+
+            with timed("render"):
+                return render_template(
+                    "dashboard.html",
+                    final_fault=prediction["fault"],
+                    final_rul=prediction["rul"],
+                    health_frac=prediction["health_percentage"],
+                    health_status=prediction["health_status"],
+                    dev=prediction["deviation"],
+                    samples=series["samples"],
+                    vib_data=[series["vibration"][axis] for axis in ("x", "y", "z")],
+                    mag_data=[series["magnetic"][axis] for axis in ("x", "y", "z")],
+                    f_vib=f.tolist(),
+                    P_vib=Pxx[:, 0:3].T.tolist(),
+                    f_mag=f.tolist(),
+                    P_mag=Pxx[:, 3:6].T.tolist(),
+                    features=analysis["features"]
+                )
 
         except Exception as e:
             return f"Processing Error: {e}", 500
@@ -296,11 +803,30 @@ def download_test_file(filename):
 
 
 # ---------------- API Endpoint for Mobile App ----------------
+@app.route("/api/cache_stats", methods=["GET"])
+def api_cache_stats():
+    """Hit/miss counters of the upload result cache"""
+    return jsonify(result_cache.stats()), 200
+
+
+@app.route("/api/pool_stats", methods=["GET"])
+def api_pool_stats():
+    """Queue depth and counters of the analysis process pool"""
+    return jsonify(analysis_pool.stats()), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Latency histograms, payload sizes and cache counters (Prometheus text format)"""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
 @app.route("/api/predict", methods=["POST"])
 def api_predict():
     """API endpoint for mobile app - returns JSON response"""
     
-    if clf is None or le is None or normal_centroid is None:
+    model = current_model()
+    if model is None:
         return jsonify({"error": "Model files missing!"}), 500
     
     # Get file and motor details
@@ -313,83 +839,268 @@ def api_predict():
     hp = request.form.get("hp", "0")
     voltage = request.form.get("voltage", "0")
     
-    # Save and process file
-    path = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-    file.save(path)
-    
+    streaming = wants_stream()
+    options = chart_options()
+
+    with timed("digest"):
+        digest = upload_digest(file.stream)
+    cache_key = result_cache.key(digest, streaming, model.version)
+    analysis = cached_analysis(cache_key, model, options)
+
+    if analysis is None:
+        # Small files inline, large ones in the analysis pool
+        try:
+            analysis = run_upload_analysis(model, file, streaming, digest, options["psd"])
+        except CSVReadError as e:
+            return jsonify({"error": f"CSV Read Error: {str(e)}"}), 400
+        except PoolSaturated:
+            return jsonify({"error": "Server busy, please retry shortly"}), 503, {"Retry-After": "5"}
+        except AnalysisTimeout as e:
+            return jsonify({"error": f"Processing Error: {str(e)}"}), 504
+        except Exception as e:
+            return jsonify({"error": f"Processing Error: {str(e)}"}), 500
+
+        record_analysis(analysis, "api_predict")
+        add_similar(analysis, model)
+        result_cache.put(cache_key, analysis)
+
     try:
-        df = pd.read_csv(path)
+        with timed("payload"):
+            data = analysis_data(analysis, options)
     except Exception as e:
-        return jsonify({"error": f"CSV Read Error: {str(e)}"}), 400
-    
+        return jsonify({"error": f"Processing Error: {str(e)}"}), 500
+
+    # Return JSON response (or a binary frame, see binary_format.py)
+    return api_response({
+        "success": True,
+        "motor_info": {
+            "motor_type": motor_type,
+            "phase_type": phase_type,
+            "hp": hp,
+            "voltage": voltage
+        },
+        "prediction": analysis["prediction"],
+        "similar": analysis.get("similar", []),
+        "data": data
+    }, 200)
+
+
+# ---------------- Analysis Jobs ----------------
+@app.route("/api/jobs", methods=["POST"])
+def api_submit_job():
+    """
+    Starts an analysis job for an uploaded CSV (same form fields as
+    /api/predict) and answers 202 with the job id straight away.
+    """
+    model = current_model()
+    if model is None:
+        return jsonify({"error": "Model files missing!"}), 500
+
+    file = request.files.get("file")
+    if not file or file.filename == "":
+        return jsonify({"error": "No file selected"}), 400
+
+    motor_info = {
+        "motor_type": request.form.get("motor_type", "Unknown"),
+        "phase_type": request.form.get("phase_type", "Unknown"),
+        "hp": request.form.get("hp", "0"),
+        "voltage": request.form.get("voltage", "0")
+    }
+    streaming = wants_stream()
+
+    job_store.purge()
+
+    with timed("digest"):
+        digest = upload_digest(file.stream)
+    cache_key = result_cache.key(digest, streaming, model.version)
+    job_key = f"{cache_key}:{json.dumps(motor_info, sort_keys=True)}"
+
+    # A retried submission of the same upload joins the existing job
+    job_id = job_store.find(job_key)
+    if job_id is None:
+        job_id = job_store.create(job_key, {"motor_info": motor_info})
+
+        # Job results always carry the PSD; the result request picks the options
+        analysis = cached_analysis(cache_key, model, {"psd": True})
+        if analysis is not None:
+            job_store.finish(job_id, analysis)
+        else:
+            # The request stream is gone once the response is sent, so the job
+            # reads the retained copy or its own file under JOBS_DIR
+            path = retain_upload(file, digest)
+            remove = path is None
+            if remove:
+                os.makedirs(JOBS_DIR, exist_ok=True)
+                path = os.path.join(JOBS_DIR, f"{job_id}.csv")
+                file.save(path)
+
+            try:
+                job_runner.submit(job_id, run_job, path, streaming, model.version, cache_key, remove)
+            except JobQueueFull:
+                if remove:
+                    os.remove(path)
+                job_store.fail(job_id, "Server busy, please retry shortly", 503)
+                return jsonify({"error": "Server busy, please retry shortly"}), 503, {"Retry-After": "5"}
+
+    payload = job_payload(job_store.get(job_id))
+    return jsonify(payload), 202, {"Location": payload["status_url"]}
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job_status(job_id):
+    """Status of an analysis job: queued, running, done or failed"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job_payload(job)), 200
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def api_job_result(job_id):
+    """
+    Result of a finished job, in the /api/predict response format (chart
+    options and binary frames included). 202 while it is still running.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+
+    if job["status"] == FAILED:
+        return jsonify({"error": job["error"], "job_id": job_id}), job["status_code"] or 500
+
+    if job["status"] != DONE:
+        return jsonify(job_payload(job)), 202
+
+    analysis = job_store.result(job_id)
+    if analysis is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+
     try:
-        # 1️⃣ Feature Extraction
-        features_df = compute_features(df)
-        features_dict = features_df.iloc[0].round(4).to_dict()
-        
-        # 2️⃣ Prediction
-        prediction_raw = clf.predict(features_df)[0]
-        pred_label = le.inverse_transform([prediction_raw])[0]
-        
-        # 3️⃣ Deviation & RUL
-        test_features = features_df.values.flatten()
-        dev = float(np.linalg.norm(test_features - normal_centroid.flatten()))
-        dev_ref = max(np.linalg.norm(normal_centroid.flatten()) * 0.15, 1.0)
-        
-        years, months, frac = map_deviation_to_rul(dev, dev_ref)
-        health_status = get_health_status(frac, pred_label)
-        
-        # 4️⃣ PSD for Plot
-        f_vib, P_vib = psd(df["Vibration X (mm/s)"])
-        f_mag, P_mag = psd(df["MLX90393 X (mT)"])
-        
-        # Return JSON response
-        return jsonify({
-            "success": True,
-            "motor_info": {
-                "motor_type": motor_type,
-                "phase_type": phase_type,
-                "hp": hp,
-                "voltage": voltage
-            },
-            "prediction": {
-                "fault": pred_label,
-                "rul": f"{years} years {months} months",
-                "rul_years": years,
-                "rul_months": months,
-                "health_percentage": int(frac * 100),
-                "health_status": health_status,
-                "deviation": round(dev, 2)
-            },
-            "data": {
-                "samples": df.index.tolist(),
-                "vibration": {
-                    "x": df["Vibration X (mm/s)"].tolist(),
-                    "y": df["Vibration Y (mm/s)"].tolist(),
-                    "z": df["Vibration Z (mm/s)"].tolist()
-                },
-                "magnetic": {
-                    "x": df["MLX90393 X (mT)"].tolist(),
-                    "y": df["MLX90393 Y (mT)"].tolist(),
-                    "z": df["MLX90393 Z (mT)"].tolist()
-                },
-                "psd": {
-                    "vibration": {
-                        "frequency": f_vib.tolist(),
-                        "power": P_vib.tolist()
-                    },
-                    "magnetic": {
-                        "frequency": f_mag.tolist(),
-                        "power": P_mag.tolist()
-                    }
-                },
-                "features": features_dict
-            }
-        }), 200
-        
+        with timed("payload"):
+            data = analysis_data(analysis, chart_options())
     except Exception as e:
         return jsonify({"error": f"Processing Error: {str(e)}"}), 500
 
+    return api_response({
+        "success": True,
+        "job_id": job_id,
+        "motor_info": job["meta"].get("motor_info", {}),
+        "prediction": analysis["prediction"],
+        "similar": analysis.get("similar", []),
+        "data": data
+    }, 200)
+
+
+# ---------------- Batch Prediction ----------------
+def read_batch_uploads(files):
+    """
+    Expands uploaded files into (name, DataFrame) pairs.
+    Plain CSVs are read directly; zip archives contribute every CSV inside them.
+    Files that cannot be read are returned as (name, error message) instead.
+    """
+    frames = []
+    errors = []
+
+    for file in files:
+        if not file or file.filename == "":
+            continue
+
+        if file.filename.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(file.read()))
+            except zipfile.BadZipFile as e:
+                errors.append((file.filename, f"Zip Read Error: {e}"))
+                continue
+
+            with archive:
+                for member in archive.namelist():
+                    if member.endswith("/") or not member.lower().endswith(".csv"):
+                        continue
+                    try:
+                        with archive.open(member) as f:
+                            frames.append((member, read_sensor_csv(f)))
+                    except Exception as e:
+                        errors.append((member, f"CSV Read Error: {e}"))
+        else:
+            try:
+                frames.append((file.filename, read_sensor_csv(file.stream)))
+            except Exception as e:
+                errors.append((file.filename, f"CSV Read Error: {e}"))
+
+    return frames, errors
+
+
+def predict_batch(frames, model):
+    """
+    Scores many motors at once.
+    Raw features are stacked into one matrix so that prediction, the label
+    decoding and the centroid deviation each run a single time over all rows.
+    """
+    pipeline = pipeline_for(model)
+    names = []
+    raw_rows = []
+    errors = []
+
+    for name, df in frames:
+        try:
+            state = pipeline.run({"df": df}, ["raw"])
+            record_analysis(state)
+            raw_rows.append(state["raw"])
+            names.append(name)
+        except Exception as e:
+            errors.append((name, f"Processing Error: {e}"))
+
+    if not raw_rows:
+        return [], errors
+
+    state = pipeline.run({"raw": np.vstack(raw_rows)}, ["predictions", "feature_records"])
+    record_analysis(state)
+    similar = similar_windows(model, state["features_df"].to_numpy(), state["faults"])
+
+    results = [
+        {"file": name, "prediction": prediction, "features": features, "similar": neighbours}
+        for name, prediction, features, neighbours in zip(
+            names, state["predictions"], state["feature_records"], similar
+        )
+    ]
+    return results, errors
+
+
+@app.route("/api/predict_batch", methods=["POST"])
+def api_predict_batch():
+    """
+    Batch API endpoint - scores every CSV in one request.
+    Accepts any number of multipart "files" (and/or "file") parts; each part
+    may be a CSV or a zip archive of CSVs.
+    """
+    model = current_model()
+    if model is None:
+        return jsonify({"error": "Model files missing!"}), 500
+
+    files = request.files.getlist("files") + request.files.getlist("file")
+    with timed("read_csv"):
+        frames, read_errors = read_batch_uploads(files)
+
+    if not frames and not read_errors:
+        return jsonify({"error": "No file selected"}), 400
+
+    try:
+        results, errors = predict_batch(frames, model)
+    except Exception as e:
+        return jsonify({"error": f"Processing Error: {str(e)}"}), 500
+
+    errors = [
+        {"file": name, "error": message}
+        for name, message in read_errors + errors
+    ]
+
+    return jsonify({
+        "success": bool(results),
+        "count": len(results),
+        "results": results,
+        "errors": errors
+    }), 200
+
 
 @app.route("/api/predict_thingspeak", methods=["POST"])
 def api_predict_thingspeak():
@@ -397,7 +1108,8 @@ def api_predict_thingspeak():
     API endpoint to fetch data from ThingSpeak and return prediction.
     Expects JSON body: { "channel_id": "...", "api_key": "..." }
     """
-    if clf is None or le is None or normal_centroid is None:
+    model = current_model()
+    if model is None:
         return jsonify({"error": "Model files missing!"}), 500
 
     req_data = request.get_json()
@@ -406,68 +1118,264 @@ def api_predict_thingspeak():
 
     channel_id = req_data["channel_id"]
     api_key = req_data.get("api_key", None)
-    
-    # Fetch data
-    df, channel_info = fetch_thingspeak_data(channel_id, api_key)
-    
-    if df is None or df.empty:
-        return jsonify({"error": "Failed to fetch data from ThingSpeak or data is empty."}), 400
 
-    try:
-        # 1️⃣ Feature Extraction
-        features_df = compute_features(df)
-        features_dict = features_df.iloc[0].round(4).to_dict()
-        
-        # 2️⃣ Prediction
-        prediction_raw = clf.predict(features_df)[0]
-        pred_label = le.inverse_transform([prediction_raw])[0]
-        
-        # 3️⃣ Deviation & RUL
-        test_features = features_df.values.flatten()
-        dev = float(np.linalg.norm(test_features - normal_centroid.flatten()))
-        dev_ref = max(np.linalg.norm(normal_centroid.flatten()) * 0.15, 1.0)
-        
-        years, months, frac = map_deviation_to_rul(dev, dev_ref)
-        health_status = get_health_status(frac, pred_label)
-        
-        # 4️⃣ PSD for Plot
-        f_vib, P_vib = psd(df["Vibration X (mm/s)"])
-        f_mag, P_mag = psd(df["MLX90393 X (mT)"])
-        
-        return jsonify({
-            "success": True,
-            "channel_info": {
-                "name": channel_info.get("name", "Unknown"),
-                "id": channel_id
-            },
-            "prediction": {
-                "fault": pred_label,
-                "rul": f"{years} years {months} months",
-                "rul_years": years,
-                "rul_months": months,
-                "health_percentage": int(frac * 100),
-                "health_status": health_status,
-                "deviation": round(dev, 2)
-            },
-            "data": {
-                "samples": df.index.tolist(),
-                "vibration": {
-                    "x": df["Vibration X (mm/s)"].tolist(),
-                    "y": df["Vibration Y (mm/s)"].tolist(),
-                    "z": df["Vibration Z (mm/s)"].tolist()
-                },
-                "magnetic": {
-                    "x": df["MLX90393 X (mT)"].tolist(),
-                    "y": df["MLX90393 Y (mT)"].tolist(),
-                    "z": df["MLX90393 Z (mT)"].tolist()
+    # The monitor keeps a rolling window per channel and only fetches
+    # feeds newer than the last one it has seen
+    from monitor import get_monitor
+    monitor = get_monitor(channel_id, api_key)
+
+    with monitor.lock:
+        try:
+            with timed("thingspeak_fetch"):
+                monitor.poll()
+        except Exception as e:
+            print(f"Error fetching ThingSpeak data: {e}")
+            return jsonify({"error": "Failed to fetch data from ThingSpeak or data is empty."}), 400
+
+        if monitor.window.count == 0:
+            return jsonify({"error": "Failed to fetch data from ThingSpeak or data is empty."}), 400
+
+        # No new samples (and no new model) since the last analysis of this window
+        state = (monitor.version, model.version)
+        analysis = monitor.result if monitor.result_version == state else None
+
+        options = chart_options()
+
+        try:
+            if analysis is None:
+                # 1️⃣ Feature Extraction from the window's running sums while
+                # it fits in one model window; the raw series is only needed
+                # for the charts
+                pipeline = pipeline_for(model)
+                pipeline_state = {"df": monitor.frame()}
+                if pipeline.window is None or monitor.window.count < pipeline.window:
+                    pipeline_state["raw"] = monitor.window.raw_features()
+                analysis = pipeline.analyze(pipeline_state, psd=options["psd"])
+                record_analysis(analysis, "api_predict_thingspeak")
+                add_similar(analysis, model)
+                monitor.result, monitor.result_version = analysis, state
+            else:
+                analysis = monitor.result = fill_psd(analysis, model, options)
+
+            with timed("payload"):
+                data = analysis_data(analysis, options)
+
+            return api_response({
+                "success": True,
+                "channel_info": {
+                    "name": monitor.channel_info.get("name", "Unknown"),
+                    "id": channel_id
                 },
-                "features": features_dict
-            }
-        }), 200
+                "prediction": analysis["prediction"],
+                "similar": analysis.get("similar", []),
+                "data": data
+            }, 200)
+
+        except Exception as e:
+            return jsonify({"error": f"Processing Error: {str(e)}"}), 500
+
+
+# Feeds per channel a batch request may ask for (ThingSpeak's own limit)
+THINGSPEAK_MAX_RESULTS = 8000
+
+
+@app.route("/api/predict_thingspeak_batch", methods=["POST"])
+def api_predict_thingspeak_batch():
+    """
+    Polls many ThingSpeak channels concurrently and scores them in one batch.
+    Expects JSON body: { "channels": [{ "channel_id": "...", "api_key": "..." }, ...] }
+    """
+    model = current_model()
+    if model is None:
+        return jsonify({"error": "Model files missing!"}), 500
+
+    req_data = request.get_json(silent=True)
+    if not req_data or not req_data.get("channels"):
+        return jsonify({"error": "Missing channels"}), 400
+
+    try:
+        channels = [
+            (str(channel["channel_id"]), channel.get("api_key"))
+            for channel in req_data["channels"]
+        ]
+    except (KeyError, TypeError, AttributeError):
+        return jsonify({"error": "Each channel needs a channel_id"}), 400
+
+    results = req_data.get("results", 100)
+    if isinstance(results, str) and results.strip().isdigit():
+        results = int(results)
+    # bool is an int subclass; true/false are not counts
+    if type(results) is not int or not 0 < results <= THINGSPEAK_MAX_RESULTS:
+        return jsonify({"error": f"results must be an integer between 1 and {THINGSPEAK_MAX_RESULTS}"}), 400
+
+    from thingspeak_client import poll_channels
+    with timed("thingspeak_fetch"):
+        outcomes = poll_channels(channels, results=results)
+
+    frames = []
+    fetch_errors = []
+    for channel_id, outcome in outcomes.items():
+        if isinstance(outcome, Exception):
+            print(f"Error fetching ThingSpeak data: {outcome}")
+            fetch_errors.append((channel_id, "Failed to fetch data from ThingSpeak or data is empty."))
+        else:
+            frames.append((channel_id, outcome[0]))
+
+    try:
+        results, errors = predict_batch(frames, model)
+    except Exception as e:
+        return jsonify({"error": f"Processing Error: {str(e)}"}), 500
+
+    for result in results:
+        channel_info = outcomes[result["file"]][1]
+        result["channel_info"] = {
+            "name": channel_info.get("name", "Unknown"),
+            "id": result.pop("file")
+        }
+
+    return jsonify({
+        "success": bool(results),
+        "count": len(results),
+        "results": results,
+        "errors": [
+            {"channel_id": channel_id, "error": message}
+            for channel_id, message in fetch_errors + errors
+        ]
+    }), 200
+
+
+# ---------------- Fleet Health ----------------
+# Motors listed by /api/fleet_health unless the request asks for another count
+FLEET_TOP = int(os.environ.get("FLEET_TOP", "10"))
+
+
+def read_fleet_request(model):
+    """
+    (features_df, motor_ids, top) from a fleet request: JSON
+    {"features": [[...], ...], "motor_ids": [...], "feature_names": [...], "top": N}
+    or a multipart "file" CSV with a motor_id column and one column per feature.
+    Raises ValueError for a malformed request.
+    """
+    names = list(model.feature_names)
+    file = request.files.get("file")
 
+    if file and file.filename:
+        table = pd.read_csv(file.stream)
+        missing = [name for name in names if name not in table.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        matrix = table[names].to_numpy(dtype=np.float64)
+        motor_ids = table["motor_id"].to_numpy() if "motor_id" in table.columns else None
+        top = request.form.get("top", request.args.get("top", FLEET_TOP))
+    else:
+        body = request.get_json(silent=True)
+        if not body or "features" not in body:
+            raise ValueError("Missing features")
+        matrix = np.asarray(body["features"], dtype=np.float64)
+        columns = body.get("feature_names", names)
+        if matrix.ndim != 2 or matrix.shape[1] != len(columns):
+            raise ValueError(f"features must be rows of {len(columns)} values")
+        if set(columns) != set(names):
+            raise ValueError(f"feature_names must be {', '.join(names)}")
+        if columns != names:
+            matrix = matrix[:, [columns.index(name) for name in names]]
+        motor_ids = body.get("motor_ids")
+        # Ids are grouped on (pd.factorize): only flat scalars can be
+        if motor_ids is not None and not (
+            isinstance(motor_ids, list)
+            and all(isinstance(m, (str, int, float)) and not isinstance(m, bool) for m in motor_ids)
+        ):
+            raise ValueError("motor_ids must be a flat list of strings or numbers")
+        top = body.get("top", request.args.get("top", FLEET_TOP))
+
+    if len(matrix) == 0:
+        raise ValueError("No feature rows")
+    if not np.isfinite(matrix).all():
+        raise ValueError("features must be finite numbers")
+    if motor_ids is None:
+        # One window per motor, named by its row
+        motor_ids = np.arange(len(matrix))
+    elif len(motor_ids) != len(matrix):
+        raise ValueError("motor_ids must have one entry per feature row")
+    elif pd.isna(pd.Series(motor_ids, dtype=object)).any():
+        # Blank CSV cells, null or NaN: a motor without an id cannot be ranked
+        raise ValueError("motor_ids must not be missing or NaN")
+
+    top = int(top)
+    if top < 1:
+        raise ValueError("top must be at least 1")
+    return pd.DataFrame(matrix, columns=names), motor_ids, top
+
+
+def fleet_health(features_df, motor_ids, top, model):
+    """
+    Scores every motor-window at once and ranks motors by their worst
+    window. Only the listed motors' windows go through the classifier.
+    """
+    pipeline = pipeline_for(model)
+    state = pipeline.run({"features_df": features_df}, ["health"])
+    record_analysis(state)
+    health = state["health"]
+    devs = health["deviation"]
+
+    with timed("fleet_rank"):
+        # Object array: ids come back as plain Python values for the JSON
+        codes, names = pd.factorize(np.asarray(motor_ids, dtype=object))
+        windows = np.bincount(codes, minlength=len(names))
+
+        # Row of each motor's worst window: the first of its code in descending deviation order
+        order = np.argsort(-devs, kind="stable")
+        _, first = np.unique(codes[order], return_index=True)
+        worst = order[first]
+
+        ranked = worst[np.argsort(-devs[worst], kind="stable")[:top]]
+        statuses, counts = np.unique(health["health_status"][worst], return_counts=True)
+
+    faults = pipeline.run({"features_df": features_df.iloc[ranked]}, ["faults"])
+    record_analysis(faults)
+
+    records = prediction_records(faults["faults"], {key: values[ranked] for key, values in health.items()})
+    motors = [
+        dict(motor_id=names[codes[row]], windows=int(windows[codes[row]]), **record)
+        for row, record in zip(ranked.tolist(), records)
+    ]
+
+    return {
+        "motor_count": len(names),
+        "window_count": len(features_df),
+        "status_counts": {
+            **{status: 0 for status in ("normal", "warning", "critical")},
+            **{str(status): int(count) for status, count in zip(statuses, counts)}
+        },
+        "motors": motors
+    }
+
+
+@app.route("/api/fleet_health", methods=["POST"])
+def api_fleet_health():
+    """
+    Health of a whole fleet from its feature rows (one or more windows per
+    motor, in the feature order /api/predict reports). Returns the top-N
+    motors by deviation, each scored by its worst window, and the fleet's
+    status counts.
+    """
+    model = current_model()
+    if model is None:
+        return jsonify({"error": "Model files missing!"}), 500
+
+    try:
+        with timed("read_features"):
+            features_df, motor_ids, top = read_fleet_request(model)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        result = fleet_health(features_df, motor_ids, top, model)
     except Exception as e:
         return jsonify({"error": f"Processing Error: {str(e)}"}), 500
 
+    return jsonify(dict(success=True, **result)), 200
+
 
 if __name__ == "__main__":
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,91 @@
+"""
+Compares motors/second of the single-file /api/predict route against
+/api/predict_batch. Both paths compute the same outputs (predictions and
+features; the single route is asked for no PSD and no series) and the
+result cache is off, so every request is analysed. Run from the directory
+holding the model files:
+
+    python benchmark_batch.py --motors 200 --rows 240
+"""
+import argparse
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Before app is imported: repeated payloads must not be answered from the cache
+os.environ["RESULT_CACHE_SIZE"] = "0"
+
+from app import app  # noqa: E402
+from features import SENSOR_COLUMNS  # noqa: E402
+
+# Outputs /api/predict_batch returns: no PSD, no time series
+SINGLE_QUERY = "psd=0&raw=0"
+
+
+def make_csvs(n_motors, rows, seed=0):
+    """Builds n_motors synthetic CSV payloads with varying severity."""
+    rng = np.random.default_rng(seed)
+    payloads = []
+
+    for i in range(n_motors):
+        scale = rng.uniform(1.0, 5.0)
+        vib = rng.uniform(0.0, 2.0 * scale, (rows, 3))
+        mag = rng.uniform(-6.0 * scale, 6.0 * scale, (rows, 3))
+        df = pd.DataFrame(np.hstack([vib, mag]), columns=SENSOR_COLUMNS)
+        payloads.append((f"motor_{i:04d}.csv", df.to_csv(index=False).encode()))
+
+    return payloads
+
+
+def bench_single(client, payloads):
+    start = time.perf_counter()
+    for name, data in payloads:
+        response = client.post(
+            f"/api/predict?{SINGLE_QUERY}",
+            data={"file": (io.BytesIO(data), name)},
+            content_type="multipart/form-data",
+        )
+        assert response.status_code == 200, response.get_json()
+    return time.perf_counter() - start
+
+
+def bench_batch(client, payloads):
+    start = time.perf_counter()
+    response = client.post(
+        "/api/predict_batch",
+        data={"files": [(io.BytesIO(data), name) for name, data in payloads]},
+        content_type="multipart/form-data",
+    )
+    elapsed = time.perf_counter() - start
+    body = response.get_json()
+    assert response.status_code == 200 and body["count"] == len(payloads), body
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--motors", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=240)
+    args = parser.parse_args()
+
+    payloads = make_csvs(args.motors, args.rows)
+    client = app.test_client()
+
+    # Warm up both paths once
+    bench_single(client, payloads[:1])
+    bench_batch(client, payloads[:1])
+
+    single = bench_single(client, payloads)
+    batch = bench_batch(client, payloads)
+
+    print(f"Motors: {args.motors}, rows per motor: {args.rows}")
+    print(f"/api/predict       : {single:.3f} s  ({args.motors / single:.1f} motors/s)")
+    print(f"/api/predict_batch : {batch:.3f} s  ({args.motors / batch:.1f} motors/s)")
+    print(f"Speedup            : {single / batch:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
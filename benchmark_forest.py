@@ -0,0 +1,95 @@
+"""
+Compares clf.predict against CompiledForest (forest_engine.py): checks
+that both give identical predictions, then measures single-row latency
+and batch throughput. Run from the directory holding the model files:
+
+    python benchmark_forest.py --rows 10000 --repeat 200
+"""
+import argparse
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from forest_engine import compile_forest
+
+
+def make_rows(clf, n_rows, seed=0):
+    """Random feature rows spread over the range of each feature's split thresholds."""
+    rng = np.random.default_rng(seed)
+    n_features = len(clf.feature_names_in_)
+    lo = np.zeros(n_features)
+    hi = np.ones(n_features)
+
+    for f in range(n_features):
+        thresholds = np.concatenate([
+            est.tree_.threshold[est.tree_.feature == f] for est in clf.estimators_
+        ])
+        if len(thresholds):
+            span = thresholds.max() - thresholds.min()
+            lo[f] = thresholds.min() - 0.1 * span
+            hi[f] = thresholds.max() + 0.1 * span
+
+    return rng.uniform(lo, hi, (n_rows, n_features))
+
+
+def median_latency(fn, rows, repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(rows[i % len(rows)])
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="model_fault.pkl")
+    parser.add_argument("--rows", type=int, default=10000, help="rows for the equality check and batch timing")
+    parser.add_argument("--repeat", type=int, default=200, help="single-row predictions timed per engine")
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        clf = pickle.load(f)
+
+    start = time.perf_counter()
+    forest = compile_forest(clf)
+    compile_time = time.perf_counter() - start
+    if forest is None:
+        raise SystemExit(f"{type(clf).__name__} is not supported by forest_engine")
+
+    X = make_rows(clf, args.rows)
+    df = pd.DataFrame(X, columns=clf.feature_names_in_)
+
+    expected = clf.predict(df)
+    actual = forest.predict(X)
+    mismatches = int(np.sum(expected != actual))
+
+    # Single row exactly as the routes pass it: a one-row DataFrame
+    single_rows = [df.iloc[[i]] for i in range(min(args.repeat, args.rows))]
+    median_latency(clf.predict, single_rows, 5)
+    median_latency(lambda row: forest.predict(row.to_numpy()), single_rows, 5)
+
+    sklearn_single = median_latency(clf.predict, single_rows, args.repeat)
+    compiled_single = median_latency(lambda row: forest.predict(row.to_numpy()), single_rows, args.repeat)
+
+    start = time.perf_counter()
+    clf.predict(df)
+    sklearn_batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    forest.predict(X)
+    compiled_batch = time.perf_counter() - start
+
+    n_nodes = len(forest.feature)
+    print(f"Model: {len(clf.estimators_)} trees, {n_nodes} nodes, compiled in {compile_time * 1000:.1f} ms")
+    print(f"Predictions identical: {mismatches == 0} ({mismatches} mismatches over {args.rows} rows)")
+    print(f"Single row  sklearn  : {sklearn_single * 1000:.3f} ms")
+    print(f"Single row  compiled : {compiled_single * 1000:.3f} ms  ({sklearn_single / compiled_single:.1f}x)")
+    print(f"Batch {args.rows:>6} sklearn  : {args.rows / sklearn_batch:.0f} rows/s")
+    print(f"Batch {args.rows:>6} compiled : {args.rows / compiled_batch:.0f} rows/s  ({sklearn_batch / compiled_batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Measures server start-up: import time of app.py (libraries + model load)
+and time to the first prediction, each in a fresh interpreter. With
+--gunicorn it also starts the real server from gunicorn.conf.py, with and
+without preload_app, and reports time to the first answered prediction
+and the memory of master + workers. Run from the directory holding the
+model files:
+
+    python benchmark_startup.py --runs 3
+    python benchmark_startup.py --gunicorn --workers 4
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+
+import numpy as np
+import pandas as pd
+
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SENSOR_COLUMNS = [
+    "Vibration X (mm/s)",
+    "Vibration Y (mm/s)",
+    "Vibration Z (mm/s)",
+    "MLX90393 X (mT)",
+    "MLX90393 Y (mT)",
+    "MLX90393 Z (mT)",
+]
+
+# Runs in a fresh interpreter and prints its timings as JSON
+IN_PROCESS = r"""
+import io, json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+csv = open(sys.argv[1], "rb").read()
+client = app.app.test_client()
+timings = {"import": imported - start}
+for name in ("first_prediction", "second_prediction"):
+    t = time.perf_counter()
+    r = client.post("/api/predict", data={"file": (io.BytesIO(csv), "bench.csv")},
+                    content_type="multipart/form-data")
+    assert r.status_code == 200, r.data[:200]
+    timings[name] = time.perf_counter() - t
+timings["model"] = app.model.version if app.model else None
+print("TIMINGS " + json.dumps(timings))
+"""
+
+
+def make_csv(rows=240, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(rows, 6)), columns=SENSOR_COLUMNS)
+    return df.to_csv(index=False).encode()
+
+
+def run_in_process(csv_path):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    out = subprocess.run(
+        [sys.executable, "-c", IN_PROCESS, csv_path],
+        capture_output=True, text=True, env=env, check=True
+    ).stdout
+    line = next(l for l in out.splitlines() if l.startswith("TIMINGS "))
+    return json.loads(line[len("TIMINGS "):])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def multipart(csv):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="bench.csv"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+    ).encode() + csv + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def process_tree_pss(pid):
+    """Proportional set size (MiB) of pid and its children; None where /proc lacks it."""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+        total = 0
+        for p in pids:
+            with open(f"/proc/{p}/smaps_rollup") as f:
+                total += next(int(l.split()[1]) for l in f if l.startswith("Pss:"))
+        return total / 1024
+    except (OSError, StopIteration):
+        return None
+
+
+def run_gunicorn(csv, workers, preload, timeout=120):
+    port = free_port()
+    env = dict(
+        os.environ, PYTHONPATH=REPO_DIR, PORT=str(port),
+        WEB_CONCURRENCY=str(workers), GUNICORN_PRELOAD="1" if preload else "0"
+    )
+    cmd = [sys.executable, "-m", "gunicorn", "-c", os.path.join(REPO_DIR, "gunicorn.conf.py"),
+           "--bind", f"127.0.0.1:{port}", "app:app"]
+
+    body, content_type = multipart(csv)
+    start = time.perf_counter()
+    server = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        first = None
+        while time.perf_counter() - start < timeout:
+            try:
+                req = urllib.request.Request(
+                    f"http://127.0.0.1:{port}/api/predict", data=body,
+                    headers={"Content-Type": content_type}
+                )
+                with urllib.request.urlopen(req, timeout=timeout) as response:
+                    response.read()
+                first = time.perf_counter() - start
+                break
+            except OSError:
+                time.sleep(0.05)
+
+        if first is None:
+            raise RuntimeError("gunicorn did not answer a prediction in time")
+
+        # Let every worker finish booting before measuring memory
+        time.sleep(2.0)
+        return first, process_tree_pss(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per measurement")
+    parser.add_argument("--rows", type=int, default=240)
+    parser.add_argument("--gunicorn", action="store_true", help="also time the real gunicorn server")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    csv = make_csv(args.rows)
+    csv_path = os.path.abspath("benchmark_startup.csv")
+    with open(csv_path, "wb") as f:
+        f.write(csv)
+
+    try:
+        results = [run_in_process(csv_path) for _ in range(args.runs)]
+    finally:
+        os.remove(csv_path)
+
+    print(f"Model: {results[0]['model']}, {args.runs} fresh interpreters (median)")
+    for key, label in (("import", "Import app + load model"),
+                       ("first_prediction", "First prediction"),
+                       ("second_prediction", "Second prediction")):
+        print(f"{label:<24}: {np.median([r[key] for r in results]) * 1000:8.1f} ms")
+    total = np.median([r["import"] + r["first_prediction"] for r in results])
+    print(f"{'Start to first result':<24}: {total * 1000:8.1f} ms")
+
+    if args.gunicorn:
+        print(f"\ngunicorn, {args.workers} workers")
+        for preload in (False, True):
+            first, pss = run_gunicorn(csv, args.workers, preload)
+            memory = f", {pss:.0f} MiB PSS" if pss is not None else ""
+            print(f"preload_app={str(preload):<5}: first prediction after {first:.2f} s{memory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Reproducible end-to-end benchmark of the prediction service.
+
+For each dataset size (240 rows up to 10M by default) a synthetic capture
+is generated with the repo's generators (seeded, so every run sees the same
+data) and the following are timed in a fresh process:
+
+    compute_features   pipeline raw + features stages on the DataFrame
+    psd                pipeline PSD stage on the sensor series
+    predict            model.predict_codes on the feature row
+    api_predict        POST /api/predict through the Flask test client
+    api_predict_stream the same with ?stream=1 (chunked ingestion)
+
+Each measurement reports p50/p99 latency, throughput (rows/s at p50) and
+the peak RSS of the process so far. Results are written as JSON together
+with the library versions and git commit, and --compare prints the change
+against an earlier results file. Run from the directory holding the model
+files:
+
+    python benchmark_suite.py --sizes 240,10000,100000
+    python benchmark_suite.py --compare benchmark_results/<old>.json
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+DEFAULT_SIZES = (240, 10_000, 100_000, 1_000_000, 10_000_000)
+STAGES = ("compute_features", "psd", "predict", "api_predict", "api_predict_stream")
+DATASETS = ("varied", "conditions", "waveform")
+
+# Chart options of the route requests, as the mobile apps send them
+ROUTE_QUERY = "resolution=50"
+
+# Slower than the baseline by more than this factor is flagged by --compare
+REGRESSION_FACTOR = 1.2
+
+
+def make_dataset(kind, rows, seed):
+    """Seeded synthetic capture from test_data_generation_varied / data_creation / synthetic_data."""
+    rng = np.random.default_rng(seed)
+    if kind == "waveform":
+        import pandas as pd
+        from features import SENSOR_COLUMNS
+        from synthetic_data import motor_chunk, motor_params
+        params = motor_params("Front_bearing_damage", rng)
+        return pd.DataFrame(motor_chunk(params, rng, 0, rows, fs=100.0), columns=SENSOR_COLUMNS)
+
+    if kind == "conditions":
+        from data_creation import generate_data
+        return generate_data("Front_bearing_damage", rows, rng)
+
+    from test_data_generation_varied import make_frame
+    return make_frame(rows, vib_scale=2.0, mag_scale=2.0, rng=rng)
+
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def measure(fn, runs, budget):
+    """Latencies (s) of fn(): one warm-up call, then up to runs calls within ~budget seconds."""
+    start = time.perf_counter()
+    fn()
+    warm = time.perf_counter() - start
+    n = int(max(3, min(runs, budget / max(warm, 1e-9))))
+
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(stage, rows, latencies):
+    p50 = float(np.percentile(latencies, 50))
+    return {
+        "stage": stage,
+        "rows": rows,
+        "runs": len(latencies),
+        "p50_ms": p50 * 1000,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1000,
+        "mean_ms": float(np.mean(latencies)) * 1000,
+        "rows_per_second": rows / p50 if p50 > 0 else None,
+        "peak_rss_mib": peak_rss_mib()
+    }
+
+
+def run_size(rows, args, results_queue):
+    """Benchmarks one dataset size; runs in its own process so RSS is per size."""
+    try:
+        # Every request must really run: no result cache, everything in this process
+        os.environ["RESULT_CACHE_SIZE"] = "0"
+        os.environ.setdefault("ANALYSIS_WORKERS", str(args.pool_workers))
+
+        import app
+        from pipeline import PSD_OUTPUTS, pipeline_for
+
+        model = app.current_model()
+        if model is None:
+            raise RuntimeError("Model files missing; run from the directory holding them")
+        pipeline = pipeline_for(model)
+
+        df = make_dataset(args.dataset, rows, args.seed)
+        results = []
+
+        def record(stage, fn):
+            if stage in args.stages:
+                results.append(summarize(stage, rows, measure(fn, args.runs, args.budget)))
+
+        record("compute_features", lambda: pipeline.run({"df": df}, ["features_df"]))
+
+        series = pipeline.run({"df": df}, ["series"])["series"]
+        record("psd", lambda: pipeline.run({"series": series}, PSD_OUTPUTS))
+
+        features_df = pipeline.run({"df": df}, ["features_df"])["features_df"]
+        record("predict", lambda: model.predict_codes(features_df))
+
+        if {"api_predict", "api_predict_stream"} & set(args.stages):
+            csv = df.to_csv(index=False).encode()
+            del df, series
+            client = app.app.test_client()
+
+            def post(url):
+                response = client.post(url, data={"file": (io.BytesIO(csv), "bench.csv")},
+                                       content_type="multipart/form-data")
+                assert response.status_code == 200, response.get_data()[:200]
+
+            record("api_predict", lambda: post(f"/api/predict?{ROUTE_QUERY}"))
+            record("api_predict_stream", lambda: post(f"/api/predict?stream=1&{ROUTE_QUERY}"))
+
+        results_queue.put((rows, results, model.version))
+    except Exception as e:
+        results_queue.put((rows, f"{type(e).__name__}: {e}", None))
+
+
+def environment():
+    import pandas
+    import scipy
+    import sklearn
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "scipy": scipy.__version__,
+        "scikit_learn": sklearn.__version__
+    }
+
+
+def compare(report, baseline_path, factor):
+    with open(baseline_path) as f:
+        old_report = json.load(f)
+    baseline = {(r["stage"], r["rows"]): r for r in old_report["results"]}
+
+    print(f"\nAgainst {baseline_path} (p50)")
+    for key in ("dataset", "seed", "cpu_count", "model_version"):
+        if old_report.get(key) != report.get(key):
+            print(f"note: {key} differs ({old_report.get(key)} -> {report.get(key)})")
+
+    results = report["results"]
+    regressions = 0
+    for r in results:
+        old = baseline.get((r["stage"], r["rows"]))
+        if old is None:
+            continue
+        ratio = r["p50_ms"] / old["p50_ms"] if old["p50_ms"] else float("inf")
+        flag = "  REGRESSION" if ratio > factor else ""
+        regressions += bool(flag)
+        print(f"{r['stage']:<20} {r['rows']:>10,} rows: {old['p50_ms']:10.2f} -> {r['p50_ms']:10.2f} ms "
+              f"(x{ratio:.2f}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES),
+                        help="comma-separated row counts")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of " + ", ".join(STAGES))
+    parser.add_argument("--dataset", choices=DATASETS, default="varied")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=50, help="max timed runs per measurement")
+    parser.add_argument("--budget", type=float, default=10.0, help="seconds per measurement")
+    parser.add_argument("--pool-workers", type=int, default=0,
+                        help="analysis pool processes for the route (0 = analyse inline)")
+    parser.add_argument("--out", default=None, help="results file (default benchmark_results/<time>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_FACTOR)
+    args = parser.parse_args()
+
+    args.stages = [s for s in args.stages.split(",") if s]
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    sizes = [int(n) for n in args.sizes.split(",") if n]
+
+    # A fresh interpreter per size: no state or peak memory carried over
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    model_version = None
+
+    for rows in sizes:
+        results_queue = ctx.Queue()
+        proc = ctx.Process(target=run_size, args=(rows, args, results_queue))
+        proc.start()
+
+        while True:
+            try:
+                _, outcome, version = results_queue.get(timeout=1.0)
+                break
+            except queue.Empty:
+                # Killed (e.g. out of memory) before it could report
+                if not proc.is_alive():
+                    outcome, version = f"process exited with code {proc.exitcode}", None
+                    break
+        proc.join()
+
+        if isinstance(outcome, str):
+            print(f"{rows:>10,} rows: failed: {outcome}")
+            continue
+
+        model_version = version or model_version
+        for r in outcome:
+            results.append(r)
+            print(f"{r['stage']:<20} {rows:>10,} rows: p50 {r['p50_ms']:10.2f} ms  p99 {r['p99_ms']:10.2f} ms  "
+                  f"{r['rows_per_second'] or 0:14,.0f} rows/s  peak RSS {r['peak_rss_mib']:8.1f} MiB  "
+                  f"({r['runs']} runs)")
+
+    report = dict(environment(), model_version=model_version, dataset=args.dataset, seed=args.seed,
+                  results=results)
+
+    out = args.out or os.path.join("benchmark_results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    if args.compare and compare(report, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
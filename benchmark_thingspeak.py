@@ -0,0 +1,101 @@
+"""
+Measures ThingSpeak polling throughput (channels/second) against a local
+mock server: sequential blocking requests vs AsyncThingSpeakClient.
+
+    python benchmark_thingspeak.py --channels 500 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+from aiohttp import web
+
+from thingspeak_client import AsyncThingSpeakClient, make_session
+
+
+def make_feeds(n=100):
+    feeds = []
+    for i in range(n):
+        feed = {"entry_id": i + 1, "created_at": "2024-01-01T00:00:00Z"}
+        for field in range(1, 7):
+            feed[f"field{field}"] = f"{random.uniform(-5, 5):.4f}"
+        feeds.append(feed)
+    return feeds
+
+
+def start_mock_server(latency):
+    """Serves /channels/<id>/feeds.json on a random local port; returns its base URL."""
+    body = json.dumps({"channel": {"name": "mock"}, "feeds": make_feeds()})
+
+    async def feeds(request):
+        await asyncio.sleep(latency)
+        return web.Response(text=body, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/channels/{channel_id}/feeds.json", feeds)
+
+    ready = threading.Event()
+    state = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(app, access_log=None)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0, backlog=1024)
+        loop.run_until_complete(site.start())
+        state["port"] = site._server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return f"http://127.0.0.1:{state['port']}"
+
+
+def bench_sequential(base_url, channel_ids):
+    session = make_session()
+    start = time.perf_counter()
+    for channel_id in channel_ids:
+        response = session.get(f"{base_url}/channels/{channel_id}/feeds.json", params={"results": 100}, timeout=10)
+        response.raise_for_status()
+        response.json()
+    return time.perf_counter() - start
+
+
+def bench_async(base_url, channel_ids, concurrency):
+    async def run():
+        async with AsyncThingSpeakClient(base_url, concurrency=concurrency) as client:
+            outcomes = await client.fetch_many([(channel_id, None) for channel_id in channel_ids])
+        failed = [o for o in outcomes.values() if isinstance(o, Exception)]
+        assert not failed, failed[:3]
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--channels", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="mock server delay per request (s)")
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    base_url = start_mock_server(args.latency)
+    channel_ids = [str(100000 + i) for i in range(args.channels)]
+
+    sequential = bench_sequential(base_url, channel_ids)
+    concurrent = bench_async(base_url, channel_ids, args.concurrency)
+
+    print(f"Channels: {args.channels}, mock latency: {args.latency * 1000:.0f} ms")
+    print(f"Sequential requests : {sequential:.3f} s  ({args.channels / sequential:.1f} channels/s)")
+    print(f"Async client ({args.concurrency:>3})  : {concurrent:.3f} s  ({args.channels / concurrent:.1f} channels/s)")
+    print(f"Speedup             : {sequential / concurrent:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
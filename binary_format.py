@@ -0,0 +1,75 @@
+"""
+Packed binary response format for the mobile API.
+
+Clients opt in with `Accept: application/x-motor-frame`; JSON stays the
+default. A frame is little-endian:
+
+    4 bytes   magic b"MTRF"
+    4 bytes   uint32 header length H
+    H bytes   UTF-8 JSON header, space-padded so the arrays start 8-byte aligned
+    ...       array buffers, each padded to 8 bytes
+
+The header is the usual JSON response with every array replaced by
+{"$array": i}; header["$arrays"][i] holds its dtype, byte offset (from the
+end of the header) and length. Array bytes are copied straight from the
+NumPy buffers, with no per-element conversion.
+"""
+import json
+import struct
+
+import numpy as np
+
+
+FRAME_MIMETYPE = "application/x-motor-frame"
+MAGIC = b"MTRF"
+ALIGN = 8
+
+# Wire dtypes per response precision; sample indices always go as int32
+FLOAT_DTYPES = {"float32": "<f4", "float64": "<f8"}
+INDEX_DTYPE = "<i4"
+
+# Header names the JS decoder maps to typed arrays
+DTYPE_NAMES = {"<f4": "float32", "<f8": "float64", "<i4": "int32"}
+
+
+def pack_array(values, precision="float32"):
+    """Contiguous little-endian array ready to be written into a frame."""
+    values = np.asarray(values)
+    dtype = INDEX_DTYPE if values.dtype.kind in "iu" else FLOAT_DTYPES[precision]
+    return np.ascontiguousarray(values, dtype=dtype)
+
+
+def _padding(n):
+    return -n % ALIGN
+
+
+def pack_frame(body):
+    """Encodes a response dict whose leaves may be NumPy arrays as one frame."""
+    arrays = []
+
+    def extract(node):
+        if isinstance(node, np.ndarray):
+            arrays.append(node)
+            return {"$array": len(arrays) - 1}
+        if isinstance(node, dict):
+            return {key: extract(value) for key, value in node.items()}
+        if isinstance(node, (list, tuple)):
+            return [extract(value) for value in node]
+        return node
+
+    header = extract(body)
+
+    index, offset = [], 0
+    for arr in arrays:
+        index.append({"dtype": DTYPE_NAMES[arr.dtype.str], "offset": offset, "length": len(arr)})
+        offset += arr.nbytes + _padding(arr.nbytes)
+    header["$arrays"] = index
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * _padding(len(MAGIC) + 4 + len(header_bytes))
+
+    parts = [MAGIC, struct.pack("<I", len(header_bytes)), header_bytes]
+    for arr in arrays:
+        parts.append(memoryview(arr).cast("B"))
+        parts.append(b"\0" * _padding(arr.nbytes))
+    return b"".join(parts)
@@ -1,34 +1,214 @@
-import pandas as pd
-import numpy as np
+"""
+Builds the training dataset from the Excel captures in MOTOR_DATA.
+
+The dataset is a directory of Parquet files partitioned by condition,
+
+    combined_dataset/Condition=<condition>/<capture>.parquet
+    combined_dataset/_manifest.json
+
+with one file per capture and condition. The manifest records the size,
+mtime and SHA-256 of every capture that has been converted, so a run only
+parses workbooks that are new or changed (a touched file with identical
+content is not parsed again) and drops the files of captures that were
+removed. New workbooks are parsed in parallel across processes, through
+sensor_io.read_excel_cached. Writing Parquet needs pyarrow (a requirement
+of the training tools; the server falls back to pandas without it).
+
+model_training.py and extract_features.py read the dataset with
+sensor_io.read_dataset, loading only the columns (and conditions) they use.
+
+    python combine_data.py --data "E:\\VII th SEMESTER\\PROJECT\\MOTOR_DATA"
+    python combine_data.py --csv     # also write combined_dataset.csv
+"""
+import argparse
 import glob
+import hashlib
+import json
 import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+
+from sensor_io import read_dataset, read_excel_cached
+
 
 # Path where your Excel files are stored
-folder = r"E:\VII th SEMESTER\PROJECT\MOTOR_DATA"
+DEFAULT_FOLDER = r"E:\VII th SEMESTER\PROJECT\MOTOR_DATA"
+DATASET_DIR = "combined_dataset"
+# Leading underscore: Parquet readers skip it when scanning the dataset
+MANIFEST_FILE = "_manifest.json"
+MANIFEST_FORMAT = 1
+
+# Bytes hashed per read when fingerprinting a workbook
+HASH_CHUNK = 1 << 20
+
 
-# Read all .xlsx files
-files = glob.glob(os.path.join(folder, "*.xlsx"))
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-all_data = []
 
-for f in files:
-    df = pd.read_excel(f)
-    
+def clean_columns(columns):
     # Clean column names (remove spaces)
-    df.columns = [
-        c.strip().replace(" ", "_").replace("(", "").replace(")", "") 
-        for c in df.columns
+    return [
+        c.strip().replace(" ", "_").replace("(", "").replace(")", "")
+        for c in columns
     ]
-    
+
+
+def partition_dir(out_dir, condition):
+    return os.path.join(out_dir, f"Condition={str(condition).replace(os.sep, '_')}")
+
+
+def convert(path, out_dir, digest):
+    """
+    Parses one workbook and writes one Parquet file per condition in it.
+    Runs in a pool process; returns the capture's manifest entry.
+    """
+    # Columnar copy in <data>/.sensor_cache: rebuilding into another --out
+    # (or after the dataset was deleted) skips openpyxl
+    df = read_excel_cached(path)
+    df.columns = clean_columns(df.columns)
+
+    name = os.path.basename(path)
+    stem = os.path.splitext(name)[0]
+
     # Add filename as sample source
-    df["source_file"] = os.path.basename(f)
-    
-    all_data.append(df)
+    df["source_file"] = name
+
+    # Captures without a Condition column are one class named after the file
+    if "Condition" not in df.columns:
+        df["Condition"] = stem
+
+    files = []
+    for condition, part in df.groupby("Condition", sort=False):
+        target_dir = partition_dir(out_dir, condition)
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, stem + ".parquet")
+
+        # The partition directory carries the condition
+        fd, tmp = tempfile.mkstemp(prefix=".part-", suffix=".parquet", dir=target_dir)
+        os.close(fd)
+        try:
+            part.drop(columns="Condition").to_parquet(tmp, index=False)
+            os.replace(tmp, target)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        files.append(os.path.relpath(target, out_dir))
+
+    st = os.stat(path)
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": digest,
+        "rows": len(df),
+        "files": files
+    }
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if manifest.get("format") != MANIFEST_FORMAT:
+        return {}
+    return manifest["captures"]
+
+
+def save_manifest(out_dir, captures):
+    fd, tmp = tempfile.mkstemp(prefix=".manifest-", dir=out_dir)
+    with os.fdopen(fd, "w") as f:
+        json.dump({"format": MANIFEST_FORMAT, "captures": captures}, f, indent=2, sort_keys=True)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST_FILE))
+
+
+def remove_files(out_dir, entry):
+    for rel in entry.get("files", []):
+        try:
+            os.remove(os.path.join(out_dir, rel))
+        except FileNotFoundError:
+            pass
+
+
+def build(folder, out_dir, workers=None):
+    """Brings the dataset in out_dir up to date with the workbooks in folder."""
+    os.makedirs(out_dir, exist_ok=True)
+    captures = load_manifest(out_dir)
+
+    # Read all .xlsx files (skipping Excel's ~$ lock files)
+    paths = {
+        os.path.basename(p): p
+        for p in sorted(glob.glob(os.path.join(folder, "*.xlsx")))
+        if not os.path.basename(p).startswith("~$")
+    }
+
+    for name in sorted(set(captures) - set(paths)):
+        print(f"Removed: {name}")
+        remove_files(out_dir, captures.pop(name))
+
+    pending = []
+    for name, path in paths.items():
+        st = os.stat(path)
+        entry = captures.get(name)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            continue
+
+        digest = file_digest(path)
+        if entry and entry["sha256"] == digest:
+            # Touched but unchanged
+            entry["mtime_ns"] = st.st_mtime_ns
+            continue
+        pending.append((name, path, digest))
+
+    if pending:
+        print(f"Parsing {len(pending)} new or changed workbook(s)...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(convert, path, out_dir, digest) for name, path, digest in pending}
+            for name, future in futures.items():
+                entry = future.result()
+                old = captures.get(name)
+                if old:
+                    # Conditions that are no longer in the capture
+                    remove_files(out_dir, {"files": [f for f in old["files"] if f not in entry["files"]]})
+                captures[name] = entry
+                print(f"  {name}: {entry['rows']} rows")
+
+    # Partitions left empty by removed captures
+    for directory in glob.glob(os.path.join(out_dir, "Condition=*")):
+        if not os.listdir(directory):
+            shutil.rmtree(directory)
+
+    save_manifest(out_dir, captures)
+    return captures, len(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally build the partitioned training dataset.")
+    parser.add_argument("--data", default=DEFAULT_FOLDER, help="folder holding the .xlsx captures")
+    parser.add_argument("--out", default=None, help=f"dataset directory (default <data>/{DATASET_DIR})")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: all cores)")
+    parser.add_argument("--csv", action="store_true", help="also write combined_dataset.csv")
+    args = parser.parse_args()
+
+    out_dir = args.out or os.path.join(args.data, DATASET_DIR)
+    captures, parsed = build(args.data, out_dir, args.workers)
+
+    rows = sum(entry["rows"] for entry in captures.values())
+    print(f"{out_dir} is up to date: {len(captures)} captures, {rows} rows ({parsed} parsed this run)")
 
-# Combine everything
-combined = pd.concat(all_data, ignore_index=True)
+    if args.csv:
+        combined = read_dataset(out_dir)
+        combined.to_csv(os.path.join(args.data, "combined_dataset.csv"), index=False)
+        print("combined_dataset.csv created successfully!")
 
-# Save as CSV
-combined.to_csv(os.path.join(folder, "combined_dataset.csv"), index=False)
 
-print("combined_dataset.csv created successfully!")
+if __name__ == "__main__":
+    main()
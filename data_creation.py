@@ -8,15 +8,13 @@ import os
 
 save_path = r"E:\VII th SEMESTER\PROJECT\MOTOR_DATA"
 
-os.makedirs(save_path, exist_ok=True)
-
 rows = 1200  # 5 hours @ 15 sec window
 
 # -----------------------------------------
 #  RANGE DEFINITIONS (REALISTIC SYNTHETIC DATA)
 # -----------------------------------------
 
-def generate_data(condition):
+def generate_data(condition, n_rows=rows, rng=np.random):
 
     if condition == "No_load_condition":
         vib_range = (0.5, 1.5)     # mm/s
@@ -38,17 +36,17 @@ def generate_data(condition):
         raise ValueError("Invalid condition")
 
     # Generate synthetic vibration data
-    vib_x = np.random.uniform(vib_range[0], vib_range[1], rows)
-    vib_y = np.random.uniform(vib_range[0], vib_range[1], rows)
-    vib_z = np.random.uniform(vib_range[0], vib_range[1], rows)
+    vib_x = rng.uniform(vib_range[0], vib_range[1], n_rows)
+    vib_y = rng.uniform(vib_range[0], vib_range[1], n_rows)
+    vib_z = rng.uniform(vib_range[0], vib_range[1], n_rows)
 
     # Generate synthetic MLX90393 magnetometer data
-    mag_x = np.random.uniform(mag_range[0], mag_range[1], rows)
-    mag_y = np.random.uniform(mag_range[0], mag_range[1], rows)
-    mag_z = np.random.uniform(mag_range[0], mag_range[1], rows)
+    mag_x = rng.uniform(mag_range[0], mag_range[1], n_rows)
+    mag_y = rng.uniform(mag_range[0], mag_range[1], n_rows)
+    mag_z = rng.uniform(mag_range[0], mag_range[1], n_rows)
 
     df = pd.DataFrame({
-        "Condition": [condition] * rows,
+        "Condition": [condition] * n_rows,
         "Vibration X (mm/s)": vib_x,
         "Vibration Y (mm/s)": vib_y,
         "Vibration Z (mm/s)": vib_z,
@@ -71,8 +69,11 @@ conditions = {
     "Uneven_load_condition": "Uneven_load_condition.xlsx"
 }
 
-for cond, filename in conditions.items():
-    df = generate_data(cond)
-    df.to_excel(os.path.join(save_path, filename), index=False)
+if __name__ == "__main__":
+    os.makedirs(save_path, exist_ok=True)
+
+    for cond, filename in conditions.items():
+        df = generate_data(cond)
+        df.to_excel(os.path.join(save_path, filename), index=False)
 
-print("✅ All 4 condition sheets generated successfully!")
+    print("✅ All 4 condition sheets generated successfully!")
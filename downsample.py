@@ -0,0 +1,64 @@
+"""
+Compact chart payloads.
+
+Long captures are reduced to a min/max envelope before they are put into
+JSON: every bucket of samples contributes its minimum and maximum (in the
+order they occur), so spikes survive while the payload stays at the
+requested number of points. Values can also be written at float32
+precision, which roughly halves the digits jsonify emits per number.
+"""
+import numpy as np
+
+
+def minmax_downsample(index, Y, n_out):
+    """
+    Reduces an (N,) index and an (N, C) series to at most n_out points.
+
+    Each bucket yields two points: x is the bucket's first and last sample
+    index, and for every channel y is the bucket's min and max in the order
+    they occur. Series already within n_out are returned unchanged.
+    """
+    index = np.asarray(index)
+    Y = np.asarray(Y, dtype=np.float64)
+    n = len(Y)
+    if n <= n_out or n_out < 2:
+        return index, Y
+
+    size = -(-n // (n_out // 2))
+    n_buckets = -(-n // size)
+
+    # Pad to whole buckets with NaN so nanargmin/nanargmax ignore the tail
+    padded = np.full((n_buckets * size, Y.shape[1]), np.nan)
+    padded[:n] = Y
+    buckets = padded.reshape(n_buckets, size, Y.shape[1])
+
+    lo = np.nanargmin(buckets, axis=1)
+    hi = np.nanargmax(buckets, axis=1)
+    first = np.minimum(lo, hi)
+    second = np.maximum(lo, hi)
+
+    rows = np.arange(n_buckets)[:, np.newaxis]
+    cols = np.arange(Y.shape[1])[np.newaxis, :]
+    Y_out = np.empty((2 * n_buckets, Y.shape[1]))
+    Y_out[0::2] = buckets[rows, first, cols]
+    Y_out[1::2] = buckets[rows, second, cols]
+
+    starts = np.arange(n_buckets) * size
+    ends = np.minimum(starts + size, n) - 1
+    index_out = np.empty(2 * n_buckets, dtype=index.dtype)
+    index_out[0::2] = index[starts]
+    index_out[1::2] = index[ends]
+
+    return index_out, Y_out
+
+
+def to_list(values, precision="float64"):
+    """
+    Array -> list for JSON. With precision="float32" each value is rounded to
+    float32 and written with the shortest digits that round-trip at that
+    precision.
+    """
+    values = np.asarray(values)
+    if precision == "float32" and values.dtype.kind == "f":
+        return [float(v) for v in values.astype(np.float32).astype(str)]
+    return values.tolist()
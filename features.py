@@ -0,0 +1,176 @@
+"""
+Vectorized feature engine shared by training (extract_features.py) and
+serving (app.py).
+
+All six sensor channels are handled as one contiguous (N, 6) float64 array,
+so RMS, P2P and the FFT peak are each a single axis-wise NumPy operation
+instead of one Python call per column.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.fft import rfft, rfftfreq
+
+
+# ---------------- Schema ----------------
+# Column names of uploaded / ThingSpeak data (as read by app.py)
+SENSOR_COLUMNS = [
+    "Vibration X (mm/s)",
+    "Vibration Y (mm/s)",
+    "Vibration Z (mm/s)",
+    "MLX90393 X (mT)",
+    "MLX90393 Y (mT)",
+    "MLX90393 Z (mT)",
+]
+
+# Same channels after combine_data.py cleans the Excel headers
+TRAINING_COLUMNS = [
+    "Vibration_X_mm/s",
+    "Vibration_Y_mm/s",
+    "Vibration_Z_mm/s",
+    "MLX90393_X_mT",
+    "MLX90393_Y_mT",
+    "MLX90393_Z_mT",
+]
+
+# Canonical feature order (the order model_training.py trains on)
+FEATURE_NAMES = [
+    "Vib_RMS_X", "Vib_RMS_Y", "Vib_RMS_Z",
+    "Vib_P2P_X", "Vib_P2P_Y", "Vib_P2P_Z",
+    "Vib_FFT_Peak_Freq", "Vib_FFT_Peak_Amp",
+    "Mag_RMS_X", "Mag_RMS_Y", "Mag_RMS_Z",
+    "Mag_P2P_X", "Mag_P2P_Y", "Mag_P2P_Z",
+]
+
+# Channel index used for the FFT peak (Vibration X)
+FFT_CHANNEL = 0
+
+# Windows processed per block in window_features (bounds temporary memory)
+WINDOW_BLOCK = 4096
+
+# Feature window the classifier is trained on (model_training.py --window /
+# --stride); inference scores captures with the same windows
+TRAINING_WINDOW = 240
+TRAINING_STRIDE = 120
+
+
+def sensor_matrix(df, columns=SENSOR_COLUMNS):
+    """Returns the six sensor channels of df as a contiguous (N, 6) float64 array."""
+    return np.ascontiguousarray(df[list(columns)].to_numpy(dtype=np.float64))
+
+
+# ---------------- Feature Engine ----------------
+class FeatureEngine:
+    """
+    Computes the feature vector for an (N, 6) sensor matrix.
+
+    feature_names fixes the output order (normally clf.feature_names_in_);
+    names the engine does not know are filled with 0, matching how app.py
+    used to align features with the model.
+    """
+
+    def __init__(self, feature_names=FEATURE_NAMES, fs=1.0):
+        self.feature_names = list(feature_names)
+        self.fs = fs
+
+        canonical = {name: i for i, name in enumerate(FEATURE_NAMES)}
+        index = np.array([canonical.get(name, -1) for name in self.feature_names])
+        self._known = index >= 0
+        self._index = index[self._known]
+
+    def raw(self, X, out=None):
+        """Fills out (or a new array) with all FEATURE_NAMES in canonical order."""
+        if out is None:
+            out = np.empty(len(FEATURE_NAMES), dtype=np.float64)
+
+        rms = np.sqrt(np.mean(np.square(X), axis=0))
+        p2p = np.max(X, axis=0) - np.min(X, axis=0)
+
+        out[0:3] = rms[0:3]
+        out[3:6] = p2p[0:3]
+        out[6], out[7] = fft_peak(X[:, FFT_CHANNEL], self.fs)
+        out[8:11] = rms[3:6]
+        out[11:14] = p2p[3:6]
+
+        return out
+
+    def compute_windows(self, X, window, stride=None):
+        """Returns a (W, F) matrix with one feature row per window of X."""
+        raw = window_features(X, window, stride, self.fs)
+        out = np.zeros((len(raw), len(self.feature_names)), dtype=np.float64)
+        out[:, self._known] = raw[:, self._index]
+        return out
+
+    def capture_raw(self, X, window, stride=None):
+        """
+        raw() of a whole capture as the mean of its window rows, so captures
+        of any length land where the training windows do (P2P and the FFT
+        peak amplitude grow with the samples they are taken over). Captures
+        shorter than one window are a single window.
+        """
+        if len(X) < window:
+            return self.raw(X)
+        return window_features(X, window, stride, self.fs).mean(axis=0)
+
+    def compute(self, X, out=None):
+        """Returns the feature vector for X in self.feature_names order."""
+        return self.select(self.raw(X), out)
+
+    def select(self, raw, out=None):
+        """
+        Reorders a canonical raw() vector (or an (N, 14) matrix of them, one
+        per row) into self.feature_names order.
+        """
+        if out is None:
+            out = np.zeros(raw.shape[:-1] + (len(self.feature_names),), dtype=np.float64)
+        else:
+            out[:] = 0.0
+
+        out[..., self._known] = raw[..., self._index]
+        return out
+
+
+def fft_peak(x, fs=1.0):
+    """Frequency and magnitude of the largest FFT bin of the mean-removed signal."""
+    yf = np.abs(rfft(x - np.mean(x)))
+    xf = rfftfreq(len(x), 1 / fs)
+    idx = np.argmax(yf)
+    return float(xf[idx]), float(yf[idx])
+
+
+def window_features(X, window, stride=None, fs=1.0):
+    """
+    Canonical features (FEATURE_NAMES order) for every window of X.
+
+    Windows are length `window`, start every `stride` samples (default: no
+    overlap) and a trailing partial window is dropped. Each row equals
+    FeatureEngine.raw() applied to that window.
+    """
+    stride = stride or window
+    n_windows = 0 if len(X) < window else (len(X) - window) // stride + 1
+    out = np.empty((n_windows, len(FEATURE_NAMES)), dtype=np.float64)
+    if n_windows == 0:
+        return out
+
+    # (W, 6, window) view, no copy
+    views = sliding_window_view(X, window, axis=0)[::stride]
+    freqs = rfftfreq(window, 1 / fs)
+
+    for start in range(0, n_windows, WINDOW_BLOCK):
+        w = views[start:start + WINDOW_BLOCK]
+        rows = out[start:start + WINDOW_BLOCK]
+
+        rms = np.sqrt(np.mean(np.square(w), axis=2))
+        p2p = np.max(w, axis=2) - np.min(w, axis=2)
+
+        x = w[:, FFT_CHANNEL, :]
+        yf = np.abs(rfft(x - np.mean(x, axis=1, keepdims=True), axis=1))
+        idx = np.argmax(yf, axis=1)
+
+        rows[:, 0:3] = rms[:, 0:3]
+        rows[:, 3:6] = p2p[:, 0:3]
+        rows[:, 6] = freqs[idx]
+        rows[:, 7] = yf[np.arange(len(idx)), idx]
+        rows[:, 8:11] = rms[:, 3:6]
+        rows[:, 11:14] = p2p[:, 3:6]
+
+    return out
@@ -0,0 +1,114 @@
+"""
+Compiled RandomForest inference.
+
+clf.predict on a single row is dominated by sklearn overhead (input
+validation, DataFrame column checks, joblib dispatch over n_jobs=-1
+threads), not by walking the trees. CompiledForest flattens every tree of
+a fitted forest into one set of contiguous node arrays and walks all
+(row, tree) pairs together with NumPy, dropping pairs as they reach a leaf.
+
+Predictions follow sklearn exactly: X is rounded to float32 as sklearn
+does, splits go left on x <= threshold (NaN per missing_go_to_left), leaf
+values are normalised per tree and averaged over trees, and the class is
+the argmax of the averaged probabilities.
+"""
+import numpy as np
+
+
+class CompiledForest:
+    """
+    All nodes of all trees in flat arrays. Child indices are global, and
+    leaves have left == right == -1.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.n_features = int(feature.max()) + 1 if len(feature) else 0
+
+    @classmethod
+    def from_sklearn(cls, clf):
+        trees = [est.tree_ for est in clf.estimators_]
+        offsets = np.cumsum([0] + [t.node_count for t in trees])
+
+        def stack(get, dtype):
+            return np.ascontiguousarray(np.concatenate([get(t) for t in trees]), dtype=dtype)
+
+        def children(t, offset, side):
+            child = side.astype(np.int64)
+            return np.where(child >= 0, child + offset, -1)
+
+        left = np.concatenate([children(t, o, t.children_left) for t, o in zip(trees, offsets)])
+        right = np.concatenate([children(t, o, t.children_right) for t, o in zip(trees, offsets)])
+
+        # Older sklearn has no missing-value support; NaN then goes right
+        if hasattr(trees[0], "missing_go_to_left"):
+            missing_left = stack(lambda t: t.missing_go_to_left, bool)
+        else:
+            missing_left = np.zeros(offsets[-1], dtype=bool)
+
+        # Per-tree class probabilities at every node, as DecisionTreeClassifier.predict_proba
+        value = stack(lambda t: t.value[:, 0, :], np.float64)
+        totals = value.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        value /= totals
+
+        return cls(
+            feature=stack(lambda t: np.maximum(t.feature, 0), np.intp),
+            threshold=stack(lambda t: t.threshold, np.float64),
+            left=np.ascontiguousarray(left, dtype=np.intp),
+            right=np.ascontiguousarray(right, dtype=np.intp),
+            missing_left=missing_left,
+            value=value,
+            roots=np.ascontiguousarray(offsets[:-1], dtype=np.intp),
+            classes=clf.classes_
+        )
+
+    def apply(self, X):
+        """(n_rows, n_trees) global leaf index reached by each row in each tree."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+
+        flat = X.ravel()
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows) * n_features, n_trees)
+        # Pairs whose tree is a single leaf are done before the first step
+        active = np.flatnonzero(self.left[node] >= 0)
+
+        while active.size:
+            current = node[active]
+            x = flat[row_offset[active] + self.feature[current]]
+            go_left = (x <= self.threshold[current]) | (np.isnan(x) & self.missing_left[current])
+            current = np.where(go_left, self.left[current], self.right[current])
+            node[active] = current
+            active = active[self.left[current] >= 0]
+
+        return node.reshape(n_rows, n_trees)
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        return self.value[leaves].sum(axis=1) / leaves.shape[1]
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def compile_forest(clf):
+    """CompiledForest for a fitted single-output forest classifier, else None."""
+    # Imported here: serving from the model store never needs sklearn
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+    if not isinstance(clf, (RandomForestClassifier, ExtraTreesClassifier)):
+        return None
+    if getattr(clf, "n_outputs_", 1) != 1:
+        return None
+    return CompiledForest.from_sklearn(clf)
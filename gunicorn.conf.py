@@ -0,0 +1,38 @@
+"""
+Gunicorn settings for the production server:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+preload_app imports app.py, with its libraries and the model, once in the
+master and warms the prediction path there; workers are then forked from
+it and share those pages copy-on-write instead of each importing and
+loading on its own. PORT and WEB_CONCURRENCY are honoured as before.
+"""
+import gc
+import os
+
+
+bind = f"0.0.0.0:{os.environ['PORT']}" if "PORT" in os.environ else "127.0.0.1:8000"
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+# Threads per worker: while a large upload is analysed in the process pool
+# (see app.analysis_pool) the worker keeps answering other requests
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+
+# Set GUNICORN_PRELOAD=0 to import the app in every worker instead
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+
+    import app
+    try:
+        app.warm_up()
+    except Exception as e:
+        print("Warm-up failed:", e)
+
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers do not write to (and so copy) shared pages
+    gc.freeze()
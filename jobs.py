@@ -0,0 +1,197 @@
+"""
+Asynchronous analysis jobs.
+
+Large uploads can take longer than the mobile clients' 30 s request
+timeout. Instead of holding the connection, clients submit a job, poll its
+status and fetch the result once it is done.
+
+JobStore keeps jobs in SQLite, so any gunicorn worker can answer a status
+or result poll no matter which one ran the job. Results expire after a TTL
+and are purged lazily. JobRunner executes jobs on a bounded background
+thread pool inside the serving process; the CPU-heavy part is still handed
+to the analysis process pool by the job function itself.
+"""
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobFailed(Exception):
+    """A job error with the HTTP status its result request should answer with."""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class JobQueueFull(Exception):
+    """Raised when max_queued jobs are already waiting or running."""
+
+
+class JobStore:
+    """SQLite table of jobs: status, metadata and the pickled result."""
+
+    def __init__(self, path, ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    key TEXT,
+                    status TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    expires REAL NOT NULL,
+                    meta TEXT,
+                    error TEXT,
+                    status_code INTEGER,
+                    result BLOB
+                )"""
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key)")
+
+    def _connect(self):
+        # One short-lived connection per call keeps the store safe to use
+        # from request threads, job threads and other processes at once
+        return sqlite3.connect(self.path, timeout=30)
+
+    def create(self, key=None, meta=None):
+        """New queued job; returns its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, key, status, created, updated, expires, meta) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, key, QUEUED, now, now, now + self.ttl, json.dumps(meta or {}))
+            )
+        return job_id
+
+    def find(self, key):
+        """Id of an unexpired, not failed job with this key, or None."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT id FROM jobs WHERE key = ? AND status != ? AND expires > ? ORDER BY created DESC LIMIT 1",
+                (key, FAILED, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _update(self, job_id, status, **fields):
+        fields["status"] = status
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def start(self, job_id):
+        self._update(job_id, RUNNING)
+
+    def finish(self, job_id, result):
+        # The TTL counts from completion, so a slow job is not expired on arrival
+        self._update(job_id, DONE, result=pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL),
+                     expires=time.time() + self.ttl)
+
+    def fail(self, job_id, error, status_code=500):
+        self._update(job_id, FAILED, error=error, status_code=status_code,
+                     expires=time.time() + self.ttl)
+
+    def get(self, job_id):
+        """Job status and metadata (no result), or None if unknown or expired."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT id, status, created, updated, expires, meta, error, status_code "
+                "FROM jobs WHERE id = ? AND expires > ?",
+                (job_id, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "status": row[1],
+            "created": row[2],
+            "updated": row[3],
+            "expires": row[4],
+            "meta": json.loads(row[5] or "{}"),
+            "error": row[6],
+            "status_code": row[7]
+        }
+
+    def result(self, job_id):
+        """Unpickled result of a finished job, or None."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT result FROM jobs WHERE id = ? AND status = ? AND expires > ?",
+                (job_id, DONE, time.time())
+            ).fetchone()
+        return pickle.loads(row[0]) if row and row[0] is not None else None
+
+    def purge(self):
+        """Deletes expired jobs; returns how many were removed."""
+        with self._connect() as db:
+            return db.execute("DELETE FROM jobs WHERE expires <= ?", (time.time(),)).rowcount
+
+    def stats(self):
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE expires > ? GROUP BY status", (time.time(),)
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+
+class JobRunner:
+    """
+    Bounded background thread pool that runs jobs and records the outcome
+    in a JobStore. The pool is created lazily, in the process that serves
+    requests.
+    """
+
+    def __init__(self, store, workers=2, max_queued=32):
+        self.store = store
+        self.workers = workers
+        self.max_queued = max_queued
+        self._slots = threading.BoundedSemaphore(max_queued)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, job_id, fn, *args):
+        """Runs fn(*args) in the background; its return value becomes the job result."""
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFull(f"{self.max_queued} jobs already queued or running")
+
+        try:
+            self._get_executor().submit(self._run, job_id, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _run(self, job_id, fn, *args):
+        try:
+            self.store.start(job_id)
+            self.store.finish(job_id, fn(*args))
+        except JobFailed as e:
+            self.store.fail(job_id, str(e), e.status_code)
+        except Exception as e:
+            self.store.fail(job_id, f"Processing Error: {e}", 500)
+        finally:
+            self._slots.release()
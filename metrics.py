@@ -0,0 +1,166 @@
+"""
+In-process latency and size metrics in the Prometheus text format.
+
+Histograms keep cumulative bucket counts per label set, so recording is a
+bisect and two additions under a lock. Gauges and counters that other
+objects already track (cache hits, pool queue depth, jobs) are read through
+callbacks when /metrics is scraped rather than duplicated on the hot path.
+
+Every process keeps its own registry: with several gunicorn workers each
+scrape is answered by one of them, and its samples carry a worker="<pid>"
+label so Prometheus keeps them apart.
+"""
+import bisect
+import os
+import threading
+import time
+
+
+# Upper bounds of the latency buckets (seconds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Upper bounds of the payload size buckets (bytes)
+SIZE_BUCKETS = tuple(2 ** i for i in range(10, 28, 2))
+
+# Upper bounds of the sample count buckets (rows per capture)
+COUNT_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One count per bucket plus +Inf, then the sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def samples(self, extra=()):
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = _labels(self.labelnames, labels, list(extra) + [("le", _number(bound))])
+                yield f"{self.name}_bucket{le} {cumulative}"
+            base = _labels(self.labelnames, labels, extra)
+            yield f"{self.name}_sum{base} {_number(series[-1])}"
+            yield f"{self.name}_count{base} {cumulative}"
+
+
+class Callback:
+    """Gauge or counter whose values come from fn() -> {label values tuple: value}."""
+
+    def __init__(self, name, help, fn, labelnames=(), kind="gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def samples(self, extra=()):
+        for labels, value in sorted(self.fn().items()):
+            yield f"{self.name}{_labels(self.labelnames, labels, extra)} {_number(value)}"
+
+
+class Registry:
+    """The metrics of one process, rendered by render()."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        metric = Histogram(name, help, buckets, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def callback(self, name, help, fn, labelnames=(), kind="gauge"):
+        metric = Callback(name, help, fn, labelnames, kind)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        extra = [("worker", os.getpid())]
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                lines.extend(metric.samples(extra))
+            except Exception as e:
+                # A failing callback must not take the whole scrape down
+                lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """Context manager that passes (stage, seconds) to record on exit."""
+
+    __slots__ = ("record", "stage", "start")
+
+    def __init__(self, record, stage):
+        self.record = record
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class NullTimer:
+    """Stand-in for StageTimer when nothing is recorded."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+def server_timing(entries):
+    """Server-Timing header value for [(stage, seconds), ...] (durations in ms)."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in entries)
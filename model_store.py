@@ -0,0 +1,313 @@
+"""
+Versioned, memory-mapped model artifacts.
+
+A published version is a directory with three files:
+
+    model.bin       every array the server needs (the compiled forest's node
+                    arrays, the class codes and the normal centroid), each
+                    64-byte aligned
+    manifest.json   dtype / shape / offset of each array, the feature names,
+                    the label names and the feature window trained on
+    estimator.pkl   the fitted sklearn forest itself, for large batches
+
+model.bin is opened with np.memmap, so all workers on a host share the same
+page-cache pages instead of each unpickling a private copy of the forest.
+The CURRENT file names the active version; publish() writes the new version
+to a temporary directory first and then swaps CURRENT atomically, so a
+running server picks it up on its next check without a restart.
+
+The compiled forest answers single uploads and small batches. Above
+COMPILED_MAX_ROWS rows sklearn's predict is faster (250 trees, 2000 rows:
+75 ms compiled vs 33 ms sklearn on one core, and sklearn also spreads
+over the cores), so a process unpickles estimator.pkl the first time it
+scores a batch that large. That copy is private to the process (~16 MB
+for 250 trees); processes that only see small requests never load it.
+Versions published without estimator.pkl, or servers without sklearn,
+use the compiled forest for every size.
+
+    python model_store.py publish --model model_fault.pkl \\
+        --encoder label_encoder.pkl --centroid normal_centroid.npy
+    python model_store.py activate <version>
+    python model_store.py deactivate      # back to the pickled outputs
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from features import TRAINING_STRIDE, TRAINING_WINDOW, FeatureEngine
+from forest_engine import CompiledForest, compile_forest
+
+
+FORMAT_VERSION = 1
+ALIGN = 64
+
+ARRAY_FILE = "model.bin"
+MANIFEST_FILE = "manifest.json"
+ESTIMATOR_FILE = "estimator.pkl"
+CURRENT_FILE = "CURRENT"
+
+FOREST_ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "value", "roots")
+
+# Above this many rows sklearn's multithreaded predict is faster than the
+# compiled forest (see benchmark_forest.py); only used when the estimator
+# itself was loaded
+COMPILED_MAX_ROWS = 256
+
+
+class Model:
+    """Everything the routes need from one model version."""
+
+    def __init__(self, version, feature_names, labels, centroid, forest=None, estimator=None,
+                 window=TRAINING_WINDOW, stride=TRAINING_STRIDE, estimator_path=None):
+        self.version = version
+        self.feature_names = list(feature_names)
+        self.labels = np.asarray(labels)
+        self.centroid = np.asarray(centroid).flatten()
+        self.forest = forest
+        self.estimator = estimator
+        # Pickled estimator loaded on the first large batch (store versions)
+        self.estimator_path = estimator_path
+        self._estimator_lock = threading.Lock()
+        self.feature_engine = FeatureEngine(self.feature_names)
+        # Feature window and stride the classifier was trained on
+        self.window = window
+        self.stride = stride
+
+        # Models trained on single-sample rows (before windowed training features)
+        # have an all-zero P2P centroid and need the HOTFIX in pipeline.features_stage
+        p2p_mask = np.array(["P2P" in col for col in self.feature_names])
+        self.legacy_features = not np.any(self.centroid[p2p_mask])
+
+    def predict_codes(self, features_df):
+        """Encoded class per feature row, identical to clf.predict(features_df)."""
+        if self.forest is not None:
+            if len(features_df) <= COMPILED_MAX_ROWS or self.load_estimator() is None:
+                return self.forest.predict(features_df.to_numpy())
+        return self.estimator.predict(features_df)
+
+    def load_estimator(self):
+        """The sklearn estimator, unpickled from estimator_path on first use; None when unavailable."""
+        if self.estimator is None and self.estimator_path is not None:
+            with self._estimator_lock:
+                if self.estimator is None and self.estimator_path is not None:
+                    try:
+                        with open(self.estimator_path, "rb") as f:
+                            self.estimator = pickle.load(f)
+                    except (OSError, ImportError, pickle.UnpicklingError) as e:
+                        print(f"Large batches use the compiled forest; cannot load {self.estimator_path}: {e}")
+                        self.estimator_path = None
+        return self.estimator
+
+
+def load_pickled(model_path, encoder_path, centroid_path):
+    """Model from the pickled training outputs (each worker gets a private copy)."""
+    with open(model_path, "rb") as f:
+        clf = pickle.load(f)
+
+    with open(encoder_path, "rb") as f:
+        le = pickle.load(f)
+
+    # None for models forest_engine cannot compile; clf.predict is used then
+    forest = compile_forest(clf)
+
+    return Model(
+        version="pickle",
+        feature_names=clf.feature_names_in_,
+        labels=le.classes_,
+        centroid=np.load(centroid_path),
+        forest=forest,
+        estimator=clf
+    )
+
+
+class ModelStore:
+    """Directory of published model versions plus the CURRENT pointer."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def current_version(self):
+        """Active version name, or None when nothing has been published."""
+        try:
+            with open(self._path(CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isfile(self._path(name, MANIFEST_FILE))
+        )
+
+    def load(self, version):
+        """Memory-maps a published version."""
+        with open(self._path(version, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+
+        if manifest["format"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model store format {manifest['format']}")
+
+        buffer = np.memmap(self._path(version, ARRAY_FILE), dtype=np.uint8, mode="r")
+        arrays = {
+            name: np.ndarray(tuple(spec["shape"]), dtype=spec["dtype"], buffer=buffer, offset=spec["offset"])
+            for name, spec in manifest["arrays"].items()
+        }
+
+        forest = CompiledForest(
+            classes=arrays["classes"],
+            **{name: arrays[name] for name in FOREST_ARRAYS}
+        )
+
+        return Model(
+            version=version,
+            feature_names=manifest["feature_names"],
+            labels=manifest["labels"],
+            centroid=arrays["centroid"],
+            forest=forest,
+            # Versions published before the window was recorded used the defaults
+            window=manifest.get("window", TRAINING_WINDOW),
+            stride=manifest.get("stride", TRAINING_STRIDE),
+            estimator_path=self._path(version, manifest["estimator_file"]) if "estimator_file" in manifest else None
+        )
+
+    def publish(self, clf, le, centroid, activate=True, window=TRAINING_WINDOW, stride=TRAINING_STRIDE):
+        """
+        Writes a new version from a fitted forest, its label encoder and
+        centroid; window/stride are the feature windows it was trained on.
+        """
+        forest = compile_forest(clf)
+        if forest is None:
+            raise ValueError(f"{type(clf).__name__} cannot be stored; only forest classifiers compile")
+
+        arrays = {name: getattr(forest, name) for name in FOREST_ARRAYS}
+        arrays["classes"] = np.asarray(clf.classes_)
+        arrays["centroid"] = np.asarray(centroid, dtype=np.float64).flatten()
+
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".publish-", dir=self.root)
+        os.chmod(staging, 0o755)
+
+        try:
+            specs = {}
+            digest = hashlib.sha256()
+            with open(os.path.join(staging, ARRAY_FILE), "wb") as f:
+                for name, arr in arrays.items():
+                    arr = np.ascontiguousarray(arr)
+                    f.write(b"\0" * (-f.tell() % ALIGN))
+                    specs[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": f.tell()}
+                    f.write(arr.tobytes())
+                    digest.update(arr.tobytes())
+
+            with open(os.path.join(staging, ESTIMATOR_FILE), "wb") as f:
+                pickle.dump(clf, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            version = f"{time.strftime('%Y%m%d-%H%M%S')}-{digest.hexdigest()[:8]}"
+            manifest = {
+                "format": FORMAT_VERSION,
+                "version": version,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "estimator": type(clf).__name__,
+                "n_trees": len(forest.roots),
+                "feature_names": [str(name) for name in clf.feature_names_in_],
+                "labels": [str(label) for label in le.classes_],
+                "window": int(window),
+                "stride": int(stride),
+                "estimator_file": ESTIMATOR_FILE,
+                "arrays": specs
+            }
+            with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f, indent=2)
+
+            target = self._path(version)
+            if os.path.exists(target):
+                shutil.rmtree(staging)
+            else:
+                os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Points CURRENT at a published version (atomic rename)."""
+        if not os.path.isfile(self._path(version, MANIFEST_FILE)):
+            raise ValueError(f"Unknown model version: {version}")
+
+        fd, tmp = tempfile.mkstemp(prefix=".current-", dir=self.root)
+        with os.fdopen(fd, "w") as f:
+            f.write(version + "\n")
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, self._path(CURRENT_FILE))
+
+    def deactivate(self):
+        """Removes CURRENT: servers go back to the pickled training outputs."""
+        try:
+            os.remove(self._path(CURRENT_FILE))
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish and activate model versions.")
+    parser.add_argument("--store", default=os.environ.get("MODEL_STORE", "model_store"))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pub = sub.add_parser("publish", help="store the pickled training outputs as a new version")
+    pub.add_argument("--model", default="model_fault.pkl")
+    pub.add_argument("--encoder", default="label_encoder.pkl")
+    pub.add_argument("--centroid", default="normal_centroid.npy")
+    pub.add_argument("--window", type=int, default=TRAINING_WINDOW, help="feature window the model was trained on")
+    pub.add_argument("--stride", type=int, default=TRAINING_STRIDE)
+    pub.add_argument("--no-activate", action="store_true")
+
+    act = sub.add_parser("activate", help="make an existing version current (rollback)")
+    act.add_argument("version")
+
+    sub.add_parser("deactivate", help="serve the pickled training outputs instead of the store")
+    sub.add_parser("list", help="show published versions")
+
+    args = parser.parse_args()
+    store = ModelStore(args.store)
+
+    if args.command == "publish":
+        with open(args.model, "rb") as f:
+            clf = pickle.load(f)
+        with open(args.encoder, "rb") as f:
+            le = pickle.load(f)
+        version = store.publish(clf, le, np.load(args.centroid), activate=not args.no_activate,
+                                window=args.window, stride=args.stride)
+        print(f"Published {version}" + ("" if args.no_activate else " (current)"))
+
+    elif args.command == "activate":
+        store.activate(args.version)
+        print(f"Current version: {args.version}")
+
+    elif args.command == "deactivate":
+        store.deactivate()
+        print("No current version: servers use model_fault.pkl")
+
+    else:
+        current = store.current_version()
+        for version in store.versions():
+            print(("* " if version == current else "  ") + version)
+
+
+if __name__ == "__main__":
+    main()
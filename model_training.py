@@ -2,90 +2,90 @@
 # MOTOR CONDITION MONITORING - HYBRID MODEL TRAINING
 # =====================================================
 
+import argparse
 import pandas as pd
 import numpy as np
 import pickle
-from scipy.fft import rfft, rfftfreq
 from sklearn.preprocessing import LabelEncoder
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import StratifiedKFold, cross_val_predict
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import matplotlib.pyplot as plt
+from features import FeatureEngine, FEATURE_NAMES, TRAINING_COLUMNS, TRAINING_STRIDE, TRAINING_WINDOW, sensor_matrix
+from model_store import ModelStore
+from sensor_io import read_dataset
+from training import BACKENDS, cross_validate, final_model
+
+# ----------------------------
+# SETTINGS
+# ----------------------------
+parser = argparse.ArgumentParser(description="Train the motor fault classifier.")
+parser.add_argument("--data", default=r"E:\VII th SEMESTER\PROJECT\MOTOR_DATA\combined_dataset",
+                    help="dataset directory from combine_data.py (or a combined CSV)")
+parser.add_argument("--conditions", default=None, help="comma-separated conditions to train on (default: all)")
+# 240 samples = one 1-hour capture @ 15 sec window, the size app.py sees per upload
+parser.add_argument("--window", type=int, default=TRAINING_WINDOW, help="samples per feature window")
+parser.add_argument("--stride", type=int, default=TRAINING_STRIDE, help="samples between window starts")
+parser.add_argument("--store", default="model_store", help="model store the trained model is published to")
+parser.add_argument("--no-publish", action="store_true", help="only write the pickle/npy files")
+parser.add_argument("--backend", choices=BACKENDS, default="forest", help="xgboost needs the xgboost package")
+parser.add_argument("--estimators", default="250",
+                    help="comma-separated n_estimators candidates; the best by CV accuracy is kept")
+parser.add_argument("--cv-jobs", type=int, default=-1, help="folds fitted in parallel processes (-1: all)")
+parser.add_argument("--refit", action="store_true",
+                    help="refit the forest on all data instead of assembling it from the fold models")
+args = parser.parse_args()
+
+# Only the model store records the feature window; the app serves other
+# backends from model_fault.pkl, scored on the default windows
+if args.backend != "forest" and (args.window, args.stride) != (TRAINING_WINDOW, TRAINING_STRIDE):
+    parser.error(f"--backend {args.backend} is served from model_fault.pkl, which only supports "
+                 f"--window {TRAINING_WINDOW} --stride {TRAINING_STRIDE}")
 
 # ----------------------------
 # STEP 1: LOAD RAW DATA
 # ----------------------------
-data_path = r"E:\VII th SEMESTER\PROJECT\MOTOR_DATA\combined_dataset.csv"
-df = pd.read_csv(data_path)
+data_path = args.data
+conditions = args.conditions.split(",") if args.conditions else None
+
+# Only the sensor channels and the grouping columns are read
+df = read_dataset(data_path, TRAINING_COLUMNS + ["source_file"], conditions)
 
 print("Combined dataset loaded successfully.\n")
 print("Columns available:", df.columns.tolist(), "\n")
 print("Total samples:", len(df), "\n")
 
 # ----------------------------
-# STEP 2: HELPER FUNCTIONS FOR FEATURE EXTRACTION
+# STEP 2: FEATURE ENGINE
 # ----------------------------
-def rms(x):
-    return np.sqrt(np.mean(np.array(x)**2))
-
-def peak_to_peak(x):
-    return np.max(x) - np.min(x)
-
-def fft_peak(x, fs=1):  # fs can be 1 if relative
-    x = np.array(x)
-    N = len(x)
-    yf = np.abs(rfft(x))
-    xf = rfftfreq(N, 1/fs)
-    peak_freq = xf[np.argmax(yf)]
-    peak_amp = np.max(yf)
-    return peak_freq, peak_amp
+# Same engine app.py uses at inference, so the training schema matches
+engine = FeatureEngine(FEATURE_NAMES)
 
 # ----------------------------
-# STEP 3: FEATURE EXTRACTION PER ROW
+# STEP 3: WINDOWED FEATURE EXTRACTION
 # ----------------------------
-feature_rows = []
+# Windows never cross a capture file or a condition boundary
+group_cols = ["Condition", "source_file"] if "source_file" in df.columns else ["Condition"]
 
-for idx, row in df.iterrows():
-    features = {}
-    features["Condition"] = row["Condition"]
-    
-    # Vibration features
-    Vx, Vy, Vz = row["Vibration_X_mm/s"], row["Vibration_Y_mm/s"], row["Vibration_Z_mm/s"]
-    features["Vib_RMS_X"] = rms([Vx])
-    features["Vib_RMS_Y"] = rms([Vy])
-    features["Vib_RMS_Z"] = rms([Vz])
-    features["Vib_P2P_X"] = peak_to_peak([Vx])
-    features["Vib_P2P_Y"] = peak_to_peak([Vy])
-    features["Vib_P2P_Z"] = peak_to_peak([Vz])
-    f_freq, f_amp = fft_peak([Vx])
-    features["Vib_FFT_Peak_Freq"] = f_freq
-    features["Vib_FFT_Peak_Amp"] = f_amp
+feature_blocks = []
+labels = []
 
-    # Magnetic features
-    Mx, My, Mz = row["MLX90393_X_mT"], row["MLX90393_Y_mT"], row["MLX90393_Z_mT"]
-    features["Mag_RMS_X"] = rms([Mx])
-    features["Mag_RMS_Y"] = rms([My])
-    features["Mag_RMS_Z"] = rms([Mz])
-    features["Mag_P2P_X"] = peak_to_peak([Mx])
-    features["Mag_P2P_Y"] = peak_to_peak([My])
-    features["Mag_P2P_Z"] = peak_to_peak([Mz])
-    
-    feature_rows.append(features)
+for _, group in df.groupby(group_cols, sort=False):
+    X_raw = sensor_matrix(group.dropna(subset=TRAINING_COLUMNS), TRAINING_COLUMNS)
+    block = engine.compute_windows(X_raw, args.window, args.stride)
+    if len(block) == 0:
+        continue
+    feature_blocks.append(block)
+    labels.extend([group["Condition"].iloc[0]] * len(block))
 
-features_df = pd.DataFrame(feature_rows)
-print("Feature extraction completed. Total feature rows:", len(features_df), "\n")
+feature_cols = FEATURE_NAMES
+
+features_df = pd.DataFrame(np.vstack(feature_blocks), columns=feature_cols)
+features_df.insert(0, "Condition", labels)
+print(f"Feature extraction completed (window={args.window}, stride={args.stride}). "
+      f"Total feature rows: {len(features_df)}\n")
 
 # ----------------------------
 # STEP 4: PREPARE DATA FOR TRAINING
 # ----------------------------
-feature_cols = [
-    "Vib_RMS_X", "Vib_RMS_Y", "Vib_RMS_Z",
-    "Vib_P2P_X", "Vib_P2P_Y", "Vib_P2P_Z",
-    "Vib_FFT_Peak_Freq", "Vib_FFT_Peak_Amp",
-    "Mag_RMS_X", "Mag_RMS_Y", "Mag_RMS_Z",
-    "Mag_P2P_X", "Mag_P2P_Y", "Mag_P2P_Z"
-]
-
 X = features_df[feature_cols].copy()
 y_fault = features_df["Condition"].copy()
 le = LabelEncoder()
@@ -108,21 +108,20 @@ print("Normal feature centroid computed and saved as normal_centroid.npy\n")
 # ----------------------------
 # STEP 6: TRAIN FAULT CLASSIFIER WITH CROSS-VALIDATION
 # ----------------------------
-clf = RandomForestClassifier(
-    n_estimators=250,
-    max_depth=None,
-    min_samples_split=4,
-    min_samples_leaf=2,
-    random_state=42,
-    n_jobs=-1
-)
+candidates = sorted({int(n) for n in args.estimators.split(",") if n})
 
 n_samples = len(X)
 n_splits = 5 if n_samples >= 5 else n_samples
-skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
 
-print(f"Training Fault Classifier using {n_splits}-fold cross-validation...\n")
-y_pred_cv = cross_val_predict(clf, X, y_fault_encoded, cv=skf)
+print(f"Training Fault Classifier ({args.backend}, n_estimators {candidates}) "
+      f"using {n_splits}-fold cross-validation...\n")
+cv = cross_validate(X, y_fault_encoded, candidates, args.backend, n_splits, args.cv_jobs)
+print(f"Cross-validation took {cv['seconds']:.1f} s ({cv['samples_per_second']:,.0f} samples/s)\n")
+
+for n in candidates:
+    print(f"  n_estimators={n:<6} CV accuracy {cv['accuracy'][n]*100:.2f}%")
+print(f"Selected n_estimators={cv['best']}\n")
+y_pred_cv = cv["predictions"][cv["best"]]
 
 # ----------------------------
 # STEP 7: EVALUATE FAULT CLASSIFIER
@@ -136,11 +135,28 @@ print(confusion_matrix(y_fault_encoded, y_pred_cv), "\n")
 print("Classification Report:\n")
 print(classification_report(y_fault_encoded, y_pred_cv), "\n")
 
-# Train on full dataset
-clf.fit(X, y_fault_encoded)
+# Final model: the fold forests' trees, or a refit on the full dataset
+clf, refit_seconds, refit_throughput = final_model(cv, X, y_fault_encoded, args.refit)
 with open("model_fault.pkl", "wb") as f:
     pickle.dump(clf, f)
-print("Fault classifier trained on full dataset and saved as model_fault.pkl\n")
+if refit_throughput is None:
+    print("Fault classifier assembled from the fold models and saved as model_fault.pkl\n")
+else:
+    print(f"Fault classifier trained on full dataset in {refit_seconds:.1f} s "
+          f"({refit_throughput:,.0f} samples/s) and saved as model_fault.pkl\n")
+
+# Publish as a new memory-mapped version; running servers swap to it
+if args.backend != "forest":
+    # Otherwise the store's current version (an earlier forest) stays in production
+    ModelStore(args.store).deactivate()
+    print(f"Only forests compile to the model store; {args.store} deactivated, "
+          f"so the app now serves model_fault.pkl\n")
+elif not args.no_publish:
+    version = ModelStore(args.store).publish(clf, le, normal_centroid, window=args.window, stride=args.stride)
+    print(f"Model published to {args.store} as version {version}\n")
+else:
+    print(f"Not published: the app keeps serving the current version of {args.store}, if any. "
+          f"Publish later with: python model_store.py publish --window {args.window} --stride {args.stride}\n")
 
 # ----------------------------
 # STEP 8: FEATURE IMPORTANCE VISUALIZATION
@@ -0,0 +1,194 @@
+"""
+Stateful ThingSpeak monitoring.
+
+Each ChannelMonitor remembers the last entry_id it has seen and only
+fetches newer feeds. Samples go into a fixed-size rolling window with
+running sums per axis, so a poll costs only the new samples instead of
+refetching the last 100 feeds and recomputing every feature.
+"""
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_NAMES, FFT_CHANNEL, SENSOR_COLUMNS, fft_peak
+from thingspeak_client import REQUEST_TIMEOUT, THINGSPEAK_URL, default_session, feeds_to_rows
+
+
+# Samples kept per channel (the route used to fetch the last 100 feeds)
+WINDOW_SIZE = 100
+
+# Channels kept in memory before the least recently used is dropped
+MAX_MONITORS = 1024
+
+
+class RollingWindow:
+    """
+    Ring buffer of the last `size` sensor rows.
+
+    Sum of squares is kept as a running sum and min/max as monotonic
+    deques, so push() is O(1) amortised and RMS/P2P never rescan the window.
+    """
+
+    def __init__(self, size=WINDOW_SIZE, n_channels=len(SENSOR_COLUMNS)):
+        self.size = size
+        self.data = np.zeros((size, n_channels))
+        self.count = 0
+        self.pushed = 0
+        self.sumsq = np.zeros(n_channels)
+        self._max = [deque() for _ in range(n_channels)]
+        self._min = [deque() for _ in range(n_channels)]
+
+    def push(self, row):
+        seq = self.pushed
+        pos = seq % self.size
+
+        if self.count == self.size:
+            old = self.data[pos]
+            self.sumsq -= old * old
+        else:
+            self.count += 1
+
+        self.data[pos] = row
+        self.sumsq += row * row
+        self.pushed += 1
+
+        # Oldest sequence number still inside the window
+        first = self.pushed - self.count
+        for c, value in enumerate(row):
+            dmax = self._max[c]
+            while dmax and dmax[-1][1] <= value:
+                dmax.pop()
+            dmax.append((seq, value))
+            if dmax[0][0] < first:
+                dmax.popleft()
+
+            dmin = self._min[c]
+            while dmin and dmin[-1][1] >= value:
+                dmin.pop()
+            dmin.append((seq, value))
+            if dmin[0][0] < first:
+                dmin.popleft()
+
+        # Re-sum once per full turn so rounding error cannot build up
+        if self.pushed % self.size == 0:
+            valid = self.data[:self.count]
+            self.sumsq = np.einsum("ij,ij->j", valid, valid)
+
+    def extend(self, rows):
+        for row in rows:
+            self.push(row)
+
+    def ordered(self):
+        """Window contents, oldest row first."""
+        if self.count < self.size:
+            return self.data[:self.count].copy()
+        pos = self.pushed % self.size
+        return np.concatenate([self.data[pos:], self.data[:pos]])
+
+    def raw_features(self, fs=1.0):
+        """Canonical feature vector, same layout as FeatureEngine.raw()."""
+        if self.count == 0:
+            raise ValueError("Rolling window is empty.")
+
+        out = np.empty(len(FEATURE_NAMES), dtype=np.float64)
+        rms = np.sqrt(np.maximum(self.sumsq, 0.0) / self.count)
+        p2p = np.array([dmax[0][1] - dmin[0][1] for dmax, dmin in zip(self._max, self._min)])
+
+        out[0:3] = rms[0:3]
+        out[3:6] = p2p[0:3]
+        out[6], out[7] = fft_peak(self.ordered()[:, FFT_CHANNEL], fs)
+        out[8:11] = rms[3:6]
+        out[11:14] = p2p[3:6]
+
+        return out
+
+
+class ChannelMonitor:
+    """
+    Rolling view of one ThingSpeak channel.
+
+    poll() fetches only feeds newer than last_entry_id. `version` changes
+    whenever new samples arrive; callers may memoise an analysis of the
+    current window in `result` / `result_version`.
+    """
+
+    def __init__(self, channel_id, api_key=None, window=WINDOW_SIZE,
+                 base_url=THINGSPEAK_URL, session=None):
+        self.channel_id = channel_id
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.session = session or default_session()
+        self.window = RollingWindow(window)
+        self.last_entry_id = None
+        self.channel_info = {}
+        self.version = 0
+        self.result = None
+        self.result_version = None
+        self.lock = threading.Lock()
+
+    def _get(self, path, **params):
+        if self.api_key:
+            params["api_key"] = self.api_key
+        url = f"{self.base_url}/channels/{self.channel_id}/{path}"
+        response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def poll(self):
+        """Pulls new feeds into the window and returns how many rows were added."""
+        if self.last_entry_id is None:
+            results = self.window.size
+        else:
+            # last.json is a single small feed; it tells us how far behind we are
+            last = self._get("feeds/last.json")
+            latest = int(last.get("entry_id") or 0) if isinstance(last, dict) else 0
+            if latest <= self.last_entry_id:
+                return 0
+            results = min(latest - self.last_entry_id, self.window.size)
+
+        data = self._get("feeds.json", results=results)
+        self.channel_info = data.get("channel") or self.channel_info
+
+        feeds = [
+            feed for feed in data.get("feeds", [])
+            if self.last_entry_id is None or feed["entry_id"] > self.last_entry_id
+        ]
+        if not feeds:
+            return 0
+
+        self.last_entry_id = max(feed["entry_id"] for feed in feeds)
+
+        rows = feeds_to_rows(feeds)
+        if len(rows):
+            self.window.extend(rows)
+            self.version += 1
+
+        return len(rows)
+
+    def frame(self):
+        """Window contents as a DataFrame with SENSOR_COLUMNS."""
+        return pd.DataFrame(self.window.ordered(), columns=SENSOR_COLUMNS)
+
+
+# ---------------- Registry ----------------
+_monitors = OrderedDict()
+_monitors_lock = threading.Lock()
+
+
+def get_monitor(channel_id, api_key=None, **kwargs):
+    """Returns the monitor for (channel_id, api_key), creating it on first use."""
+    key = (str(channel_id), api_key)
+
+    with _monitors_lock:
+        monitor = _monitors.get(key)
+        if monitor is None:
+            monitor = ChannelMonitor(channel_id, api_key, **kwargs)
+            _monitors[key] = monitor
+        _monitors.move_to_end(key)
+
+        while len(_monitors) > MAX_MONITORS:
+            _monitors.popitem(last=False)
+
+    return monitor
@@ -0,0 +1,293 @@
+"""
+Shared analysis pipeline.
+
+Every prediction route runs the same steps: sensor features, the HOTFIX for
+legacy models, prediction, deviation from the normal centroid, RUL and
+health, the time series and the PSD. AnalysisPipeline holds them as named
+stages over a state dict. Each stage declares the keys it needs and the
+keys it provides; run() computes only what the requested outputs depend on
+and skips every key the state already holds, so
+
+  - a route that does not plot asks for no PSD and never pays for it,
+  - callers that already have an input (the streaming reader's raw
+    features and PSD, the ThingSpeak monitor's running sums) seed the state
+    with it and the matching stages are skipped,
+  - a cached analysis is itself a state: missing outputs can be filled in
+    later without repeating the rest.
+
+Per-model constants (centroid, dev_ref, label table, feature window, HOTFIX
+columns) are computed once per model version. Stage durations of every run are recorded
+in state["timings"].
+
+Stages work on N rows at a time, so the batch routes use the same pipeline
+with an (N, 14) matrix of raw features.
+"""
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from features import SENSOR_COLUMNS, sensor_matrix
+from spectrum import PSDAccumulator
+
+
+# Outputs an analysis holds (see AnalysisPipeline.analyze)
+ANALYSIS_OUTPUTS = ("predictions", "feature_records", "sample_count", "index", "series", "f", "Pxx")
+
+# Outputs of the PSD stage, left out when a client does not plot it
+PSD_OUTPUTS = ("f", "Pxx")
+
+
+# ---------------- RUL Calculation ----------------
+# Health percentages below these are critical / warning
+CRITICAL_HEALTH = 25
+WARNING_HEALTH = 75
+HEALTH_STATUSES = np.array(["critical", "warning", "normal"], dtype=object)
+
+
+def rul_fractions(devs, dev_ref=1.0):
+    """Remaining-life fraction (0.05..1) per centroid deviation."""
+    k = 0.55
+    frac = 1 / (1 + k * (np.asarray(devs, dtype=np.float64) / (dev_ref + 1e-9)))
+    return np.maximum(0.05, frac)
+
+
+def health_statuses(frac):
+    """"critical", "warning" or "normal" per RUL fraction."""
+    health = np.asarray(frac) * 100
+    return HEALTH_STATUSES[np.searchsorted([CRITICAL_HEALTH, WARNING_HEALTH], health, side="right")]
+
+
+def health_scores(devs, dev_ref=1.0, max_years=25):
+    """
+    RUL and health of M deviations in one pass: a dict of length-M arrays
+    (deviation, frac, years, months, health_percentage, health_status).
+    """
+    devs = np.asarray(devs, dtype=np.float64)
+    frac = rul_fractions(devs, dev_ref)
+
+    days = frac * max_years * 365
+    return {
+        "deviation": devs,
+        "frac": frac,
+        "years": (days // 365).astype(np.int64),
+        "months": ((days % 365) // 30).astype(np.int64),
+        "health_percentage": (frac * 100).astype(np.int64),
+        "health_status": health_statuses(frac)
+    }
+
+
+def prediction_records(faults, health):
+    """The prediction dicts the routes return, one per row of health_scores()."""
+    return [
+        {
+            "fault": fault,
+            "rul": f"{years} years {months} months",
+            "rul_years": years,
+            "rul_months": months,
+            "health_percentage": percentage,
+            "health_status": status,
+            "deviation": round(dev, 2)
+        }
+        for fault, dev, years, months, percentage, status in zip(
+            faults,
+            health["deviation"].tolist(),
+            health["years"].tolist(),
+            health["months"].tolist(),
+            health["health_percentage"].tolist(),
+            health["health_status"].tolist()
+        )
+    ]
+
+
+# ---------------- Stages ----------------
+class Stage:
+    """
+    fn(pipeline, *inputs) returns a dict with the keys in provides; inputs
+    are the state values named in requires, in order.
+    """
+
+    def __init__(self, name, requires, provides, fn):
+        self.name = name
+        self.requires = tuple(requires)
+        self.provides = tuple(provides)
+        self.fn = fn
+
+
+def raw_stage(pipeline, df):
+    # Rows with any missing value are dropped before feature extraction
+    X = sensor_matrix(df.dropna())
+    engine = pipeline.model.feature_engine
+    if pipeline.window is None:
+        return {"raw": engine.raw(X)}
+    # Scored on the windows the model was trained on, whatever the capture length
+    return {"raw": engine.capture_raw(X, pipeline.window, pipeline.stride)}
+
+
+def features_stage(pipeline, raw):
+    """Feature rows in model order, as the DataFrame the model expects."""
+    model = pipeline.model
+    vec = model.feature_engine.select(np.atleast_2d(raw))
+
+    # ---------------------------------------------------------
+    # 🩹 HOTFIX: Legacy models were trained on single-sample rows,
+    # so P2P and Freq features were effectively 0 in the Normal Centroid.
+    # We must zero them out here to make the Deviation meaningful (comparable to Centroid),
+    # otherwise real P2P values cause massive deviation and minimal RUL.
+    # FFT Peak Amp was just |x| (same as RMS) in training, so the
+    # Vibration one is set to Vib RMS X to match Centroid behavior.
+    # Models trained on windowed features (model_training.py) skip this.
+    # ---------------------------------------------------------
+    if model.legacy_features:
+        vec[:, pipeline.hotfix_zero] = 0.0
+        for i, source in pipeline.hotfix_copy:
+            vec[:, i] = vec[:, source]  # Approx match
+
+    return {"features_df": pd.DataFrame(vec, columns=model.feature_names)}
+
+
+def predict_stage(pipeline, features_df):
+    # 2️⃣ Prediction
+    codes = pipeline.model.predict_codes(features_df)
+    return {"faults": pipeline.labels[np.asarray(codes)]}
+
+
+def health_stage(pipeline, features_df):
+    # 3️⃣ Deviation & RUL
+    devs = np.linalg.norm(features_df.to_numpy() - pipeline.centroid, axis=1)
+    return {"deviations": devs}
+
+
+def rul_stage(pipeline, deviations):
+    return {"health": health_scores(deviations, pipeline.dev_ref)}
+
+
+def report_stage(pipeline, faults, health):
+    return {"predictions": prediction_records(faults, health)}
+
+
+def feature_records_stage(pipeline, features_df):
+    return {"feature_records": features_df.round(4).to_dict(orient="records")}
+
+
+def series_stage(pipeline, df):
+    series = df[SENSOR_COLUMNS].to_numpy(dtype=np.float64)
+    return {
+        "index": df.index.to_numpy(),
+        "series": series,
+        # Rows the features are computed on (complete rows), as streaming counts
+        "sample_count": int(np.count_nonzero(~np.isnan(series).any(axis=1)))
+    }
+
+
+def psd_stage(pipeline, series):
+    """Welch PSD of all six sensor axes -> (f, Pxx) with Pxx shaped (n_freqs, 6)."""
+    # 4️⃣ PSD; rows with a missing sensor value are skipped
+    X = np.ascontiguousarray(series[~np.isnan(series).any(axis=1)])
+    acc = PSDAccumulator(len(SENSOR_COLUMNS), fs=pipeline.fs)
+    acc.update(X)
+    f, Pxx = acc.snapshot()
+    return {"f": f, "Pxx": Pxx}
+
+
+DEFAULT_STAGES = (
+    Stage("raw", ["df"], ["raw"], raw_stage),
+    Stage("features", ["raw"], ["features_df"], features_stage),
+    Stage("predict", ["features_df"], ["faults"], predict_stage),
+    Stage("health", ["features_df"], ["deviations"], health_stage),
+    Stage("rul", ["deviations"], ["health"], rul_stage),
+    Stage("report", ["faults", "health"], ["predictions"], report_stage),
+    Stage("feature_records", ["features_df"], ["feature_records"], feature_records_stage),
+    Stage("series", ["df"], ["index", "series", "sample_count"], series_stage),
+    Stage("psd", ["series"], PSD_OUTPUTS, psd_stage),
+)
+
+
+# ---------------- Pipeline ----------------
+class AnalysisPipeline:
+    """The analysis stages bound to one model version and its constants."""
+
+    def __init__(self, model, stages=DEFAULT_STAGES, fs=1.0):
+        # A proxy: pipeline_for keys its cache weakly on the model, and a
+        # strong reference from the value would keep every model alive
+        self.model = weakref.proxy(model)
+        self.fs = fs
+
+        self.centroid = model.centroid
+        self.dev_ref = max(np.linalg.norm(self.centroid) * 0.15, 1.0)
+        self.labels = model.labels
+
+        # Legacy models were trained on single samples, not windows: their
+        # features stay whole-capture (and get the HOTFIX)
+        self.window = None if model.legacy_features else model.window
+        self.stride = model.stride
+
+        names = model.feature_names
+        self.hotfix_zero = [i for i, col in enumerate(names) if "P2P" in col or "Freq" in col]
+        self.hotfix_copy = [
+            (i, names.index("Vib_RMS_X"))
+            for i, col in enumerate(names) if "Peak_Amp" in col and "Vib" in col
+        ]
+
+        self.stages = {}
+        for stage in stages:
+            self.add_stage(stage)
+
+    def add_stage(self, stage):
+        """Adds a stage, replacing the one with the same name or outputs."""
+        self.stages = {
+            name: other for name, other in self.stages.items()
+            if name != stage.name and not set(other.provides) & set(stage.provides)
+        }
+        self.stages[stage.name] = stage
+        self._providers = {key: s for s in self.stages.values() for key in s.provides}
+
+    def run(self, state, outputs):
+        """Computes the missing outputs (and what they need) into state; returns state."""
+        timings = state.setdefault("timings", {})
+        for key in outputs:
+            self._resolve(key, state, timings)
+        return state
+
+    def _resolve(self, key, state, timings):
+        if key in state:
+            return
+
+        stage = self._providers.get(key)
+        if stage is None:
+            raise KeyError(f"No pipeline stage provides {key!r}")
+
+        for required in stage.requires:
+            self._resolve(required, state, timings)
+
+        start = time.perf_counter()
+        state.update(stage.fn(self, *(state[name] for name in stage.requires)))
+        timings[stage.name] = time.perf_counter() - start
+
+    def analyze(self, state, psd=True):
+        """
+        Runs one capture and returns its analysis: the state without the
+        DataFrame, plus "prediction" and "features" of its single row.
+        """
+        outputs = ANALYSIS_OUTPUTS if psd else [k for k in ANALYSIS_OUTPUTS if k not in PSD_OUTPUTS]
+        state = self.run(state, outputs)
+        state.pop("df", None)
+
+        state["prediction"] = state["predictions"][0]
+        state["features"] = state["feature_records"][0]
+        return state
+
+
+_pipelines = weakref.WeakKeyDictionary()
+
+
+def pipeline_for(model):
+    """
+    The pipeline of a model, built once per loaded model version and
+    dropped with the model (e.g. once a hot swap has replaced it).
+    """
+    pipeline = _pipelines.get(model)
+    if pipeline is None:
+        pipeline = _pipelines.setdefault(model, AnalysisPipeline(model))
+    return pipeline
@@ -0,0 +1,157 @@
+"""
+In-memory cache of analysis results keyed by the uploaded bytes.
+
+Operators re-upload the same CSVs and the mobile apps retry on timeout;
+identical payloads are answered from memory instead of re-running feature
+extraction, prediction and PSD. Keys include a fingerprint of the model
+artifacts, and the whole cache is dropped as soon as any of them changes.
+
+An analysis holds the uploaded series, so the cache is bounded by the bytes
+its entries hold as well as by their number.
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Bytes hashed per read when digesting an upload
+DIGEST_CHUNK = 1 << 20
+
+
+def upload_digest(stream):
+    """SHA-256 hex digest of a seekable upload stream; rewinds it afterwards."""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for block in iter(lambda: stream.read(DIGEST_CHUNK), b""):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def upload_size(stream):
+    """Size in bytes of a seekable upload stream; rewinds it afterwards."""
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def value_nbytes(value):
+    """Approximate memory held by a cached value: array buffers plus Python object sizes."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(value_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Bounded LRU cache with a per-entry TTL.
+
+    Least recently used entries are evicted while there are more than
+    max_entries or they hold more than max_bytes (value_nbytes); a value
+    larger than max_bytes on its own is not cached. watch_files are the model
+    artifacts; their (mtime, size) fingerprint is part of every key and a
+    change clears the cache.
+    """
+
+    def __init__(self, max_entries=256, ttl=3600, watch_files=(), max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.watch_files = list(watch_files)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (expiry, value, nbytes)
+        self._lock = threading.Lock()
+        self._version = self._fingerprint()
+
+    def _fingerprint(self):
+        parts = []
+        for path in self.watch_files:
+            try:
+                st = os.stat(path)
+                parts.append(f"{path}:{st.st_mtime_ns}:{st.st_size}")
+            except OSError:
+                parts.append(f"{path}:missing")
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+    def model_version(self):
+        """Current artifact fingerprint; clears the cache if it has changed."""
+        version = self._fingerprint()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._entries.clear()
+                    self.bytes = 0
+                    self._version = version
+                    self.invalidations += 1
+        return version
+
+    def key(self, digest, *variant):
+        """Cache key for an upload digest, the model version and a route variant."""
+        return ":".join([digest, self.model_version(), *map(str, variant)])
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                    self.bytes -= entry[2]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        # Keys built before a model change would never be looked up again
+        if key.split(":")[1] != self.model_version():
+            return
+        # Sized on every put: routes re-put an analysis after adding the PSD
+        nbytes = value_nbytes(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl, value, nbytes)
+            self.bytes += nbytes
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.bytes > self.max_bytes
+            ):
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "model_version": self._version
+            }
@@ -0,0 +1,165 @@
+"""
+Schema-aware reading of sensor captures.
+
+The six sensor columns are known in advance, so instead of letting
+pd.read_csv infer every column's type on every upload the header is
+validated once and only those columns are parsed, straight into float64
+(or float32) NumPy columns. pyarrow's multithreaded CSV reader is used
+when it is installed; pandas' C parser otherwise.
+
+Excel captures (the training data) are slow to parse through openpyxl.
+read_excel_cached converts a workbook to a columnar .npz file on first
+read; later reads load the arrays directly as long as the workbook's size
+and mtime are unchanged.
+
+read_dataset loads the training dataset built by combine_data.py, reading
+only the columns and condition partitions the caller asks for.
+"""
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from features import SENSOR_COLUMNS
+
+try:
+    import pyarrow  # noqa: F401 -- only needed as the pandas engine
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+
+CACHE_DIR = ".sensor_cache"
+CACHE_FORMAT = 1
+
+
+# ---------------- CSV ----------------
+def read_header(source):
+    """Column names of a CSV path or seekable stream (the stream is rewound)."""
+    if isinstance(source, (str, os.PathLike)):
+        return list(pd.read_csv(source, nrows=0).columns)
+
+    position = source.tell()
+    try:
+        return list(pd.read_csv(source, nrows=0).columns)
+    finally:
+        source.seek(position)
+
+
+def validate_header(header, columns=SENSOR_COLUMNS):
+    missing = [col for col in columns if col not in header]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+
+def csv_options(dtype=np.float64, columns=SENSOR_COLUMNS):
+    """pd.read_csv keyword arguments that parse only the sensor columns, with a fixed dtype."""
+    return {"usecols": list(columns), "dtype": {col: dtype for col in columns}}
+
+
+def read_sensor_csv(source, dtype=np.float64, columns=SENSOR_COLUMNS):
+    """
+    DataFrame of just the sensor columns of a CSV path or stream.
+    Raises ValueError for a missing column or a non-numeric value.
+    """
+    validate_header(read_header(source), columns)
+    engine = "pyarrow" if HAVE_PYARROW else "c"
+    return pd.read_csv(source, engine=engine, **csv_options(dtype, columns))
+
+
+# ---------------- Excel ----------------
+def _cache_path(path, cache_dir):
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR)
+    return os.path.join(cache_dir, os.path.basename(path) + ".npz")
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return np.array([CACHE_FORMAT, st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def _load_cached(cache_path, fingerprint):
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            if not np.array_equal(data["__source__"], fingerprint):
+                return None
+            columns = [str(col) for col in data["__columns__"]]
+            frame = {}
+            for i, col in enumerate(columns):
+                values = data[f"c{i}"]
+                mask_key = f"na{i}"
+                if mask_key in data.files:
+                    # Text column: missing cells were stored as a mask
+                    values = values.astype(object)
+                    values[data[mask_key]] = np.nan
+                frame[col] = values
+    except (OSError, KeyError, ValueError):
+        return None
+    return pd.DataFrame(frame, columns=columns)
+
+
+def _save_cached(df, cache_path, fingerprint):
+    arrays = {"__source__": fingerprint, "__columns__": np.array([str(col) for col in df.columns])}
+    for i, col in enumerate(df.columns):
+        values = df[col].to_numpy()
+        if values.dtype.kind in "biufcmM":
+            arrays[f"c{i}"] = values
+        else:
+            mask = df[col].isna().to_numpy()
+            arrays[f"c{i}"] = np.where(mask, "", values.astype(str))
+            arrays[f"na{i}"] = mask
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".cache-", suffix=".npz", dir=os.path.dirname(cache_path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, cache_path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def read_excel_cached(path, cache_dir=None):
+    """
+    pd.read_excel(path), served from a columnar .npz copy after the first
+    read. The copy lives in <dir of path>/.sensor_cache unless cache_dir is
+    given and is rebuilt whenever the workbook changes.
+    """
+    cache_path = _cache_path(path, cache_dir)
+    fingerprint = _fingerprint(path)
+
+    df = _load_cached(cache_path, fingerprint)
+    if df is None:
+        df = pd.read_excel(path)
+        try:
+            _save_cached(df, cache_path, fingerprint)
+        except OSError as e:
+            # A read-only data directory only costs the speed-up
+            print(f"Could not cache {path}: {e}")
+    return df
+
+
+# ---------------- Training dataset ----------------
+def read_dataset(path, columns=None, conditions=None):
+    """
+    Training data written by combine_data.py: the partitioned Parquet
+    directory, or a combined_dataset.csv. Only the given columns (plus
+    Condition) of the given conditions are read; None means all of them.
+    """
+    if columns is not None:
+        columns = list(columns) + (["Condition"] if "Condition" not in columns else [])
+
+    if os.path.isdir(path):
+        filters = [("Condition", "in", list(conditions))] if conditions is not None else None
+        df = pd.read_parquet(path, columns=columns, filters=filters)
+        # The partition key comes back categorical
+        df["Condition"] = df["Condition"].astype(str).astype(object)
+        return df
+
+    wanted = set(columns) if columns is not None else None
+    df = pd.read_csv(path, usecols=(lambda col: col in wanted) if wanted is not None else None)
+    if conditions is not None:
+        df = df[df["Condition"].isin(list(conditions))].reset_index(drop=True)
+    return df
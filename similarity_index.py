@@ -0,0 +1,424 @@
+"""
+Persistent nearest-neighbour index over historical feature vectors.
+
+Every analysed window adds its feature vector (model feature order, the
+space the normal centroid lives in) and its predicted fault; a query
+returns the k most similar past windows with their faults and distances.
+
+The index is a directory:
+
+    <root>/manifest.json          feature names, fault labels, segments, journals
+    <root>/journal-<n>.bin        recent inserts, fixed-size records appended
+    <root>/segment-<n>-vectors.npy   merged segments: (N, F) float64 vectors
+    <root>/segment-<n>-meta.npy      and their fault label codes and times
+    <root>/.lock                  held while appending or changing the manifest
+    <root>/.merge.lock            held by the one process merging segments
+
+Inserts append to the journal under an exclusive file lock, so gunicorn
+workers and pool processes can all write. A journal that reaches
+JOURNAL_ROWS records is sealed: the manifest lists it as sealed and names
+a fresh journal, which is all an insert ever does besides appending.
+
+Sealed journals become segments in the background. Each process runs a
+maintenance thread; whichever one gets the merge lock turns the sealed
+journals into a segment and merges segments while the newest is at least
+half the size of the one before it (the logarithmic method), writing the
+result before it takes the file lock for the moment it needs to swap the
+manifest. With n vectors there are at most log2(n/JOURNAL_ROWS) segments;
+each is searched through its own KD-tree and only the journals are
+scanned, so no query touches all n vectors.
+
+Segment vectors are memory-mapped and the KD-trees are built directly on
+the maps, so processes share the vectors through the page cache. Queries
+never build a tree: a process keeps searching the segments it has trees
+for (and the journals it has read) until its maintenance thread has built
+the trees of a new manifest, then swaps to it; journals merged and
+removed before the process read them are missing from its answers until
+then. The manifest is replaced atomically, so a crash mid-merge cannot
+index a window twice.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import cdist
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development server only
+    fcntl = None
+
+
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+MERGE_LOCK_FILE = ".merge.lock"
+INDEX_FORMAT = 1
+
+# Inserts kept in a linearly scanned journal before it is sealed
+JOURNAL_ROWS = 4096
+
+# Per-vector fields of a segment
+META_DTYPE = np.dtype([("label", "<i4"), ("time", "<f8")])
+
+
+def record_dtype(n_features):
+    """Journal record: one vector with its label code and time."""
+    return np.dtype([("vector", "<f8", (n_features,)), ("label", "<i4"), ("time", "<f8")])
+
+
+class SimilarityIndex:
+    """
+    k-nearest-neighbour lookups over every feature vector ever inserted.
+
+    background=False leaves merging and tree building to explicit
+    maintain() calls (tests, scripts).
+    """
+
+    def __init__(self, root, feature_names, journal_rows=JOURNAL_ROWS, background=True):
+        self.root = root
+        self.feature_names = [str(name) for name in feature_names]
+        self.dtype = record_dtype(len(self.feature_names))
+        self.journal_rows = journal_rows
+        self.background = background
+
+        self._lock = threading.Lock()
+        self._manifest = None  # latest manifest read
+        self._manifest_stamp = None
+        self._labels = np.empty(0, dtype=object)
+        self._view = None  # manifest whose segments are searched
+        self._trees = {}  # segment name -> (tree, meta)
+        self._journals = {}  # journal name -> records read so far
+
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+
+        os.makedirs(root, exist_ok=True)
+        with self._locked():
+            manifest = self._read_manifest()
+            if manifest is None:
+                self._write_manifest({
+                    "format": INDEX_FORMAT,
+                    "feature_names": self.feature_names,
+                    "labels": [],
+                    "segments": [],
+                    "sealed": [],
+                    "journal": "journal-0.bin",
+                    "next_id": 1
+                })
+            elif manifest["feature_names"] != self.feature_names:
+                raise ValueError(f"Similarity index {root} holds other features: {manifest['feature_names']}")
+
+        # The trees of the existing segments, built once here rather than on a query
+        self.maintain(merge=False)
+
+    # ---------------- Storage ----------------
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    @contextmanager
+    def _locked(self, name=LOCK_FILE, blocking=True):
+        """Exclusive file lock; yields False when blocking=False and another process holds it."""
+        with open(self._path(name), "a") as f:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    yield False
+                    return
+            try:
+                yield True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_manifest(self):
+        try:
+            with open(self._path(MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        if manifest.get("format") != INDEX_FORMAT:
+            raise ValueError(f"Unsupported similarity index format {manifest.get('format')}")
+        # Indexes written before journals were sealed in the background
+        manifest.setdefault("sealed", [])
+        return manifest
+
+    def _write_manifest(self, manifest):
+        fd, tmp = tempfile.mkstemp(prefix=".manifest-", dir=self.root)
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, self._path(MANIFEST_FILE))
+
+    def _read_records(self, name, skip=0):
+        """Whole records of a journal from record `skip` on (a concurrent append may be half written)."""
+        path = self._path(name)
+        with open(path, "rb") as f:
+            count = os.fstat(f.fileno()).st_size // self.dtype.itemsize - skip
+            if count <= 0:
+                return np.empty(0, dtype=self.dtype)
+            f.seek(skip * self.dtype.itemsize)
+            return np.fromfile(f, dtype=self.dtype, count=count)
+
+    def _segment_files(self, name):
+        return self._path(f"{name}-vectors.npy"), self._path(f"{name}-meta.npy")
+
+    def _load_segment(self, name):
+        vectors_path, meta_path = self._segment_files(name)
+        return np.load(vectors_path, mmap_mode="r"), np.load(meta_path, mmap_mode="r")
+
+    def _save_segment(self, name, vectors, meta):
+        for path, values in zip(self._segment_files(name), (vectors, meta)):
+            fd, tmp = tempfile.mkstemp(prefix=".segment-", suffix=".npy", dir=self.root)
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.ascontiguousarray(values))
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+
+    def _remove(self, paths):
+        # Processes still holding these keep their open maps
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # ---------------- Inserts ----------------
+    def insert(self, vectors, labels, times=None):
+        """Adds (M, F) vectors with their M fault labels (and epoch times, default now)."""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float64))
+        if vectors.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected vectors of {len(self.feature_names)} features")
+        if len(labels) != len(vectors):
+            raise ValueError("One label per vector")
+
+        with self._locked():
+            manifest = self._read_manifest()
+            changed = False
+
+            table = {label: code for code, label in enumerate(manifest["labels"])}
+            new = [str(label) for label in dict.fromkeys(labels) if str(label) not in table]
+            if new:
+                base = len(table)
+                table.update((label, base + i) for i, label in enumerate(new))
+                manifest["labels"].extend(new)
+                changed = True
+
+            records = np.empty(len(vectors), dtype=self.dtype)
+            records["vector"] = vectors
+            records["label"] = [table[str(label)] for label in labels]
+            records["time"] = time.time() if times is None else times
+
+            journal = self._path(manifest["journal"])
+            with open(journal, "ab") as f:
+                f.write(records.tobytes())
+
+            # Sealing only renames the journal in the manifest; merging is background work
+            sealed = os.path.getsize(journal) // self.dtype.itemsize >= self.journal_rows
+            if sealed:
+                manifest["sealed"].append(manifest["journal"])
+                manifest["journal"] = f"journal-{manifest['next_id']}.bin"
+                manifest["next_id"] += 1
+                changed = True
+
+            if changed:
+                self._write_manifest(manifest)
+
+        if sealed:
+            self._notify()
+
+    # ---------------- Maintenance ----------------
+    def _notify(self):
+        """Wakes this process's maintenance thread (started on first use, again after a fork)."""
+        if not self.background:
+            return
+        if self._thread is None or self._thread_pid != os.getpid() or not self._thread.is_alive():
+            self._wake = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="similarity-index", daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        wake = self._wake
+        while True:
+            wake.wait()
+            wake.clear()
+            try:
+                self.maintain()
+            except Exception as e:
+                print(f"Similarity index maintenance failed: {e}")
+
+    def maintain(self, merge=True):
+        """
+        Merges sealed journals into segments (when merge and no other process
+        is merging) and builds the trees of the current manifest, then lets
+        queries use them. Runs in the maintenance thread.
+        """
+        while merge and self._merge_sealed():
+            pass
+
+        with self._locked():
+            manifest = self._read_manifest()
+        names = [segment["name"] for segment in manifest["segments"]]
+
+        with self._lock:
+            trees = {name: self._trees[name] for name in names if name in self._trees}
+        for name in names:
+            if name not in trees:
+                vectors, meta = self._load_segment(name)
+                # Median splits: slower to build than sliding midpoint, faster to query
+                trees[name] = (cKDTree(vectors, balanced_tree=True, compact_nodes=True), meta)
+
+        # Swap: the trees are complete before any query sees them
+        with self._lock:
+            self._trees = trees
+            self._view = manifest
+            self._manifest_stamp = None
+
+    def _merge_sealed(self):
+        """Turns the sealed journals into a segment and merges segments; False when there is nothing to do."""
+        with self._locked(MERGE_LOCK_FILE, blocking=False) as acquired:
+            if not acquired:
+                # Another process is merging; it picks these journals up too
+                return False
+
+            with self._locked():
+                manifest = self._read_manifest()
+                sealed = list(manifest["sealed"])
+                if not sealed:
+                    return False
+                # Reserve a name for the new segment
+                name = f"segment-{manifest['next_id']}"
+                manifest["next_id"] += 1
+                self._write_manifest(manifest)
+
+            # Segments only change here, under the merge lock: this list stays current
+            segments = list(manifest["segments"])
+            records = np.concatenate([self._read_records(journal) for journal in sealed])
+            vectors = [records["vector"]]
+            meta = np.empty(len(records), dtype=META_DTYPE)
+            meta["label"], meta["time"] = records["label"], records["time"]
+            metas = [meta]
+
+            rows = len(records)
+            merged_away = []
+            while segments and 2 * rows >= segments[-1]["rows"]:
+                older = segments.pop()
+                old_vectors, old_meta = self._load_segment(older["name"])
+                vectors.insert(0, old_vectors)
+                metas.insert(0, old_meta)
+                rows += older["rows"]
+                merged_away.append(older["name"])
+
+            self._save_segment(name, np.concatenate(vectors), np.concatenate(metas))
+
+            with self._locked():
+                manifest = self._read_manifest()
+                manifest["segments"] = segments + [{"name": name, "rows": rows}]
+                manifest["sealed"] = [journal for journal in manifest["sealed"] if journal not in sealed]
+                self._write_manifest(manifest)
+
+            self._remove([self._path(journal) for journal in sealed]
+                         + [path for old in merged_away for path in self._segment_files(old)])
+        return True
+
+    # ---------------- Queries ----------------
+    def _refresh(self):
+        """
+        Catches up with other processes (self._lock held): reads the labels of
+        a changed manifest and the records appended to the journals. Segments
+        of a new manifest are only searched once maintain() has their trees.
+        """
+        st = os.stat(self._path(MANIFEST_FILE))
+        stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if stamp != self._manifest_stamp:
+            self._manifest = self._read_manifest()
+            self._manifest_stamp = stamp
+            self._labels = np.array(self._manifest["labels"], dtype=object)
+            if self._manifest["segments"] != self._view["segments"]:
+                self._notify()
+
+        # Journals not yet merged into the searched segments. Merges take every
+        # sealed journal, so those are the journals numbered from the view's
+        # oldest unmerged one on; ones sealed and merged since are only known
+        # here if this process read them before they were removed
+        def number(journal):
+            return int(journal[len("journal-"):-len(".bin")])
+
+        oldest = min(map(number, self._view["sealed"] + [self._view["journal"]]))
+        names = list(self._journals) + self._view["sealed"] + self._manifest["sealed"] + [self._manifest["journal"]]
+        wanted = sorted((name for name in set(names) if number(name) >= oldest), key=number)
+
+        journals = {}
+        for name in wanted:
+            known = self._journals.get(name, np.empty(0, dtype=self.dtype))
+            try:
+                fresh = self._read_records(name, len(known))
+            except FileNotFoundError:
+                # Merged and removed meanwhile: serve what was read until the new trees are in
+                fresh = known[:0]
+            journals[name] = np.concatenate([known, fresh]) if len(fresh) else known
+        self._journals = journals
+
+        # A label added after the manifest was read
+        codes = [records["label"].max() for records in journals.values() if len(records)]
+        if codes and max(codes) >= len(self._labels):
+            self._manifest = self._read_manifest()
+            self._labels = np.array(self._manifest["labels"], dtype=object)
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return sum(len(meta) for _, meta in self._trees.values()) + sum(map(len, self._journals.values()))
+
+    def query(self, vectors, k=5, eps=0.0):
+        """
+        The k nearest stored windows of each of M query vectors, as
+        (distances, labels, times), each shaped (M, k') with k' = min(k, len).
+        eps > 0 allows approximate neighbours (within a factor 1 + eps of the
+        true distances), which prunes far more of the KD-trees.
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float64))
+
+        with self._lock:
+            self._refresh()
+            sources = list(self._trees.values())
+            journal = [records for records in self._journals.values() if len(records)]
+            labels = self._labels
+
+        distances, codes, times = [], [], []
+        for tree, meta in sources:
+            d, i = tree.query(vectors, k=min(k, len(meta)), eps=eps)
+            i = i.reshape(len(vectors), -1)
+            distances.append(d.reshape(len(vectors), -1))
+            codes.append(meta["label"][i])
+            times.append(meta["time"][i])
+
+        for records in journal:
+            d = cdist(vectors, records["vector"])
+            if d.shape[1] > k:
+                i = np.argpartition(d, k, axis=1)[:, :k]
+            else:
+                i = np.broadcast_to(np.arange(d.shape[1]), d.shape)
+            distances.append(np.take_along_axis(d, i, axis=1))
+            codes.append(records["label"][i])
+            times.append(records["time"][i])
+
+        if not distances:
+            empty = np.empty((len(vectors), 0))
+            return empty, empty.astype(object), empty
+
+        distances, codes, times = (np.concatenate(parts, axis=1) for parts in (distances, codes, times))
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return (
+            np.take_along_axis(distances, order, axis=1),
+            labels[np.take_along_axis(codes, order, axis=1)],
+            np.take_along_axis(times, order, axis=1)
+        )
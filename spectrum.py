@@ -0,0 +1,74 @@
+"""
+Incremental Welch PSD shared by the dashboard, the JSON API and streaming
+ingestion.
+
+Samples are fed segment by segment; only the samples that do not yet fill
+a segment are kept, so appending data costs just the new segments instead
+of a full welch() over the whole history.
+"""
+import numpy as np
+from scipy.signal import welch
+
+
+# Segment length used for every PSD in the app
+NPERSEG = 256
+
+
+class PSDAccumulator:
+    """
+    Running average of Welch periodograms for every channel of an (N, C)
+    series.
+
+    Uses the same segments scipy's welch() would on the full series
+    (nperseg, 50% overlap, trailing samples that do not fill a segment are
+    ignored), so snapshot() equals welch() over everything fed so far.
+    """
+
+    def __init__(self, n_channels=6, nperseg=NPERSEG, fs=1.0):
+        self.n_channels = n_channels
+        self.nperseg = nperseg
+        self.step = nperseg - nperseg // 2
+        self.fs = fs
+        self.count = 0
+        self.segments = 0
+        self.freqs = None
+        self._total = None
+        self._buffer = np.empty((0, n_channels))
+
+    def update(self, X):
+        """Adds rows of X (shape (n, n_channels)) to the running PSD."""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.n_channels)
+        self.count += len(X)
+
+        buf = np.concatenate([self._buffer, X]) if len(self._buffer) else X
+        if len(buf) < self.nperseg:
+            self._buffer = buf
+            return
+
+        n_seg = (len(buf) - self.nperseg) // self.step + 1
+        used = (n_seg - 1) * self.step + self.nperseg
+
+        # welch() on a block of whole segments returns their mean
+        f, Pxx = welch(buf[:used], fs=self.fs, nperseg=self.nperseg, axis=0)
+        if self._total is None:
+            self.freqs = f
+            self._total = Pxx * n_seg
+        else:
+            self._total += Pxx * n_seg
+        self.segments += n_seg
+
+        self._buffer = buf[n_seg * self.step:].copy()
+
+    def snapshot(self):
+        """
+        Returns (f, Pxx) with Pxx shaped (n_freqs, n_channels) for all data
+        fed so far. Does not change the accumulator.
+        """
+        if self.count == 0:
+            raise ValueError("No samples for PSD.")
+
+        if self.segments == 0:
+            # Shorter than nperseg: the whole series is one segment
+            return welch(self._buffer, fs=self.fs, nperseg=len(self._buffer), axis=0)
+
+        return self.freqs, self._total / self.segments
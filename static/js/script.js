@@ -135,8 +135,8 @@ document.addEventListener('DOMContentLoaded', function() {
         plotLine('vibPlot', samples, vibData, ['Vib X','Vib Y','Vib Z'],'Vibration Time Series','mm/s');
         plotLine('magPlot', samples, magData, ['Mag X','Mag Y','Mag Z'],'Magnetic Time Series','mT');
         // Added specific units to PSD labels for clarity
-        plotLine('psdVibPlot', f_vib, [P_vib], ['PSD Vib X'],'Power Spectral Density (Vibration X)','Power/Frequency (mm/s)');
-        plotLine('psdMagPlot', f_mag, [P_mag], ['PSD Mag X'],'Power Spectral Density (Magnetic X)','Power/Frequency (mT)');
+        plotLine('psdVibPlot', f_vib, P_vib, ['PSD Vib X','PSD Vib Y','PSD Vib Z'],'Power Spectral Density (Vibration)','Power/Frequency (mm/s)');
+        plotLine('psdMagPlot', f_mag, P_mag, ['PSD Mag X','PSD Mag Y','PSD Mag Z'],'Power Spectral Density (Magnetic)','Power/Frequency (mT)');
         
         const featVals = [featNames.map(f => features[f])];
         plotHeatmap('heatmapPlot', featVals, featNames, ['Value'],'Analyzed Features Comparison');
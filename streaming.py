@@ -0,0 +1,119 @@
+"""
+Constant-memory ingestion of large sensor CSVs.
+
+The upload is read in chunks straight from the request stream and folded
+into running per-channel statistics (sum of squares, min, max and an
+incremental Welch PSD), so memory stays flat no matter how long the
+capture is. The results match what app.py computes on a fully loaded DataFrame.
+"""
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_NAMES, FFT_CHANNEL, SENSOR_COLUMNS, fft_peak, window_features
+from sensor_io import csv_options, read_header, validate_header
+from spectrum import PSDAccumulator
+
+
+# Rows parsed per chunk
+CHUNK_ROWS = 50_000
+
+
+class StreamingStats:
+    """
+    Per-channel running statistics for an (N, 6) sensor series fed in chunks.
+
+    Only the FFT peak needs the raw series; set keep_fft_channel=False when
+    the model does not use it (legacy models) to keep memory constant.
+
+    With a window, the features are instead the mean of the window rows
+    (FeatureEngine.capture_raw): each chunk's complete windows are folded
+    into a running sum and only the rows of the next window are carried over.
+    """
+
+    def __init__(self, fs=1.0, keep_fft_channel=True, window=None, stride=None):
+        n = len(SENSOR_COLUMNS)
+        self.fs = fs
+        self.count = 0
+        self.sumsq = np.zeros(n)
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+        self.psd = PSDAccumulator(n, fs=fs)
+        self.keep_fft_channel = keep_fft_channel
+        self._fft_chunks = []
+
+        self.window = window
+        self.stride = stride or window
+        self.windows = 0
+        self._window_sum = np.zeros(len(FEATURE_NAMES))
+        self._pending = np.empty((0, n))  # rows from the next window start on
+        self._skip = 0  # rows before the next window start (stride > window)
+
+    def update(self, X):
+        if len(X) == 0:
+            return
+
+        self.count += len(X)
+        self.sumsq += np.einsum("ij,ij->j", X, X)
+        np.minimum(self.min, X.min(axis=0), out=self.min)
+        np.maximum(self.max, X.max(axis=0), out=self.max)
+
+        self.psd.update(X)
+
+        if self.keep_fft_channel:
+            self._fft_chunks.append(X[:, FFT_CHANNEL].copy())
+
+        if self.window is not None:
+            self._update_windows(X)
+
+    def _update_windows(self, X):
+        skip = min(self._skip, len(X))
+        self._skip -= skip
+        X = np.concatenate([self._pending, X[skip:]])
+
+        rows = window_features(X, self.window, self.stride, self.fs)
+        self.windows += len(rows)
+        self._window_sum += rows.sum(axis=0)
+
+        consumed = len(rows) * self.stride
+        self._skip += max(0, consumed - len(X))
+        self._pending = X[consumed:].copy()
+
+    def raw_features(self):
+        """Canonical feature vector, same layout as FeatureEngine.raw()."""
+        if self.count == 0:
+            raise ValueError("No sensor rows in upload.")
+        if self.windows:
+            return self._window_sum / self.windows
+
+        out = np.zeros(len(FEATURE_NAMES), dtype=np.float64)
+        rms = np.sqrt(self.sumsq / self.count)
+        p2p = self.max - self.min
+
+        out[0:3] = rms[0:3]
+        out[3:6] = p2p[0:3]
+        if self.window is not None:
+            # Shorter than one window: the whole capture is still pending
+            out[6], out[7] = fft_peak(self._pending[:, FFT_CHANNEL], self.fs)
+        elif self.keep_fft_channel:
+            out[6], out[7] = fft_peak(np.concatenate(self._fft_chunks), self.fs)
+        out[8:11] = rms[3:6]
+        out[11:14] = p2p[3:6]
+
+        return out
+
+
+def ingest_csv(stream, chunk_rows=CHUNK_ROWS, **kwargs):
+    """
+    Reads a sensor CSV from a file-like stream chunk by chunk and returns
+    the accumulated StreamingStats. Only the sensor columns are parsed
+    (see sensor_io.py); rows with a missing value are dropped, as the
+    analysis pipeline does.
+    """
+    stats = StreamingStats(**kwargs)
+    validate_header(read_header(stream))
+
+    for chunk in pd.read_csv(stream, chunksize=chunk_rows, **csv_options()):
+        chunk = chunk.dropna()
+        stats.update(np.ascontiguousarray(chunk[SENSOR_COLUMNS].to_numpy(dtype=np.float64)))
+
+    return stats
@@ -0,0 +1,208 @@
+"""
+Synthetic sensor captures for load and scale testing.
+
+Each motor gets its own numpy Generator stream, derived from --seed and the
+motor's number, so a corpus is reproducible whatever the number of worker
+processes. Signals are built from the motor's physics rather than uniform
+noise:
+
+    vibration      load level + shaft rotation harmonics (1x, 2x, 3x),
+                   bearing defect tones (outer race, BPFO ~ 3-3.6x shaft
+                   speed) amplitude-modulated by the rotation, slow load
+                   fluctuation and sensor noise
+    magnetometer   per-axis static field + supply-frequency ripple with
+                   slip sidebands and noise
+
+The condition sets the levels and which terms are present (PROFILES), in
+the same ranges as data_creation.py. Motors cycle through the chosen
+conditions. Every motor is written to its own file, chunk by chunk, so
+memory stays constant whatever the duration. Both formats are written
+through pyarrow's streaming CSV and Parquet writers:
+
+    python synthetic_data.py --motors 2000 --hours 24 --out corpus
+    python synthetic_data.py --motors 8 --rows 240 --format parquet --out uploads_test
+
+Files hold a Condition column and the six sensor columns, so they can be
+uploaded to the app or fed to combine_data.py / model_training.py.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from features import SENSOR_COLUMNS
+
+
+FORMATS = ("csv", "parquet")
+
+# Rows generated and written at a time per motor
+CHUNK_ROWS = 100_000
+
+# Supply frequency (Hz) and pole pairs of the simulated motors
+LINE_HZ = 50.0
+POLE_PAIRS = 2
+
+# vib/mag: mean level (mm/s, mT); harmonics: 1x/2x/3x amplitude relative to
+# the level; bearing: defect tone amplitude relative to the level;
+# axes: vibration gain per axis (X front, Z rear); load: depth of the slow
+# load fluctuation
+PROFILES = {
+    "No_load_condition": {
+        "vib": 1.0, "mag": 3.5, "harmonics": (0.25, 0.08, 0.03), "bearing": 0.0,
+        "axes": (1.0, 1.0, 1.0), "load": 0.02, "noise": 0.10
+    },
+    "Front_bearing_damage": {
+        "vib": 3.5, "mag": 9.0, "harmonics": (0.20, 0.08, 0.04), "bearing": 0.35,
+        "axes": (1.3, 1.0, 0.7), "load": 0.03, "noise": 0.15
+    },
+    "Back_bearing_damage": {
+        "vib": 3.5, "mag": 8.5, "harmonics": (0.20, 0.08, 0.04), "bearing": 0.35,
+        "axes": (0.7, 1.0, 1.3), "load": 0.03, "noise": 0.15
+    },
+    "Uneven_load_condition": {
+        "vib": 5.5, "mag": 4.5, "harmonics": (0.35, 0.20, 0.06), "bearing": 0.0,
+        "axes": (1.0, 1.1, 1.0), "load": 0.15, "noise": 0.12
+    },
+}
+
+
+def motor_rng(seed, motor):
+    # Same stream for a motor no matter which process generates it
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(motor,)))
+
+
+def motor_params(condition, rng):
+    """The fixed characteristics of one motor (drawn once, before any samples)."""
+    profile = PROFILES[condition]
+    # Slip of an induction motor under load: 1-5 %
+    slip = rng.uniform(0.01, 0.05)
+    shaft_hz = LINE_HZ / POLE_PAIRS * (1 - slip)
+    return {
+        "profile": profile,
+        "slip": slip,
+        "shaft_hz": shaft_hz,
+        "bpfo_hz": shaft_hz * rng.uniform(3.0, 3.6),
+        "load_hz": rng.uniform(0.005, 0.05),
+        "vib": profile["vib"] * rng.lognormal(0.0, 0.1),
+        "mag": profile["mag"] * rng.lognormal(0.0, 0.1) * rng.uniform(0.6, 1.4, 3),
+        "phases": rng.uniform(0, 2 * np.pi, (3, 4)),
+    }
+
+
+def motor_chunk(params, rng, start, rows, fs):
+    """(rows, 6) samples from sample number start on, in SENSOR_COLUMNS order."""
+    profile = params["profile"]
+    t = (start + np.arange(rows)) / fs
+    out = np.empty((rows, len(SENSOR_COLUMNS)))
+
+    shaft = 2 * np.pi * params["shaft_hz"] * t
+    load = 1 + profile["load"] * np.sin(2 * np.pi * params["load_hz"] * t)
+    level = params["vib"] * load
+
+    # Outer race defect: tone at BPFO, strongest once per revolution
+    if profile["bearing"]:
+        bearing = profile["bearing"] * (0.5 + 0.5 * np.cos(shaft)) * np.sin(2 * np.pi * params["bpfo_hz"] * t)
+    else:
+        bearing = 0.0
+
+    # Drawn row by row, so the stream does not depend on the chunk size
+    noise = rng.standard_normal((rows, len(SENSOR_COLUMNS)))
+
+    for axis in range(3):
+        phases = params["phases"][axis]
+        wave = sum(a * np.sin(k * shaft + phases[k - 1]) for k, a in enumerate(profile["harmonics"], start=1))
+        out[:, axis] = level * profile["axes"][axis] * (1 + wave + bearing)
+        out[:, axis] += profile["noise"] * params["vib"] * noise[:, axis]
+
+    # Supply ripple with the 2*slip*f sidebands induction motors show
+    line = 2 * np.pi * LINE_HZ * t
+    sideband = 2 * np.pi * 2 * params["slip"] * LINE_HZ * t
+    ripple = 0.10 * np.sin(line) * (1 + 0.2 * np.cos(sideband)) * load
+    for axis in range(3):
+        mag = params["mag"][axis]
+        out[:, 3 + axis] = mag * (1 + ripple) + 0.05 * mag * noise[:, 3 + axis]
+
+    return out
+
+
+def open_writer(f, schema, fmt):
+    if fmt == "parquet":
+        return pq.ParquetWriter(f, schema)
+    return pa_csv.CSVWriter(f, schema)
+
+
+def write_motor(motor, condition, rows, args):
+    """Generates one motor's capture into its own file; returns bytes written."""
+    rng = motor_rng(args.seed, motor)
+    params = motor_params(condition, rng)
+    path = os.path.join(args.out, f"motor_{motor:05d}.{args.format}")
+
+    with open(path, "wb") as f:
+        writer = None
+        for start in range(0, rows, args.chunk_rows):
+            n = min(args.chunk_rows, rows - start)
+            values = motor_chunk(params, rng, start, n, args.fs)
+            # Sensor resolution; also keeps the CSV text short
+            np.round(values, args.decimals, out=values)
+
+            chunk = pd.DataFrame(values, columns=SENSOR_COLUMNS)
+            chunk.insert(0, "Condition", condition)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = open_writer(f, table.schema, args.format)
+            writer.write_table(table)
+
+        if writer is not None:
+            writer.close()
+    return os.path.getsize(path)
+
+
+def _write_motor(job):
+    return write_motor(*job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--motors", type=int, default=1)
+    parser.add_argument("--hours", type=float, default=1.0, help="capture duration per motor")
+    parser.add_argument("--rows", type=int, default=None, help="samples per motor (overrides --hours)")
+    parser.add_argument("--fs", type=float, default=100.0, help="sampling rate (Hz)")
+    parser.add_argument("--conditions", default=",".join(PROFILES),
+                        help="comma-separated conditions the motors cycle through")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--out", default="synthetic_data")
+    parser.add_argument("--workers", type=int, default=None, help="writer processes (default: all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--decimals", type=int, default=4, help="decimals kept per sample")
+    args = parser.parse_args()
+
+    conditions = [c for c in args.conditions.split(",") if c]
+    unknown = set(conditions) - set(PROFILES)
+    if unknown or not conditions:
+        parser.error(f"unknown conditions: {', '.join(sorted(unknown))} (known: {', '.join(PROFILES)})")
+    rows = args.rows if args.rows is not None else int(args.hours * 3600 * args.fs)
+
+    os.makedirs(args.out, exist_ok=True)
+    jobs = [(motor, conditions[motor % len(conditions)], rows, args) for motor in range(args.motors)]
+
+    print(f"Generating {args.motors} motor(s) x {rows:,} rows as {args.format} in {args.out}...")
+    start = time.perf_counter()
+    total = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for written in pool.map(_write_motor, jobs, chunksize=max(1, len(jobs) // 64)):
+            total += written
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ {args.motors * rows:,} rows, {total / 2**20:,.1f} MiB in {elapsed:.1f} s "
+          f"({total / 2**20 / max(elapsed, 1e-9):,.1f} MiB/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,17 +7,19 @@ time_window_sec = 15
 total_hours = 1
 total_rows = int((total_hours * 60 * 60) / time_window_sec)
 
-def generate_data(filename, vib_scale=1.0, mag_scale=1.0):
-    print(f"Generating {filename} with vib_scale={vib_scale}, mag_scale={mag_scale}")
-    
+def make_frame(rows=total_rows, vib_scale=1.0, mag_scale=1.0, rng=np.random):
+    """
+    Synthetic capture of `rows` samples. rng may be a seeded
+    np.random.Generator (benchmark_suite.py) or the global np.random.
+    """
     # Vibration ranges (mm/s)
     # Normal is approx rms 1.0 (so range -1.7 to 1.7 or 0 to 2?)
     # Training data had 0-2 range for vib presumably? 
     # Centroid Vib RMS is ~0.97. 
     # Uniform(0, 2) has RMS ~1.15. So 0-2 is "Normal-ish".
-    vibration_x = np.random.uniform(0.0, 2.0 * vib_scale, total_rows)
-    vibration_y = np.random.uniform(0.0, 2.0 * vib_scale, total_rows)
-    vibration_z = np.random.uniform(0.0, 2.0 * vib_scale, total_rows)
+    vibration_x = rng.uniform(0.0, 2.0 * vib_scale, rows)
+    vibration_y = rng.uniform(0.0, 2.0 * vib_scale, rows)
+    vibration_z = rng.uniform(0.0, 2.0 * vib_scale, rows)
 
     # MLX90393 ranges (mT)
     # Centroid Mag RMS is ~3.5.
@@ -25,12 +27,12 @@ def generate_data(filename, vib_scale=1.0, mag_scale=1.0):
     # 3.5 = a / 1.732 => a = 3.5 * 1.732 = 6.06.
     # So Normal range height be approx -6 to 6.
     mag_limit = 6.0 * mag_scale
-    mlx_x = np.random.uniform(-mag_limit, mag_limit, total_rows)
-    mlx_y = np.random.uniform(-mag_limit, mag_limit, total_rows)
-    mlx_z = np.random.uniform(-mag_limit, mag_limit, total_rows)
+    mlx_x = rng.uniform(-mag_limit, mag_limit, rows)
+    mlx_y = rng.uniform(-mag_limit, mag_limit, rows)
+    mlx_z = rng.uniform(-mag_limit, mag_limit, rows)
 
     # Create DataFrame
-    df = pd.DataFrame({
+    return pd.DataFrame({
         "Vibration X (mm/s)": vibration_x,
         "Vibration Y (mm/s)": vibration_y,
         "Vibration Z (mm/s)": vibration_z,
@@ -39,6 +41,11 @@ def generate_data(filename, vib_scale=1.0, mag_scale=1.0):
         "MLX90393 Z (mT)": mlx_z
     })
 
+
+def generate_data(filename, vib_scale=1.0, mag_scale=1.0):
+    print(f"Generating {filename} with vib_scale={vib_scale}, mag_scale={mag_scale}")
+    df = make_frame(total_rows, vib_scale, mag_scale)
+
     # Save path
     save_path = r"c:\Users\chara\OneDrive\Desktop\project\project_ZIP\project\PROJECT_III\CODES_FOR_PROJECT\uploads"
     os.makedirs(save_path, exist_ok=True)
@@ -51,14 +58,19 @@ def generate_data(filename, vib_scale=1.0, mag_scale=1.0):
     df.to_csv(os.path.join(save_path, filename), index=False)
     print(f"Saved to {os.path.join(save_path, filename)}")
 
-# Generate 3 datasets
-# 1. Normal-ish (matches centroid roughly)
-generate_data("Test_Data_Normal.csv", vib_scale=1.0, mag_scale=1.0)
-
-# 2. Moderate Fault (Higher deviation)
-# Vib range 0-4 (RMS ~2.3), Mag range -12 to 12 (RMS ~7)
-generate_data("Test_Data_Warning.csv", vib_scale=2.0, mag_scale=2.0)
+# Severity presets: (vib_scale, mag_scale)
+SCALES = {
+    # 1. Normal-ish (matches centroid roughly)
+    "Normal": (1.0, 1.0),
+    # 2. Moderate Fault (Higher deviation)
+    # Vib range 0-4 (RMS ~2.3), Mag range -12 to 12 (RMS ~7)
+    "Warning": (2.0, 2.0),
+    # 3. Critical Fault (Very high deviation)
+    # Vib range 0-10 (RMS ~5.7), Mag range -30 to 30 (RMS ~17)
+    "Critical": (5.0, 5.0),
+}
 
-# 3. Critical Fault (Very high deviation)
-# Vib range 0-10 (RMS ~5.7), Mag range -30 to 30 (RMS ~17)
-generate_data("Test_Data_Critical.csv", vib_scale=5.0, mag_scale=5.0)
+if __name__ == "__main__":
+    # Generate 3 datasets
+    for name, (vib_scale, mag_scale) in SCALES.items():
+        generate_data(f"Test_Data_{name}.csv", vib_scale=vib_scale, mag_scale=mag_scale)
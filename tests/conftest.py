@@ -0,0 +1,78 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import FEATURE_NAMES, SENSOR_COLUMNS, TRAINING_STRIDE, TRAINING_WINDOW, FeatureEngine  # noqa: E402
+from forest_engine import compile_forest  # noqa: E402
+from model_store import Model  # noqa: E402
+from synthetic_data import PROFILES, motor_chunk, motor_params, motor_rng  # noqa: E402
+
+
+def capture(condition, rows, motor=0, seed=0):
+    """(rows, 6) synthetic samples of one motor in condition."""
+    rng = motor_rng(seed, motor)
+    return motor_chunk(motor_params(condition, rng), rng, 0, rows, fs=100.0)
+
+
+def capture_frame(X):
+    return pd.DataFrame(X, columns=SENSOR_COLUMNS)
+
+
+@pytest.fixture(scope="session")
+def windowed_model():
+    """A small forest trained on windowed features, as model_training.py does."""
+    engine = FeatureEngine(FEATURE_NAMES)
+    blocks, labels = [], []
+    for i, condition in enumerate(PROFILES):
+        for motor in range(3):
+            block = engine.compute_windows(capture(condition, 2400, motor=10 * i + motor, seed=1),
+                                           TRAINING_WINDOW, TRAINING_STRIDE)
+            blocks.append(block)
+            labels += [i] * len(block)
+
+    X = pd.DataFrame(np.vstack(blocks), columns=FEATURE_NAMES)
+    y = np.array(labels)
+    clf = RandomForestClassifier(n_estimators=20, min_samples_leaf=2, random_state=0).fit(X, y)
+
+    return Model(
+        version="test",
+        feature_names=FEATURE_NAMES,
+        labels=list(PROFILES),
+        centroid=X[y == 0].mean().to_numpy(),
+        forest=compile_forest(clf),
+        estimator=clf
+    )
+
+
+# Set before anything starts a process (pool processes inherit them)
+APP_ROOT = tempfile.mkdtemp(prefix="motor-tests-")
+atexit.register(shutil.rmtree, APP_ROOT, True)
+os.environ.update({
+    "MODEL_STORE": os.path.join(APP_ROOT, "model_store"),
+    "JOBS_DB": os.path.join(APP_ROOT, "jobs.sqlite3"),
+    "ANALYSIS_WORKERS": "0",
+    "RESULT_CACHE_SIZE": "0"
+})
+
+
+@pytest.fixture(scope="session")
+def app_module(windowed_model):
+    """app.py serving windowed_model, analysing inline, with nothing cached."""
+    import app
+
+    app.model = windowed_model
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from analysis_pool import AnalysisPool, PoolSaturated
+from conftest import capture, capture_frame
+
+
+def test_pool_processes_are_not_forked_from_the_caller():
+    pool = AnalysisPool(workers=1, max_pending=2, timeout=60)
+    assert pool.run(os.getpid) != os.getpid()
+    assert pool._get_executor()._mp_context.get_start_method() in ("forkserver", "spawn")
+
+
+def test_inline_when_disabled():
+    assert AnalysisPool(workers=0, max_pending=1, timeout=1).run(os.getpid) == os.getpid()
+
+
+def test_saturated_pool_rejects():
+    pool = AnalysisPool(workers=1, max_pending=0, timeout=1)
+    with pytest.raises(PoolSaturated):
+        pool.run(os.getpid)
+
+
+def test_pool_analyses_with_the_store_model(app_module, windowed_model, tmp_path):
+    le = LabelEncoder().fit(windowed_model.labels)
+    version = app_module.model_store.publish(windowed_model.estimator, le, windowed_model.centroid)
+
+    path = str(tmp_path / "capture.csv")
+    df = capture_frame(capture("Uneven_load_condition", 3000))
+    df.to_csv(path, index=False)
+
+    pool = AnalysisPool(workers=1, max_pending=2, timeout=120, preload=["app"])
+    pooled = pool.run(app_module.analyze_upload, path, False, version, False)
+    inline = app_module.analyze_upload(path, False, version, False)
+
+    assert pooled["prediction"] == inline["prediction"]
+    assert pooled["sample_count"] == len(df)
@@ -0,0 +1,22 @@
+from conftest import capture, capture_frame
+from pipeline import pipeline_for
+from result_cache import ResultCache
+
+
+def test_psd_fill_in_does_not_mutate_the_shared_entry(app_module, windowed_model, monkeypatch):
+    cache = ResultCache()
+    monkeypatch.setattr(app_module, "result_cache", cache)
+
+    df = capture_frame(capture("No_load_condition", 1000))
+    shared = pipeline_for(windowed_model).analyze({"df": df}, psd=False)
+    key = cache.key("upload")
+    cache.put(key, shared)
+
+    filled = app_module.cached_analysis(key, windowed_model, {"psd": True})
+
+    assert "Pxx" not in shared and "psd" not in shared["timings"]
+    assert filled is not shared and filled["Pxx"] is not None
+    assert cache.get(key) is filled
+
+    # Clients that do not plot get the cached entry as is
+    assert app_module.cached_analysis(key, windowed_model, {"psd": False}) is filled
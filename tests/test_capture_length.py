@@ -0,0 +1,52 @@
+import io
+
+import numpy as np
+import pytest
+
+from conftest import capture, capture_frame
+from pipeline import AnalysisPipeline
+from streaming import ingest_csv
+
+
+def deviation(model, X):
+    state = AnalysisPipeline(model).analyze({"df": capture_frame(X)}, psd=False)
+    return state["deviations"][0]
+
+
+def test_windowed_model_is_not_legacy(windowed_model):
+    assert not windowed_model.legacy_features
+
+
+@pytest.mark.parametrize("condition", ["No_load_condition", "Uneven_load_condition"])
+def test_same_signal_two_capture_lengths_same_deviation(windowed_model, condition):
+    X = capture(condition, 14400)
+    short, long = deviation(windowed_model, X[:2400]), deviation(windowed_model, X)
+
+    assert short == pytest.approx(long, rel=0.05, abs=0.05)
+
+    # Whole-capture features drift with the length (what windowing fixes)
+    engine = windowed_model.feature_engine
+    amp = engine.feature_names.index("Vib_FFT_Peak_Amp")
+    assert engine.raw(X)[amp] > 3 * engine.raw(X[:2400])[amp]
+
+
+def test_streamed_windows_match_loaded(windowed_model):
+    X = capture("Front_bearing_damage", 5000)
+    pipeline = AnalysisPipeline(windowed_model)
+    loaded = pipeline.run({"df": capture_frame(X)}, ["raw"])["raw"]
+
+    buf = io.StringIO()
+    capture_frame(X).to_csv(buf, index=False)
+    buf.seek(0)
+    stats = ingest_csv(io.BytesIO(buf.getvalue().encode()), chunk_rows=777, keep_fft_channel=False,
+                       window=pipeline.window, stride=pipeline.stride)
+
+    assert stats.windows == (len(X) - pipeline.window) // pipeline.stride + 1
+    np.testing.assert_allclose(stats.raw_features(), loaded, rtol=1e-9)
+
+
+def test_short_capture_is_one_window(windowed_model):
+    X = capture("No_load_condition", 100)
+    pipeline = AnalysisPipeline(windowed_model)
+    raw = pipeline.run({"df": capture_frame(X)}, ["raw"])["raw"]
+    np.testing.assert_allclose(raw, windowed_model.feature_engine.raw(X))
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import combine_data
+from features import SENSOR_COLUMNS, TRAINING_COLUMNS
+from sensor_io import CACHE_DIR, read_dataset, read_excel_cached
+
+pytest.importorskip("openpyxl")
+
+
+def workbook(path, condition, rows, seed):
+    rng = np.random.default_rng(seed)
+    # Excel headers as captured; combine_data cleans them to TRAINING_COLUMNS
+    df = pd.DataFrame(rng.normal(size=(rows, 6)).round(4), columns=SENSOR_COLUMNS)
+    df.insert(0, "Condition", condition)
+    df.loc[3, df.columns[2]] = np.nan
+    df.to_excel(path, index=False)
+    return df
+
+
+def test_excel_cache_round_trip(tmp_path):
+    path = str(tmp_path / "capture.xlsx")
+    workbook(path, "No_load_condition", 20, 0)
+
+    first = read_excel_cached(path)
+    assert os.path.exists(tmp_path / CACHE_DIR / "capture.xlsx.npz")
+    pd.testing.assert_frame_equal(read_excel_cached(path), first)
+    pd.testing.assert_frame_equal(first, pd.read_excel(path))
+
+
+def test_build_reads_through_the_cache_and_skips_unchanged(tmp_path, monkeypatch):
+    data, out = tmp_path / "data", tmp_path / "dataset"
+    data.mkdir()
+    workbook(str(data / "a.xlsx"), "No_load_condition", 30, 1)
+    workbook(str(data / "b.xlsx"), "Front_bearing_damage", 20, 2)
+
+    captures, parsed = combine_data.build(str(data), str(out), workers=1)
+    assert parsed == 2 and sum(entry["rows"] for entry in captures.values()) == 50
+    assert sorted(os.listdir(data / CACHE_DIR)) == ["a.xlsx.npz", "b.xlsx.npz"]
+
+    df = read_dataset(str(out), TRAINING_COLUMNS)
+    assert len(df) == 50 and df[TRAINING_COLUMNS].isna().sum().sum() == 2
+    assert sorted(df["Condition"].unique()) == ["Front_bearing_damage", "No_load_condition"]
+
+    assert combine_data.build(str(data), str(out), workers=1)[1] == 0
+
+    # A fresh dataset directory is rebuilt from the cached copies, without openpyxl
+    monkeypatch.setattr(pd, "read_excel", None)
+    _, parsed = combine_data.build(str(data), str(tmp_path / "rebuilt"), workers=1)
+    assert parsed == 2
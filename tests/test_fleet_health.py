@@ -0,0 +1,50 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+
+def fleet_request(model, n=6):
+    rng = np.random.default_rng(0)
+    return {"features": (model.centroid * rng.uniform(0.5, 3.0, (n, 1))).tolist(), "top": 3}
+
+
+@pytest.mark.parametrize("motor_ids", [[[1, 2]] * 6, [{"id": 1}] * 6, [None] * 6, [True] * 6, "abcdef", 7])
+def test_malformed_motor_ids_are_a_400(client, windowed_model, motor_ids):
+    body = dict(fleet_request(windowed_model), motor_ids=motor_ids)
+    response = client.post("/api/fleet_health", json=body)
+    assert response.status_code == 400
+    assert "motor_ids" in response.get_json()["error"]
+
+
+def test_motors_are_ranked_by_worst_window(client, windowed_model):
+    body = dict(fleet_request(windowed_model), motor_ids=["a", "b", 3, "a", "b", 3])
+    response = client.post("/api/fleet_health", json=body)
+    assert response.status_code == 200, response.get_json()
+
+    motors = response.get_json()["motors"]
+    assert {motor["motor_id"] for motor in motors} == {"a", "b", 3}
+    deviations = [motor["deviation"] for motor in motors]
+    assert [motor["windows"] for motor in motors] == [2, 2, 2]
+    assert deviations == sorted(deviations, reverse=True)
+
+
+def test_blank_motor_id_cell_is_a_400(client, windowed_model):
+    names = windowed_model.feature_names
+    rows = fleet_request(windowed_model, n=3)["features"]
+    lines = ["motor_id," + ",".join(names)] + [
+        f"{motor_id}," + ",".join(map(str, row)) for motor_id, row in zip(["m1", "", "m3"], rows)
+    ]
+    data = ("\n".join(lines) + "\n").encode()
+
+    response = client.post("/api/fleet_health", data={"file": (io.BytesIO(data), "fleet.csv")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 400
+    assert "motor_ids" in response.get_json()["error"]
+
+
+def test_nan_motor_id_in_json_is_a_400(client, windowed_model):
+    body = dict(fleet_request(windowed_model, n=2), motor_ids=[1, float("nan")])
+    response = client.post("/api/fleet_health", data=json.dumps(body), content_type="application/json")
+    assert response.status_code == 400
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+from forest_engine import compile_forest
+
+
+def fitted(cls, **params):
+    X, y = make_classification(n_samples=60, n_features=14, n_informative=6, n_classes=3, random_state=0)
+    return cls(random_state=0, **params).fit(X, y), X
+
+
+@pytest.mark.parametrize("cls", [RandomForestClassifier, ExtraTreesClassifier])
+def test_matches_sklearn(cls):
+    clf, X = fitted(cls, n_estimators=25)
+    forest = compile_forest(clf)
+
+    np.testing.assert_allclose(forest.predict_proba(X), clf.predict_proba(X), atol=1e-12)
+    np.testing.assert_array_equal(forest.predict(X), clf.predict(X))
+
+
+def test_single_node_trees():
+    # Bootstrap samples smaller than min_samples_split leave many trees a bare root
+    clf, X = fitted(RandomForestClassifier, n_estimators=200, max_samples=8, min_samples_split=8)
+    single = sum(est.tree_.node_count == 1 for est in clf.estimators_)
+    assert 0 < single < len(clf.estimators_)
+
+    forest = compile_forest(clf)
+    leaves = forest.apply(X)
+    assert (leaves >= 0).all()
+    np.testing.assert_array_equal(forest.left[leaves], -1)
+    np.testing.assert_allclose(forest.predict_proba(X), clf.predict_proba(X), atol=1e-12)
+    np.testing.assert_array_equal(forest.predict(X), clf.predict(X))
+
+
+def test_all_trees_single_node():
+    clf, X = fitted(RandomForestClassifier, n_estimators=5, min_samples_split=1000)
+    np.testing.assert_allclose(compile_forest(clf).predict_proba(X), clf.predict_proba(X), atol=1e-12)
@@ -0,0 +1,76 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+import model_store
+from features import TRAINING_WINDOW
+from model_store import COMPILED_MAX_ROWS, ModelStore
+
+
+def published(windowed_model, root):
+    le = LabelEncoder().fit(windowed_model.labels)
+    store = ModelStore(str(root))
+    version = store.publish(windowed_model.estimator, le, windowed_model.centroid, window=TRAINING_WINDOW)
+    return store, version
+
+
+def rows(model, n):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(rng.uniform(0, 10, (n, len(model.feature_names))), columns=model.feature_names)
+
+
+def test_store_model_matches_estimator(windowed_model, tmp_path):
+    store, version = published(windowed_model, tmp_path)
+    model = store.load(version)
+
+    assert model.window == TRAINING_WINDOW
+    assert model.estimator is None
+    X = rows(model, 2 * COMPILED_MAX_ROWS)
+    expected = windowed_model.estimator.predict(X)
+
+    # Small batches stay on the compiled forest
+    np.testing.assert_array_equal(model.predict_codes(X[:COMPILED_MAX_ROWS]), expected[:COMPILED_MAX_ROWS])
+    assert model.estimator is None
+
+    # Large ones load the pickled estimator once
+    np.testing.assert_array_equal(model.predict_codes(X), expected)
+    assert model.estimator is not None
+
+
+def test_versions_without_estimator_use_the_compiled_forest(windowed_model, tmp_path):
+    store, version = published(windowed_model, tmp_path)
+    manifest_path = os.path.join(store.root, version, model_store.MANIFEST_FILE)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    del manifest["estimator_file"], manifest["window"], manifest["stride"]
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+    model = store.load(version)
+    X = rows(model, 2 * COMPILED_MAX_ROWS)
+    np.testing.assert_array_equal(model.predict_codes(X), windowed_model.estimator.predict(X))
+    assert model.estimator is None and model.window == TRAINING_WINDOW
+
+
+def test_deactivated_store_falls_back_to_the_pickle(app_module, windowed_model, monkeypatch):
+    store = app_module.model_store
+    le = LabelEncoder().fit(windowed_model.labels)
+    version = store.publish(windowed_model.estimator, le, windowed_model.centroid)
+
+    pickled = model_store.Model("pickle", windowed_model.feature_names, windowed_model.labels,
+                                windowed_model.centroid, forest=windowed_model.forest)
+    monkeypatch.setattr(app_module, "load_pickled", lambda *paths: pickled)
+    monkeypatch.setattr(app_module, "MODEL_RELOAD_INTERVAL", 0)
+    monkeypatch.setattr(app_module, "model", windowed_model)
+
+    assert app_module.current_model().version == version
+
+    store.deactivate()
+    assert store.current_version() is None
+    assert app_module.current_model() is pickled
+
+    store.activate(version)
+    assert app_module.current_model().version == version
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pytest
+import requests
+
+import monitor
+from features import FeatureEngine
+from thingspeak_client import FIELD_ORDER, AsyncThingSpeakClient, make_session
+
+
+def feed(entry_id):
+    """A feed whose six sensor values are derived from its entry_id."""
+    values = {field: str(entry_id + j / 10) for j, field in enumerate(FIELD_ORDER)}
+    return {"entry_id": entry_id, **values}
+
+
+def rows(entry_ids):
+    return np.array([[entry_id + j / 10 for j in range(len(FIELD_ORDER))] for entry_id in entry_ids])
+
+
+class StubThingSpeak:
+    """ThingSpeak's feeds.json / feeds/last.json on a local http.server."""
+
+    def __init__(self):
+        self.feeds = []
+        self.failures = []  # statuses answered (in order) before serving again
+        self.requests = []
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                stub.requests.append(self.path)
+                if stub.failures:
+                    self.send_error(stub.failures.pop(0))
+                    return
+
+                if url.path.endswith("/feeds/last.json"):
+                    body = stub.feeds[-1] if stub.feeds else -1
+                else:
+                    results = int(parse_qs(url.query).get("results", ["100"])[0])
+                    body = {"channel": {"name": "stub"}, "feeds": stub.feeds[-results:]}
+
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubThingSpeak()
+    yield server
+    server.close()
+
+
+def channel_monitor(stub, window=5, **kwargs):
+    return monitor.ChannelMonitor(1, window=window, base_url=stub.url,
+                                  session=make_session(backoff=0, **kwargs))
+
+
+def test_poll_adds_each_entry_once(stub):
+    stub.feeds = [feed(i) for i in range(1, 4)]
+    mon = channel_monitor(stub)
+
+    assert mon.poll() == 3
+    assert mon.poll() == 0
+    assert mon.version == 1
+
+    # Overlapping response: entries 2-3 were seen already
+    stub.feeds.append(feed(4))
+    stub.feeds.append(feed(5))
+    assert mon.poll() == 2
+    assert mon.last_entry_id == 5
+    np.testing.assert_array_equal(mon.window.ordered(), rows(range(1, 6)))
+    assert "/channels/1/feeds.json?results=2" in stub.requests
+
+
+def test_window_evicts_oldest_rows(stub):
+    stub.feeds = [feed(i) for i in range(1, 4)]
+    mon = channel_monitor(stub, window=5)
+    mon.poll()
+
+    stub.feeds += [feed(i) for i in range(4, 12)]
+    assert mon.poll() == 5  # only the newest window's worth is fetched
+    assert mon.window.count == 5
+
+    expected = rows(range(7, 12))
+    np.testing.assert_array_equal(mon.window.ordered(), expected)
+    np.testing.assert_allclose(mon.window.raw_features(), FeatureEngine().raw(expected))
+
+
+def test_transient_errors_are_retried(stub):
+    stub.feeds = [feed(1), feed(2)]
+    stub.failures = [503, 429]
+    mon = channel_monitor(stub)
+
+    assert mon.poll() == 2
+    assert len(stub.requests) == 3
+
+
+def test_persistent_errors_leave_the_window_unchanged(stub):
+    stub.feeds = [feed(1)]
+    mon = channel_monitor(stub, retries=2)
+    mon.poll()
+
+    stub.feeds.append(feed(2))
+    stub.failures = [503] * 3
+    with pytest.raises(requests.RequestException):
+        mon.poll()
+    assert len(stub.requests) == 1 + 3
+    assert (mon.last_entry_id, mon.version, mon.window.count) == (1, 1, 1)
+
+    # Recovers on the next poll
+    assert mon.poll() == 1
+
+
+def test_client_errors_are_not_retried(stub):
+    stub.failures = [404]
+    mon = channel_monitor(stub)
+    with pytest.raises(requests.HTTPError):
+        mon.poll()
+    assert len(stub.requests) == 1
+
+
+def test_async_client_backs_off_and_reports_failures(stub):
+    stub.feeds = [feed(1), feed(2)]
+    stub.failures = [503]
+
+    async def run():
+        async with AsyncThingSpeakClient(base_url=stub.url, backoff=0) as client:
+            first = await client.fetch_frame(1, results=2)
+            stub.failures = [404]
+            second = await client.fetch_many([(1, None)])
+            return first, second
+
+    (df, info), outcomes = asyncio.run(run())
+
+    assert len(df) == 2 and info == {"name": "stub"}
+    assert isinstance(outcomes[1], Exception)
+    assert len(stub.requests) == 3
+
+
+def test_route_answers_400_when_thingspeak_fails(client, stub):
+    mon = monitor.get_monitor("stub-failing", None, base_url=stub.url, session=make_session(retries=0))
+    stub.failures = [500]
+
+    response = client.post("/api/predict_thingspeak", json={"channel_id": "stub-failing"})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+    assert mon.last_entry_id is None
+
+    stub.feeds = [feed(i) for i in range(1, 11)]
+    response = client.post("/api/predict_thingspeak", json={"channel_id": "stub-failing"})
+    assert response.status_code == 200
+    assert response.get_json()["data"]["sample_count"] == 10
@@ -0,0 +1,38 @@
+import gc
+import weakref
+
+import numpy as np
+
+import pipeline
+from conftest import capture, capture_frame
+from model_store import Model
+
+
+def copy_of(model, version):
+    return Model(version, model.feature_names, model.labels, model.centroid,
+                 forest=model.forest, estimator=model.estimator)
+
+
+def test_pipeline_cache_does_not_keep_models_alive(windowed_model):
+    models = [copy_of(windowed_model, f"v{i}") for i in range(3)]
+    for model in models:
+        pipeline.pipeline_for(model)
+    assert pipeline.pipeline_for(models[0]) is pipeline.pipeline_for(models[0])
+
+    refs = [weakref.ref(model) for model in models]
+    cached = len(pipeline._pipelines)
+    del model, models
+    gc.collect()
+
+    assert all(ref() is None for ref in refs)
+    assert len(pipeline._pipelines) == cached - 3
+
+
+def test_cached_pipeline_analyses(windowed_model):
+    model = copy_of(windowed_model, "analyse")
+    df = capture_frame(capture("No_load_condition", 1000))
+    analysis = pipeline.pipeline_for(model).analyze({"df": df}, psd=False)
+
+    expected = pipeline.AnalysisPipeline(windowed_model).analyze({"df": df}, psd=False)
+    assert analysis["prediction"] == expected["prediction"]
+    np.testing.assert_allclose(analysis["deviations"], expected["deviations"])
@@ -0,0 +1,45 @@
+import numpy as np
+
+from result_cache import ResultCache, value_nbytes
+
+
+def analysis(rows):
+    return {"series": np.zeros((rows, 6)), "prediction": {"fault": "x"}}
+
+
+def test_value_nbytes_counts_array_buffers():
+    assert value_nbytes(analysis(1000)) >= 1000 * 6 * 8
+    assert value_nbytes(analysis(1000)) < value_nbytes(analysis(2000))
+
+
+def test_entries_are_evicted_by_bytes():
+    size = value_nbytes(analysis(1000))
+    cache = ResultCache(max_entries=100, max_bytes=int(2.5 * size))
+    for i in range(4):
+        cache.put(cache.key(str(i)), analysis(1000))
+
+    assert [cache.get(cache.key(str(i))) is not None for i in range(4)] == [False, False, True, True]
+    assert cache.stats()["evictions"] == 2
+    assert cache.bytes == 2 * size <= cache.max_bytes
+
+
+def test_oversized_value_is_not_cached():
+    cache = ResultCache(max_bytes=value_nbytes(analysis(10)))
+    cache.put(cache.key("small"), analysis(10))
+    cache.put(cache.key("big"), analysis(10_000))
+
+    assert cache.get(cache.key("big")) is None
+    assert cache.get(cache.key("small")) is not None
+    assert cache.bytes == value_nbytes(analysis(10))
+
+
+def test_reput_resizes_the_entry():
+    cache = ResultCache()
+    key = cache.key("a")
+    value = analysis(10)
+    cache.put(key, value)
+    value["Pxx"] = np.zeros((129, 6))
+    cache.put(key, value)
+
+    assert cache.bytes == value_nbytes(value)
+    assert cache.stats()["entries"] == 1
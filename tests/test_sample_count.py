@@ -0,0 +1,40 @@
+import io
+
+import numpy as np
+import pytest
+
+from conftest import capture, capture_frame
+from features import SENSOR_COLUMNS
+
+
+def upload(client, data, stream):
+    query = "?stream=1" if stream else ""
+    response = client.post(f"/api/predict{query}", data={"file": (io.BytesIO(data), "capture.csv")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+@pytest.mark.parametrize("nan_rows", [[], [7], [0, 500, 501, 1999]])
+def test_streamed_and_loaded_analysis_agree(client, nan_rows):
+    df = capture_frame(capture("Back_bearing_damage", 2000))
+    for i, row in enumerate(nan_rows):
+        df.iat[row, i % df.shape[1]] = np.nan
+    data = df.to_csv(index=False).encode()
+
+    loaded, streamed = upload(client, data, stream=False), upload(client, data, stream=True)
+
+    assert loaded["data"]["sample_count"] == streamed["data"]["sample_count"] == len(df) - len(nan_rows)
+    assert loaded["prediction"] == streamed["prediction"]
+    assert loaded["data"]["features"] == pytest.approx(streamed["data"]["features"], abs=1e-3)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("body", ["", "1,2,3,,5,6\n"])
+def test_upload_without_complete_rows_is_a_400(client, stream, body):
+    data = (",".join(SENSOR_COLUMNS) + "\n" + body).encode()
+    query = "?stream=1" if stream else ""
+    response = client.post(f"/api/predict{query}", data={"file": (io.BytesIO(data), "empty.csv")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "CSV Read Error: No complete sensor rows in upload."
@@ -0,0 +1,105 @@
+import os
+import time
+
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist
+
+from similarity_index import SimilarityIndex
+
+NAMES = [f"f{i}" for i in range(4)]
+
+
+def index(root, **kwargs):
+    return SimilarityIndex(str(root), NAMES, journal_rows=64, background=False, **kwargs)
+
+
+def batches(count, rows=50, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        yield rng.normal(size=(rows, len(NAMES))), rng.choice(["a", "b", "c"], rows).tolist()
+
+
+def test_queries_match_brute_force(tmp_path):
+    idx = index(tmp_path)
+    vectors, labels = [], []
+    for i, (v, l) in enumerate(batches(20)):
+        idx.insert(v, l)
+        vectors.append(v)
+        labels += l
+        if i % 3 == 0:
+            idx.maintain()
+    vectors, labels = np.vstack(vectors), np.array(labels, dtype=object)
+
+    queries = np.random.default_rng(1).normal(size=(10, len(NAMES)))
+    expected = np.sort(cdist(queries, vectors), axis=1)[:, :5]
+    for _ in range(2):
+        distances, found, _ = idx.query(queries, k=5)
+        np.testing.assert_allclose(distances, expected)
+        nearest = np.argmin(cdist(queries, vectors), axis=1)
+        assert (found[:, 0] == labels[nearest]).all()
+        idx.maintain()
+    assert len(idx) == len(vectors)
+
+
+def test_inserts_leave_merging_to_maintenance(tmp_path):
+    idx = index(tmp_path)
+    for v, l in batches(3):
+        idx.insert(v, l)
+    assert not any(name.startswith("segment-") for name in os.listdir(tmp_path))
+    assert idx._read_manifest()["sealed"] == ["journal-0.bin"]
+    assert len(idx) == 150
+
+    idx.maintain()
+    manifest = idx._read_manifest()
+    assert manifest["sealed"] == [] and sum(s["rows"] for s in manifest["segments"]) == 100
+    assert len(idx) == 150
+
+
+def test_queries_serve_the_old_trees_until_new_ones_are_built(tmp_path):
+    writer, reader = index(tmp_path), index(tmp_path)
+    for v, l in batches(4):
+        writer.insert(v, l)
+    assert reader.query(np.zeros(len(NAMES)))[0].shape == (1, 5)
+    writer.maintain()
+
+    # The reader keeps the journals it read, though merged and removed, until its own maintain()
+    assert reader._trees == {} and len(reader) == 200
+    reader.maintain()
+    assert set(reader._trees) == {s["name"] for s in reader._read_manifest()["segments"]}
+    assert len(reader) == 200
+
+
+def test_background_maintenance_merges_sealed_journals(tmp_path):
+    idx = SimilarityIndex(str(tmp_path), NAMES, journal_rows=64)
+    for v, l in batches(3):
+        idx.insert(v, l)
+
+    deadline = time.monotonic() + 30
+    while not idx._trees and time.monotonic() < deadline:
+        time.sleep(0.01)
+        idx.query(np.zeros(len(NAMES)))
+    assert idx._read_manifest()["sealed"] == [] and len(idx._trees) == 1
+    assert len(idx) == 150
+
+
+def test_indexes_share_inserts(tmp_path):
+    first, second = index(tmp_path), index(tmp_path)
+    first.insert(np.ones((1, len(NAMES))), ["a"])
+    second.insert(np.zeros((1, len(NAMES))), ["new"])
+    distances, labels, _ = first.query(np.zeros(len(NAMES)), k=2)
+    assert labels.tolist() == [["new", "a"]]
+    np.testing.assert_allclose(distances, [[0, 2]])
+
+
+def test_missing_files_raise(tmp_path):
+    idx = index(tmp_path)
+    os.remove(tmp_path / "manifest.json")
+    with pytest.raises(FileNotFoundError):
+        idx.query(np.zeros(len(NAMES)))
+
+
+def test_other_features_are_refused(tmp_path):
+    index(tmp_path)
+    with pytest.raises(ValueError):
+        SimilarityIndex(str(tmp_path), ["other"], background=False)
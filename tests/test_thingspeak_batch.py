@@ -0,0 +1,27 @@
+import pytest
+
+
+@pytest.mark.parametrize("results", [-1, 0, 8001, "many", "1e3", 2.5, True, [10], {"n": 1}])
+def test_invalid_results_is_a_400(client, results):
+    response = client.post("/api/predict_thingspeak_batch",
+                           json={"channels": [{"channel_id": "1"}], "results": results})
+    assert response.status_code == 400
+    assert "results" in response.get_json()["error"]
+
+
+def test_valid_results_reach_thingspeak(app_module, client, monkeypatch):
+    import thingspeak_client
+
+    calls = []
+
+    def poll_channels(channels, results=100, **kwargs):
+        calls.append(results)
+        return {channel_id: ValueError("offline") for channel_id, _ in channels}
+
+    monkeypatch.setattr(thingspeak_client, "poll_channels", poll_channels)
+    for results in (1, "250", app_module.THINGSPEAK_MAX_RESULTS):
+        response = client.post("/api/predict_thingspeak_batch",
+                               json={"channels": [{"channel_id": "1"}], "results": results})
+        assert response.status_code == 200
+        assert response.get_json()["errors"][0]["channel_id"] == "1"
+    assert calls == [1, 250, app_module.THINGSPEAK_MAX_RESULTS]
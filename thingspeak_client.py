@@ -0,0 +1,181 @@
+"""
+ThingSpeak HTTP clients.
+
+make_session() gives the blocking routes a pooled requests.Session with
+retry/backoff. AsyncThingSpeakClient polls many channels concurrently
+over one aiohttp connection pool with timeouts, bounded concurrency and
+retry with exponential backoff.
+"""
+import asyncio
+import random
+
+import aiohttp
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from features import SENSOR_COLUMNS
+
+
+THINGSPEAK_URL = "https://api.thingspeak.com"
+
+# Field 1,2,3 -> Magnetic X, Y, Z
+# Field 4,5,6 -> Vibration X, Y, Z
+THINGSPEAK_FIELDS = {
+    "field1": "MLX90393 X (mT)",
+    "field2": "MLX90393 Y (mT)",
+    "field3": "MLX90393 Z (mT)",
+    "field4": "Vibration X (mm/s)",
+    "field5": "Vibration Y (mm/s)",
+    "field6": "Vibration Z (mm/s)"
+}
+
+# ThingSpeak fields in SENSOR_COLUMNS order
+FIELD_ORDER = [
+    next(field for field, name in THINGSPEAK_FIELDS.items() if name == col)
+    for col in SENSOR_COLUMNS
+]
+
+# Seconds before a ThingSpeak request is abandoned
+REQUEST_TIMEOUT = 10
+
+# Attempts after the first one, and the base delay between them (seconds)
+RETRIES = 3
+BACKOFF = 0.5
+
+# Responses worth retrying (rate limit and transient server errors)
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# Requests in flight at once in AsyncThingSpeakClient
+CONCURRENCY = 64
+
+
+def feeds_to_rows(feeds):
+    """ThingSpeak feed dicts -> (n, 6) array in SENSOR_COLUMNS order, incomplete rows dropped."""
+    rows = np.full((len(feeds), len(FIELD_ORDER)), np.nan)
+    for i, feed in enumerate(feeds):
+        for j, field in enumerate(FIELD_ORDER):
+            try:
+                rows[i, j] = float(feed.get(field))
+            except (TypeError, ValueError):
+                pass
+    return rows[~np.isnan(rows).any(axis=1)]
+
+
+# ---------------- Blocking Client ----------------
+def make_session(retries=RETRIES, backoff=BACKOFF, pool_size=CONCURRENCY):
+    """requests.Session with a connection pool and retry/backoff on transient errors."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=["GET"],
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = None
+
+
+def default_session():
+    """Process-wide pooled session shared by the blocking callers."""
+    global _session
+    if _session is None:
+        _session = make_session()
+    return _session
+
+
+# ---------------- Async Client ----------------
+class AsyncThingSpeakClient:
+    """
+    Concurrent ThingSpeak poller.
+
+    Use as an async context manager; all requests share one connection pool
+    and at most `concurrency` of them are in flight at a time.
+    """
+
+    def __init__(self, base_url=THINGSPEAK_URL, concurrency=CONCURRENCY,
+                 timeout=REQUEST_TIMEOUT, retries=RETRIES, backoff=BACKOFF):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def _get_json(self, url, params):
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._semaphore:
+                    async with self._session.get(url, params=params) as response:
+                        if response.status in RETRY_STATUS and attempt < self.retries:
+                            raise aiohttp.ClientResponseError(
+                                response.request_info, response.history, status=response.status
+                            )
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                retryable = not isinstance(e, aiohttp.ClientResponseError) or e.status in RETRY_STATUS
+                if not retryable or attempt == self.retries:
+                    raise
+            # Exponential backoff with jitter, outside the semaphore
+            await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    async def fetch_feeds(self, channel_id, api_key=None, results=100):
+        """Returns the raw feeds.json payload for one channel."""
+        params = {"results": results}
+        if api_key:
+            params["api_key"] = api_key
+        return await self._get_json(f"{self.base_url}/channels/{channel_id}/feeds.json", params)
+
+    async def fetch_frame(self, channel_id, api_key=None, results=100):
+        """Returns (DataFrame with SENSOR_COLUMNS, channel info) for one channel."""
+        data = await self.fetch_feeds(channel_id, api_key, results)
+        rows = feeds_to_rows(data.get("feeds", []))
+        if len(rows) == 0:
+            raise ValueError("No data found in ThingSpeak channel.")
+        return pd.DataFrame(rows, columns=SENSOR_COLUMNS), data.get("channel", {})
+
+    async def fetch_many(self, channels, results=100):
+        """
+        Polls every (channel_id, api_key) pair concurrently.
+        Returns {channel_id: (df, channel_info) or the exception raised}.
+        """
+        channels = list(channels)
+        outcomes = await asyncio.gather(
+            *(self.fetch_frame(channel_id, api_key, results) for channel_id, api_key in channels),
+            return_exceptions=True,
+        )
+        return {channel_id: outcome for (channel_id, _), outcome in zip(channels, outcomes)}
+
+
+def poll_channels(channels, results=100, **kwargs):
+    """
+    Blocking wrapper around AsyncThingSpeakClient.fetch_many for the Flask
+    routes. channels is an iterable of (channel_id, api_key) pairs.
+    """
+    async def run():
+        async with AsyncThingSpeakClient(**kwargs) as client:
+            return await client.fetch_many(channels, results)
+
+    return asyncio.run(run())
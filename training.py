@@ -0,0 +1,153 @@
+"""
+Cross-validated training of the fault classifier (used by model_training.py).
+
+The folds are fitted in parallel worker processes (joblib). Within a fold
+every n_estimators candidate is evaluated on one model: a random forest is
+grown with warm_start, so going from 100 to 250 trees only fits the 150 new
+ones (and gives exactly the forest a fresh 250-tree fit would), and an
+XGBoost model is fitted once at the largest size and scored at each
+candidate with iteration_range.
+
+By default the final forest is assembled from the fold models instead of
+being refitted: each fold contributes its first trees, n_estimators in
+total, every one of them trained on (k-1)/k of the data. XGBoost boosters
+cannot be combined that way and are always refitted on all the data, as
+are forests with refit=True.
+"""
+import copy
+import os
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+
+
+BACKENDS = ("forest", "xgboost")
+
+
+def make_classifier(backend, n_estimators, n_jobs=-1, random_state=42):
+    if backend == "xgboost":
+        # Optional dependency; only needed for this backend
+        from xgboost import XGBClassifier
+        return XGBClassifier(
+            n_estimators=n_estimators,
+            max_depth=6,
+            learning_rate=0.1,
+            tree_method="hist",
+            n_jobs=n_jobs,
+            random_state=random_state
+        )
+
+    return RandomForestClassifier(
+        n_estimators=n_estimators,
+        max_depth=None,
+        min_samples_split=4,
+        min_samples_leaf=2,
+        random_state=random_state,
+        n_jobs=n_jobs,
+        warm_start=True
+    )
+
+
+def fit_fold(backend, candidates, X, y, train, test, n_jobs, random_state):
+    """Fits one fold through all candidate sizes; returns (model, {n: test predictions}, seconds)."""
+    start = time.perf_counter()
+    X_train, y_train, X_test = X.iloc[train], y[train], X.iloc[test]
+
+    predictions = {}
+    if backend == "xgboost":
+        clf = make_classifier(backend, candidates[-1], n_jobs, random_state)
+        clf.fit(X_train, y_train)
+        for n in candidates:
+            predictions[n] = clf.predict(X_test, iteration_range=(0, n))
+    else:
+        clf = make_classifier(backend, candidates[0], n_jobs, random_state)
+        for n in candidates:
+            # warm_start: only the trees beyond the previous size are grown
+            clf.set_params(n_estimators=n)
+            clf.fit(X_train, y_train)
+            predictions[n] = clf.predict(X_test)
+
+    return clf, predictions, time.perf_counter() - start
+
+
+def cross_validate(X, y, candidates, backend="forest", n_splits=5, cv_jobs=-1, random_state=42):
+    """
+    Out-of-fold predictions of every candidate size. Returns a dict with
+    the fold models, "predictions" {n: y_pred}, "accuracy" {n: score},
+    the best size and the wall time / throughput of the fold fits.
+    """
+    candidates = sorted(set(candidates))
+    skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    splits = list(skf.split(X, y))
+
+    # Cores left for each fold's own threads
+    workers = min(n_splits, os.cpu_count() or 1) if cv_jobs == -1 else max(1, min(cv_jobs, n_splits))
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+
+    start = time.perf_counter()
+    folds = Parallel(n_jobs=workers)(
+        # A seed per fold, so merged fold forests are not made of twin trees
+        delayed(fit_fold)(backend, candidates, X, y, train, test, n_jobs, random_state + i)
+        for i, (train, test) in enumerate(splits)
+    )
+    seconds = time.perf_counter() - start
+
+    predictions = {}
+    for n in candidates:
+        y_pred = np.empty_like(y)
+        for (_, test), (_, fold_predictions, _) in zip(splits, folds):
+            y_pred[test] = fold_predictions[n]
+        predictions[n] = y_pred
+
+    accuracy = {n: accuracy_score(y, predictions[n]) for n in candidates}
+    # Ties go to the smaller (faster to serve) model
+    best = max(candidates, key=lambda n: (accuracy[n], -n))
+
+    return {
+        "backend": backend,
+        "models": [model for model, _, _ in folds],
+        "predictions": predictions,
+        "accuracy": accuracy,
+        "best": best,
+        "seconds": seconds,
+        "samples_per_second": sum(len(train) for train, _ in splits) / seconds
+    }
+
+
+def merge_forests(models, n_estimators):
+    """One forest of n_estimators trees taken evenly from the fold forests."""
+    share, extra = divmod(n_estimators, len(models))
+    merged = copy.copy(models[0])
+    merged.estimators_ = [
+        tree
+        for i, model in enumerate(models)
+        for tree in model.estimators_[:share + (i < extra)]
+    ]
+    merged.set_params(n_estimators=len(merged.estimators_), warm_start=False, n_jobs=-1)
+    return merged
+
+
+def final_model(cv, X, y, refit=False, random_state=42):
+    """The model to ship, with (seconds, samples/s) of any refit (0, None when none was needed)."""
+    models = cv["models"]
+    classes = np.unique(y)
+    reusable = (
+        cv["backend"] == "forest"
+        and not refit
+        # Every fold must have seen every class for their trees to be mixed
+        and all(np.array_equal(model.classes_, classes) for model in models)
+    )
+    if reusable:
+        return merge_forests(models, cv["best"]), 0.0, None
+
+    start = time.perf_counter()
+    clf = make_classifier(cv["backend"], cv["best"], random_state=random_state)
+    clf.fit(X, y)
+    if cv["backend"] == "forest":
+        clf.set_params(warm_start=False)
+    seconds = time.perf_counter() - start
+    return clf, seconds, len(X) / seconds
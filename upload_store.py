@@ -0,0 +1,76 @@
+"""
+Upload handling without per-request files.
+
+Uploads are analysed straight from the request stream. Request bodies up to
+a threshold stay in memory and larger ones are spooled by
+SpooledTemporaryFile to an anonymous temporary file, so nothing is written
+under a client-chosen name and concurrent uploads cannot clobber each other.
+
+Keeping uploads is opt-in. UploadStore files each capture once under the
+SHA-256 digest of its bytes (the digest the result cache keys on):
+
+    <root>/ab/abcdef...0123.csv
+
+A re-upload of the same bytes finds its file already there and writes
+nothing. New files are written to a unique temporary name and renamed into
+place, so readers never see a partial file.
+"""
+import os
+import shutil
+import tempfile
+
+
+# Bytes copied per read when writing an upload to disk
+COPY_CHUNK = 1 << 20
+
+
+def spooled_stream(max_size):
+    """Writable upload stream that moves from memory to a temporary file above max_size bytes."""
+    return tempfile.SpooledTemporaryFile(max_size=max_size, mode="rb+")
+
+
+def _copy(stream, f):
+    stream.seek(0)
+    shutil.copyfileobj(stream, f, COPY_CHUNK)
+    stream.seek(0)
+
+
+def temporary_copy(stream, suffix=".csv", dir=None):
+    """Writes a seekable stream to a new private temporary file; the caller removes it."""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            _copy(stream, f)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+class UploadStore:
+    """Content-addressed directory of retained uploads."""
+
+    def __init__(self, root, suffix=".csv"):
+        self.root = root
+        self.suffix = suffix
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest + self.suffix)
+
+    def retain(self, stream, digest):
+        """Keeps the stream's bytes under digest (once) and returns their path; rewinds the stream."""
+        path = self.path(digest)
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".upload-", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                _copy(stream, f)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        return path